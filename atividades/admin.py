@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Curso, Categoria, Aluno, Atividade, CategoriaCurso, CursoPorSemestre, Semestre
+from .models import Curso, Categoria, Aluno, Atividade, CategoriaCurso, CursoPorSemestre, SaldoHorasAluno, Semestre
 
 @admin.register(Curso)
 class CursoAdmin(admin.ModelAdmin):
@@ -30,3 +30,7 @@ class CursoPorSemestreAdmin(admin.ModelAdmin):
 @admin.register(Semestre)
 class SemestreAdmin(admin.ModelAdmin):
     list_display = ("nome", "data_inicio", "data_fim")
+
+@admin.register(SaldoHorasAluno)
+class SaldoHorasAlunoAdmin(admin.ModelAdmin):
+    list_display = ("aluno", "categoria_curso", "horas_aprovadas", "horas_pendentes", "horas_validas")
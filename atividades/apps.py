@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class AtividadesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'atividades'
+
+    def ready(self):
+        from django.db.backends.signals import connection_created
+        from . import signals  # noqa: F401
+        from .middleware import instalar_contador_consultas
+        from .utils import instalar_invalidador_tabelas
+
+        connection_created.connect(instalar_invalidador_tabelas, dispatch_uid='atividades_invalidador_tabelas')
+        connection_created.connect(instalar_contador_consultas, dispatch_uid='atividades_contador_consultas')
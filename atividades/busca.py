@@ -0,0 +1,39 @@
+"""
+Busca textual sem acentos e sem diferenciar maiúsculas/minúsculas.
+
+Aluno (nome, matrícula) e Atividade (nome) guardam uma cópia normalizada
+desses campos (nome_busca, matricula_busca), preenchida no save() dos
+models. A busca compara o termo, normalizado do mesmo jeito, com essas
+colunas usando LIKE simples: "joao" encontra "João" e "leticia silva"
+encontra "Letícia da Silva", sem funções SQL por linha nem joins extras.
+Como a palavra pode estar no meio do texto, o LIKE é '%palavra%' e não usa
+índice: a busca percorre as linhas que sobram dos demais filtros (curso,
+status etc.), o que é barato no volume de uma turma.
+Após gravar direto no banco (update/bulk_create), rode reindexar_busca.
+"""
+from functools import lru_cache, reduce
+import operator
+import unicodedata
+
+from django.db.models import Q
+
+
+@lru_cache(maxsize=4096)
+def normalizar_busca(texto) -> str:
+    """Minúsculas (casefold), sem acentos e com espaços simples"""
+    if not texto:
+        return ''
+    decomposto = unicodedata.normalize('NFKD', str(texto))
+    sem_acentos = ''.join(caractere for caractere in decomposto if not unicodedata.combining(caractere))
+    return ' '.join(sem_acentos.casefold().split())
+
+
+def filtrar_por_busca(queryset, campo: str, termo):
+    """
+    Filtra `campo` (coluna normalizada, ex.: 'aluno__nome_busca') pelas
+    palavras do termo: todas precisam aparecer, em qualquer ordem.
+    """
+    palavras = normalizar_busca(termo).split()
+    if not palavras:
+        return queryset
+    return queryset.filter(reduce(operator.and_, (Q(**{f'{campo}__contains': palavra}) for palavra in palavras)))
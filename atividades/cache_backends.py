@@ -0,0 +1,312 @@
+"""
+Backends de cache compartilhados entre processos, sem serviço externo.
+
+SQLiteCache guarda as entradas em um arquivo SQLite (modo WAL) visto por
+todos os workers do servidor, então uma invalidação feita em um worker vale
+para os demais.
+
+CacheDuasCamadas acrescenta, em cada processo, um L1 em memória na frente do
+SQLite. Toda escrita registra a chave alterada na tabela "invalidacoes" e
+publica o id desse registro em um contador de 8 bytes mapeado em memória
+(arquivo "<LOCATION>.geracao"). Antes de cada leitura o processo compara o
+contador com o último id que já aplicou; só quando ele mudou consulta as
+invalidações novas e descarta as chaves correspondentes do L1.
+"""
+import mmap
+import os
+import pickle
+import random
+import sqlite3
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS cache (
+    chave TEXT PRIMARY KEY,
+    valor BLOB NOT NULL,
+    expira REAL
+);
+CREATE INDEX IF NOT EXISTS cache_expira ON cache (expira);
+CREATE TABLE IF NOT EXISTS invalidacoes (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    chave TEXT
+);
+"""
+
+# Fração das escritas que também limpam entradas expiradas e o excedente
+LIMPEZA_A_CADA = 100
+
+# Invalidações mantidas para processos que ficaram um tempo sem ler o cache;
+# quem ficar para trás disso descarta o L1 inteiro
+INVALIDACOES_MANTIDAS = 10000
+
+
+class SQLiteCache(BaseCache):
+    """Cache em arquivo SQLite compartilhado pelos processos da mesma máquina"""
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._caminho = location
+        self._local = threading.local()
+
+    # =====================
+    # CONEXÃO
+    # =====================
+    def _conexao(self) -> sqlite3.Connection:
+        # Uma conexão por thread; após um fork o processo filho abre a sua
+        conexao = getattr(self._local, 'conexao', None)
+        if conexao is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self._caminho)), exist_ok=True)
+            conexao = sqlite3.connect(self._caminho, timeout=10, isolation_level=None, check_same_thread=False)
+            conexao.execute('PRAGMA journal_mode = WAL')
+            conexao.execute('PRAGMA synchronous = NORMAL')
+            conexao.executescript(ESQUEMA)
+            self._local.conexao, self._local.pid = conexao, os.getpid()
+        return conexao
+
+    def _escrever(self, operacao, chave, *, invalidar=True):
+        """
+        Executa operacao(conexao) em uma transação de escrita e, se invalidar,
+        chama _apos_escrita(conexao, chave) antes do COMMIT (chave None = todas).
+        """
+        conexao = self._conexao()
+        conexao.execute('BEGIN IMMEDIATE')
+        try:
+            resultado = operacao(conexao)
+            if invalidar:
+                self._apos_escrita(conexao, chave)
+            conexao.execute('COMMIT')
+        except BaseException:
+            conexao.execute('ROLLBACK')
+            raise
+        return resultado
+
+    def _apos_escrita(self, conexao, chave):
+        pass
+
+    # =====================
+    # LEITURA
+    # =====================
+    def _ler(self, chave):
+        """(valor serializado, expira) da entrada válida, ou None"""
+        registro = self._conexao().execute(
+            'SELECT valor, expira FROM cache WHERE chave = ?', (chave,)
+        ).fetchone()
+        if registro is None or (registro[1] is not None and registro[1] <= time.time()):
+            return None
+        return registro[0], registro[1]
+
+    def get(self, key, default=None, version=None):
+        lido = self._ler(self.make_and_validate_key(key, version=version))
+        return default if lido is None else pickle.loads(lido[0])
+
+    def has_key(self, key, version=None):
+        return self._ler(self.make_and_validate_key(key, version=version)) is not None
+
+    # =====================
+    # ESCRITA
+    # =====================
+    def _gravar(self, conexao, chave, value, timeout):
+        conexao.execute(
+            'INSERT OR REPLACE INTO cache (chave, valor, expira) VALUES (?, ?, ?)',
+            (chave, pickle.dumps(value, pickle.HIGHEST_PROTOCOL), self.get_backend_timeout(timeout))
+        )
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        chave = self.make_and_validate_key(key, version=version)
+        self._escrever(lambda conexao: self._gravar(conexao, chave, value, timeout), chave)
+        self._limpar_talvez()
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        chave = self.make_and_validate_key(key, version=version)
+
+        def adicionar(conexao):
+            existente = conexao.execute('SELECT expira FROM cache WHERE chave = ?', (chave,)).fetchone()
+            if existente is not None and (existente[0] is None or existente[0] > time.time()):
+                return False
+            self._gravar(conexao, chave, value, timeout)
+            return True
+
+        adicionada = self._escrever(adicionar, chave)
+        if adicionada:
+            self._limpar_talvez()
+        return adicionada
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        chave = self.make_and_validate_key(key, version=version)
+        return self._escrever(
+            lambda conexao: conexao.execute(
+                'UPDATE cache SET expira = ? WHERE chave = ? AND (expira IS NULL OR expira > ?)',
+                (self.get_backend_timeout(timeout), chave, time.time())
+            ).rowcount > 0,
+            chave
+        )
+
+    def delete(self, key, version=None):
+        chave = self.make_and_validate_key(key, version=version)
+        return self._escrever(
+            lambda conexao: conexao.execute('DELETE FROM cache WHERE chave = ?', (chave,)).rowcount > 0,
+            chave
+        )
+
+    def incr(self, key, delta=1, version=None):
+        chave = self.make_and_validate_key(key, version=version)
+
+        def incrementar(conexao):
+            registro = conexao.execute('SELECT valor, expira FROM cache WHERE chave = ?', (chave,)).fetchone()
+            if registro is None or (registro[1] is not None and registro[1] <= time.time()):
+                raise ValueError(f"Key '{key}' not found")
+            novo = pickle.loads(registro[0]) + delta
+            conexao.execute(
+                'UPDATE cache SET valor = ? WHERE chave = ?',
+                (pickle.dumps(novo, pickle.HIGHEST_PROTOCOL), chave)
+            )
+            return novo
+
+        return self._escrever(incrementar, chave)
+
+    def clear(self):
+        self._escrever(lambda conexao: conexao.execute('DELETE FROM cache'), None)
+
+    def _limpar_talvez(self):
+        """Em ~1 a cada LIMPEZA_A_CADA escritas remove expiradas e, acima de MAX_ENTRIES, as que expiram primeiro"""
+        if random.randrange(LIMPEZA_A_CADA):
+            return
+        # Só remove entradas expiradas ou excedentes: o que estiver em algum L1 continua válido
+        self._escrever(self._limpar, None, invalidar=False)
+
+    def _limpar(self, conexao):
+        conexao.execute('DELETE FROM cache WHERE expira <= ?', (time.time(),))
+        excedente = conexao.execute('SELECT COUNT(*) FROM cache').fetchone()[0] - self._max_entries
+        if excedente > 0:
+            conexao.execute(
+                'DELETE FROM cache WHERE chave IN ('
+                'SELECT chave FROM cache ORDER BY expira IS NULL, expira LIMIT ?)',
+                (excedente,)
+            )
+        conexao.execute(
+            'DELETE FROM invalidacoes WHERE id <= (SELECT MAX(id) FROM invalidacoes) - ?',
+            (INVALIDACOES_MANTIDAS,)
+        )
+
+
+class _CamadaLocal:
+    """L1 de um processo para um LOCATION, compartilhado pelas threads"""
+
+    def __init__(self, caminho_geracao):
+        self.lock = threading.Lock()
+        self.entradas = OrderedDict()
+        self.aplicada = None
+        self.pid = os.getpid()
+
+        descritor = os.open(caminho_geracao, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if os.fstat(descritor).st_size < 8:
+                os.ftruncate(descritor, 8)
+            self.geracao = mmap.mmap(descritor, 8)
+        finally:
+            os.close(descritor)
+
+    def ler_geracao(self) -> int:
+        return struct.unpack_from('<Q', self.geracao)[0]
+
+    def publicar_geracao(self, valor: int):
+        struct.pack_into('<Q', self.geracao, 0, valor)
+
+
+_camadas_locais = {}
+_camadas_locais_lock = threading.Lock()
+
+
+class CacheDuasCamadas(SQLiteCache):
+    """
+    SQLiteCache com um L1 por processo. OPTIONS:
+    L1_MAX_ENTRIES (padrão 300) e L1_TIMEOUT, tempo máximo no L1 em segundos (padrão 60).
+    """
+
+    def __init__(self, location, params):
+        super().__init__(location, params)
+        opcoes = params.get('OPTIONS', {})
+        self._l1_max_entries = int(opcoes.get('L1_MAX_ENTRIES', 300))
+        self._l1_timeout = float(opcoes.get('L1_TIMEOUT', 60))
+
+    def _camada(self) -> _CamadaLocal:
+        # O CacheHandler cria uma instância por thread: o L1 fica no módulo, por processo
+        camada = _camadas_locais.get(self._caminho)
+        if camada is None or camada.pid != os.getpid():
+            with _camadas_locais_lock:
+                camada = _camadas_locais.get(self._caminho)
+                if camada is None or camada.pid != os.getpid():
+                    os.makedirs(os.path.dirname(os.path.abspath(self._caminho)), exist_ok=True)
+                    camada = _camadas_locais[self._caminho] = _CamadaLocal(f'{self._caminho}.geracao')
+        return camada
+
+    def _sincronizar(self, camada: _CamadaLocal):
+        """Aplica ao L1 as invalidações publicadas por qualquer processo desde a última leitura"""
+        if camada.aplicada is not None and camada.ler_geracao() == camada.aplicada:
+            return
+
+        with camada.lock:
+            if camada.aplicada is None:
+                # Primeiro uso no processo: o L1 está vazio, basta partir da última invalidação
+                maximo = self._conexao().execute('SELECT MAX(id) FROM invalidacoes').fetchone()[0]
+                camada.aplicada = maximo or 0
+                return
+
+            registros = self._conexao().execute(
+                'SELECT id, chave FROM invalidacoes WHERE id > ? ORDER BY id', (camada.aplicada,)
+            ).fetchall()
+            if registros and registros[0][0] != camada.aplicada + 1:
+                # Invalidações já removidas pela limpeza: não dá para saber o que mudou
+                camada.entradas.clear()
+            for id_invalidacao, chave in registros:
+                if chave is None:
+                    camada.entradas.clear()
+                else:
+                    camada.entradas.pop(chave, None)
+                camada.aplicada = id_invalidacao
+
+    def _apos_escrita(self, conexao, chave):
+        # Ainda dentro da transação de escrita (BEGIN IMMEDIATE): as publicações saem em ordem
+        id_invalidacao = conexao.execute('INSERT INTO invalidacoes (chave) VALUES (?)', (chave,)).lastrowid
+        camada = self._camada()
+        with camada.lock:
+            if chave is None:
+                camada.entradas.clear()
+            else:
+                camada.entradas.pop(chave, None)
+        camada.publicar_geracao(id_invalidacao)
+
+    def _ler(self, chave):
+        camada = self._camada()
+        self._sincronizar(camada)
+
+        agora = time.time()
+        with camada.lock:
+            entrada = camada.entradas.get(chave)
+            if entrada is not None:
+                if entrada[2] > agora:
+                    camada.entradas.move_to_end(chave)
+                    return entrada[0], entrada[1]
+                del camada.entradas[chave]
+
+            # Invalidações aplicadas até aqui: se outra thread aplicar alguma durante a leitura do
+            # SQLite, o valor lido pode já estar obsoleto e não vai para o L1
+            aplicada = camada.aplicada
+
+        lido = super()._ler(chave)
+        if lido is not None:
+            valor, expira = lido
+            limite_l1 = agora + self._l1_timeout
+            with camada.lock:
+                if camada.aplicada != aplicada:
+                    return lido
+                camada.entradas[chave] = (valor, expira, limite_l1 if expira is None else min(expira, limite_l1))
+                while len(camada.entradas) > self._l1_max_entries:
+                    camada.entradas.popitem(last=False)
+        return lido
@@ -1,30 +1,54 @@
+from django.conf import settings
 from django.core.cache import cache
-from atividades.selectors import AlunoSelectors, CategoriaCursoSelectors
+from django.utils.functional import SimpleLazyObject
+from atividades.selectors import (
+    CATEGORIAS_MENU_CACHE_TTL,
+    CategoriaCursoSelectors,
+    CategoriaMenu,
+    UserSelectors,
+    categorias_menu_cache_key,
+    get_geracao_categorias_menu,
+)
 
 def categorias_do_usuario(request):
     """
-    Context processor com cache para otimizar carregamento.
-    Cache expira em 10 minutos e é invalidado por aluno ao aprovar horas.
+    Context processor com as categorias do menu lateral do aluno.
+    É preguiçoso: templates que não leem categorias_context não consultam nem
+    o cache. As categorias ficam 10 minutos no cache como tuplas compactas, em
+    chaves versionadas pela geração do aluno (AtividadeService.invalidar_cache_aluno).
+    Se a view já montou o resumo do aluno (dashboard), reaproveita as categorias dele.
     """
     user = getattr(request, 'user', None)
     if not user or not user.is_authenticated:
         return {}
 
-    aluno = AlunoSelectors.get_aluno_by_user(user)
-    if not aluno or not aluno.curso:
-        return {}
+    return {'categorias_context': SimpleLazyObject(lambda: _categorias_menu(request))}
+
+
+def _categorias_menu(request):
+    # O perfil já é memorizado no usuário e no cache: o aluno vem sem consulta ao banco
+    aluno = UserSelectors.get_perfil(request.user).aluno
+    if not aluno or not aluno.curso_id:
+        return ()
+
+    cache_key = categorias_menu_cache_key(aluno.id, get_geracao_categorias_menu(aluno.id))
+    resumo = getattr(request, 'resumo_aluno', None)
+    if resumo is not None:
+        categorias = tuple(CategoriaMenu.de_categoria_curso(categoria) for categoria in resumo['categorias'])
+        cache.set(cache_key, categorias, CATEGORIAS_MENU_CACHE_TTL)
+        return categorias
 
-    # Cache por aluno - expira em 5 minutos
-    cache_key = f'categorias_aluno_{aluno.id}'
     categorias = cache.get(cache_key)
-    
     if categorias is None:
-        categorias = list(
-            CategoriaCursoSelectors.get_categorias_curso_com_horas_por_aluno(
-                aluno=aluno
-            )
-        )
-        # Cache de 10 minutos (600 segundos)
-        cache.set(cache_key, categorias, 600)
-
-    return {'categorias_context': categorias}
+        categorias = CategoriaCursoSelectors.get_categorias_menu_aluno(aluno=aluno)
+        cache.set(cache_key, categorias, CATEGORIAS_MENU_CACHE_TTL)
+
+    return categorias
+
+
+def notificacoes(request):
+    """Como o header atualiza o badge: SSE (servido pelo ASGI) ou polling"""
+    return {
+        'notificacoes_sse': settings.NOTIFICACOES_SSE,
+        'notificacoes_poll_segundos': settings.NOTIFICACOES_POLL_SEGUNDOS,
+    }
@@ -0,0 +1,83 @@
+"""
+Amostras de desempenho por view, registradas pelo DesempenhoMiddleware.
+
+Para cada (view, HTMX) são mantidas as últimas DESEMPENHO_JANELA requisições
+dos últimos DESEMPENHO_AMOSTRA_TTL segundos em memória; os percentis são
+calculados sob demanda na página do gestor, que também pode zerá-las.
+As amostras são do processo atual (cada worker mantém a sua janela).
+"""
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Tuple
+
+from django.conf import settings
+
+
+_amostras: Dict[Tuple[str, bool], deque] = {}
+_total_requisicoes: Dict[Tuple[str, bool], int] = {}
+_lock = threading.Lock()
+
+
+def registrar_amostra(*, view: str, htmx: bool, duracao_ms: float, sql_consultas: int, sql_ms: float):
+    chave = (view, htmx)
+    agora = time.monotonic()
+    with _lock:
+        janela = _amostras.get(chave)
+        if janela is None:
+            janela = _amostras[chave] = deque(maxlen=settings.DESEMPENHO_JANELA)
+        janela.append((duracao_ms, sql_consultas, sql_ms, agora))
+        _descartar_expiradas(janela, agora)
+        _total_requisicoes[chave] = _total_requisicoes.get(chave, 0) + 1
+
+
+def _descartar_expiradas(janela: deque, agora: float):
+    # As amostras entram em ordem: as expiradas ficam no começo da janela
+    limite = agora - settings.DESEMPENHO_AMOSTRA_TTL
+    while janela and janela[0][3] < limite:
+        janela.popleft()
+
+
+def percentil(valores_ordenados: List[float], p: int) -> float:
+    """Percentil p (0-100) pelo método nearest-rank"""
+    indice = max(0, -(-p * len(valores_ordenados) // 100) - 1)
+    return valores_ordenados[indice]
+
+
+def resumo_por_view() -> List[dict]:
+    """Percentis de tempo e médias de SQL por (view, HTMX), mais lentas (p95) primeiro"""
+    agora = time.monotonic()
+    with _lock:
+        for chave, janela in list(_amostras.items()):
+            _descartar_expiradas(janela, agora)
+            if not janela:
+                # View sem requisições recentes sai do resumo (e da memória)
+                del _amostras[chave]
+                del _total_requisicoes[chave]
+        copias = {chave: list(janela) for chave, janela in _amostras.items()}
+        totais = dict(_total_requisicoes)
+
+    resumo = []
+    for (view, htmx), amostras in copias.items():
+        duracoes = sorted(amostra[0] for amostra in amostras)
+        resumo.append({
+            'view': view,
+            'htmx': htmx,
+            'requisicoes': totais[(view, htmx)],
+            'amostras': len(amostras),
+            'p50': round(percentil(duracoes, 50), 1),
+            'p95': round(percentil(duracoes, 95), 1),
+            'p99': round(percentil(duracoes, 99), 1),
+            'max': round(duracoes[-1], 1),
+            'sql_consultas': round(sum(amostra[1] for amostra in amostras) / len(amostras), 1),
+            'sql_ms': round(sum(amostra[2] for amostra in amostras) / len(amostras), 1),
+        })
+
+    return sorted(resumo, key=lambda item: item['p95'], reverse=True)
+
+
+def limpar_amostras():
+    """Zera as amostras deste processo (botão da página de desempenho)"""
+    with _lock:
+        _amostras.clear()
+        _total_requisicoes.clear()
@@ -0,0 +1,71 @@
+"""
+Pub/sub em processo para avisar conexões SSE abertas (StreamNotificacoesView).
+
+Cada conexão se inscreve com uma asyncio.Queue do seu event loop; publicar()
+pode ser chamado de qualquer thread (views síncronas, services) e entrega o
+evento às filas do usuário com call_soon_threadsafe. As inscrições são do
+processo atual: para outros workers, publicar() também avança uma versão por
+usuário no cache, que as conexões conferem a cada intervalo de keep-alive.
+"""
+import asyncio
+import threading
+from typing import Dict, Set, Tuple
+
+from django.core.cache import cache
+from django.db import transaction
+
+from atividades.selectors import notificacoes_versao_key
+
+
+_inscricoes: Dict[int, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]] = {}
+_lock = threading.Lock()
+
+
+def inscrever(user_id: int) -> asyncio.Queue:
+    """Fila que recebe os eventos do usuário; chamar dentro do event loop da conexão"""
+    fila = asyncio.Queue(maxsize=100)
+    with _lock:
+        _inscricoes.setdefault(user_id, set()).add((asyncio.get_running_loop(), fila))
+    return fila
+
+
+def cancelar(user_id: int, fila: asyncio.Queue):
+    with _lock:
+        inscricoes = _inscricoes.get(user_id, set())
+        inscricoes.difference_update({inscricao for inscricao in inscricoes if inscricao[1] is fila})
+        if not inscricoes:
+            _inscricoes.pop(user_id, None)
+
+
+def _entregar(fila: asyncio.Queue, evento: str):
+    try:
+        fila.put_nowait(evento)
+    except asyncio.QueueFull:
+        # Conexão lenta: ela já tem eventos pendentes, todos levam ao mesmo recálculo
+        pass
+
+
+def publicar(user_id: int, evento: str = 'notificacoes'):
+    """Avisa as conexões do usuário (neste processo) e avança a versão vista pelos demais"""
+    try:
+        cache.incr(notificacoes_versao_key(user_id))
+    except ValueError:
+        cache.add(notificacoes_versao_key(user_id), 1, None)
+
+    with _lock:
+        inscricoes = list(_inscricoes.get(user_id, ()))
+    for loop, fila in inscricoes:
+        try:
+            loop.call_soon_threadsafe(_entregar, fila, evento)
+        except RuntimeError:
+            # Event loop já encerrado; a conexão sai da lista ao terminar
+            pass
+
+
+def publicar_apos_commit(user_id: int, evento: str = 'notificacoes'):
+    """publicar() só depois do COMMIT, para a conexão não ler o estado anterior"""
+    transaction.on_commit(lambda: publicar(user_id, evento))
+
+
+async def versao(user_id: int) -> int:
+    return await cache.aget(notificacoes_versao_key(user_id), 0)
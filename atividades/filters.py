@@ -1,5 +1,6 @@
 import django_filters
 from django.contrib.auth.models import User
+from atividades.busca import filtrar_por_busca
 from atividades.selectors import AlunoSelectors, CategoriaCursoSelectors, UserSelectors
 from .models import Atividade, Curso, CategoriaCurso, Semestre, Aluno
 from django import forms
@@ -84,26 +85,75 @@ class AlunosFilter(django_filters.FilterSet):
         )
     )
 
+    progresso = django_filters.ChoiceFilter(
+        choices=(
+            ('0-25', 'Até 25%'),
+            ('25-50', '25% a 50%'),
+            ('50-75', '50% a 75%'),
+            ('75-100', '75% a 99%'),
+            ('100', 'Concluído'),
+        ),
+        label='Progresso',
+        method='filter_progresso',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        empty_label="Todos"
+    )
+
+    ordenar = django_filters.ChoiceFilter(
+        choices=(
+            ('progresso', 'Menor progresso'),
+            ('-progresso', 'Maior progresso'),
+        ),
+        label='Ordenar por',
+        method='ordenar_por',
+        widget=forms.Select(attrs={'class': 'form-select'}),
+        empty_label="Pendências"
+    )
+
     class Meta:
         model = Aluno
-        fields = ['semestre_ingresso', 'tem_horas_a_validar', 'nome']
+        fields = ['semestre_ingresso', 'tem_horas_a_validar', 'nome', 'progresso', 'ordenar']
 
     def filtrar_nome(self, queryset, name, value):
+        return filtrar_por_busca(queryset, 'nome_busca', value)
+
+    def _com_progresso(self, queryset):
+        if 'progresso_percentual' in queryset.query.annotations:
+            return queryset
+        return AlunoSelectors._with_progresso_annotation(queryset)
+
+    def filter_progresso(self, queryset, name, value):
+        if not value:
+            return queryset
+
+        queryset = self._com_progresso(queryset)
+
+        if value == '100':
+            return queryset.filter(progresso_percentual__gte=100)
+
+        inicio, fim = value.split('-')
         return queryset.filter(
-            nome__icontains=value)
+            progresso_percentual__gte=int(inicio),
+            progresso_percentual__lt=int(fim)
+        )
+
+    def ordenar_por(self, queryset, name, value):
+        if value == 'progresso':
+            return self._com_progresso(queryset).order_by('progresso_percentual', 'nome')
+        if value == '-progresso':
+            return self._com_progresso(queryset).order_by('-progresso_percentual', 'nome')
+        return queryset
 
     def filter_tem_horas_a_validar(self, queryset, name, value):
         # se nenhum valor enviado, não filtra
         if not value:
             return queryset
 
-        # anota cada aluno com booleano tem_pendencia
-        queryset = AlunoSelectors._with_pendencia_annotation(queryset)
-
+        # contador de atividades pendentes mantido em cada aluno
         if str(value) == '1':
-            return queryset.filter(tem_pendencia=True)
+            return queryset.filter(atividades_pendentes__gt=0)
         if str(value) == '0':
-            return queryset.filter(tem_pendencia=False)
+            return queryset.filter(atividades_pendentes=0)
 
         return queryset
     
@@ -200,24 +250,31 @@ class AtividadesCoordenadorFilter(django_filters.FilterSet):
         )
     )
 
+    nome_atividade = django_filters.CharFilter(
+        method='filtrar_nome_atividade',
+        label='Atividade',
+        widget=forms.TextInput(
+            attrs={'class': 'form-control', 'placeholder': 'Buscar por nome da atividade...'}
+        )
+    )
+
     aluno_id = django_filters.NumberFilter(widget=forms.HiddenInput(), method='filter_aluno_id')
 
     class Meta:
         model = Atividade
-        fields = ['status', 'nome_aluno', 'aluno_id']
+        fields = ['status', 'nome_aluno', 'nome_atividade', 'aluno_id']
 
     def filter_aluno_id(self, queryset, name, value):
         return queryset.filter(aluno__id=value)
 
     def filtrar_nome_aluno(self, queryset, name, value):
-        return queryset.filter(
-            aluno__nome__icontains=value
-        )
+        return filtrar_por_busca(queryset, 'aluno__nome_busca', value)
     
     def filtrar_matricula_aluno(self, queryset, name, value):
-        return queryset.filter(
-            aluno__matricula__icontains=value
-        )
+        return filtrar_por_busca(queryset, 'aluno__matricula_busca', value)
+
+    def filtrar_nome_atividade(self, queryset, name, value):
+        return filtrar_por_busca(queryset, 'nome_busca', value)
     
     def filter_atividades_status(self, queryset, name, value):
         if not value:
@@ -0,0 +1,287 @@
+"""
+Índice de busca dos arquivos de log (errors/business/security).
+
+As linhas "[NIVEL] AAAA-MM-DD HH:MM:SS | mensagem" gravadas pelo LOGGING são
+copiadas de forma incremental para um SQLite local com uma tabela FTS5. Para
+cada tipo de log o índice guarda o inode (com um hash da primeira linha, já
+que inodes são reaproveitados) e o offset já lidos, então cada
+indexação lê apenas o que foi escrito desde a anterior e, se o arquivo tiver
+sido rotacionado, termina de ler o backup (.1, .2, ...) antes de seguir.
+"""
+import hashlib
+import re
+import sqlite3
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from django.conf import settings
+
+
+LINHA_LOG_RE = re.compile(
+    r'^\[(?P<nivel>[A-Z]+)\] (?P<momento>\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}) \| (?P<mensagem>.*)$'
+)
+
+USUARIO_RES = (
+    re.compile(r'\bUser: (?P<valor>[^\s|]+)'),
+    re.compile(r'\bUsuário (?P<valor>[^\s(]+)'),
+    re.compile(r'\bCoordenador (?P<valor>[^\s(]+) \('),
+)
+
+ROTA_RES = (
+    re.compile(r"\brota '(?P<valor>[^']+)'"),
+    re.compile(r'\bem (?P<valor>/\S*)'),
+)
+
+ESQUEMA = """
+CREATE TABLE IF NOT EXISTS entradas (
+    id INTEGER PRIMARY KEY,
+    tipo TEXT NOT NULL,
+    nivel TEXT NOT NULL,
+    momento TEXT NOT NULL,
+    usuario TEXT,
+    rota TEXT,
+    mensagem TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entradas_tipo_momento ON entradas (tipo, momento);
+CREATE INDEX IF NOT EXISTS entradas_tipo_usuario ON entradas (tipo, usuario);
+CREATE VIRTUAL TABLE IF NOT EXISTS entradas_fts USING fts5 (
+    mensagem,
+    tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE TABLE IF NOT EXISTS arquivos (
+    tipo TEXT PRIMARY KEY,
+    inode INTEGER NOT NULL,
+    offset INTEGER NOT NULL,
+    ultima_entrada INTEGER,
+    assinatura TEXT
+);
+"""
+
+
+def _extrair(padroes, mensagem: str) -> Optional[str]:
+    for padrao in padroes:
+        encontrado = padrao.search(mensagem)
+        if encontrado:
+            return encontrado.group('valor')
+    return None
+
+
+def _assinatura(caminho) -> Optional[str]:
+    """Hash da primeira linha completa do arquivo; None se ela ainda não terminou"""
+    with open(caminho, 'rb') as arquivo:
+        primeira = arquivo.readline(4096)
+    if not primeira.endswith(b'\n'):
+        return None
+    return hashlib.sha1(primeira).hexdigest()
+
+
+def _consulta_fts(texto: str) -> str:
+    """Cada palavra vira um termo entre aspas (todas obrigatórias), sem expor a sintaxe do FTS5"""
+    termos = [termo.replace('"', '""') for termo in texto.split()]
+    return ' '.join(f'"{termo}"' for termo in termos)
+
+
+class IndiceLogs:
+
+    def __init__(self, caminho=None):
+        self.caminho = Path(caminho or settings.LOGS_INDICE_PATH)
+
+    def _conectar(self) -> sqlite3.Connection:
+        self.caminho.parent.mkdir(parents=True, exist_ok=True)
+        conexao = sqlite3.connect(self.caminho, timeout=10, isolation_level=None)
+        conexao.row_factory = sqlite3.Row
+        conexao.execute('PRAGMA journal_mode = WAL')
+        conexao.executescript(ESQUEMA)
+        colunas = {coluna['name'] for coluna in conexao.execute('PRAGMA table_info(arquivos)')}
+        if 'assinatura' not in colunas:
+            # Índices criados antes da assinatura
+            conexao.execute('ALTER TABLE arquivos ADD COLUMN assinatura TEXT')
+        return conexao
+
+    # =====================
+    # INDEXAÇÃO
+    # =====================
+    def indexar(self, *, tipo: str, arquivo, backups: int = 0) -> int:
+        """Indexa o que foi escrito desde a última chamada. Retorna quantas entradas novas entraram."""
+        arquivo = Path(arquivo)
+        segmentos = []
+        for candidato in [arquivo] + [arquivo.with_name(f'{arquivo.name}.{i}') for i in range(1, backups + 1)]:
+            try:
+                segmentos.append((candidato, candidato.stat()))
+            except FileNotFoundError:
+                continue
+        if not segmentos:
+            return 0
+
+        conexao = self._conectar()
+        try:
+            # Serializa indexações concorrentes do mesmo índice
+            conexao.execute('BEGIN IMMEDIATE')
+            estado = conexao.execute(
+                'SELECT inode, offset, ultima_entrada, assinatura FROM arquivos WHERE tipo = ?', (tipo,)
+            ).fetchone()
+
+            # Segmentos a ler, do mais antigo para o mais novo: (caminho, offset inicial)
+            posicao = None
+            if estado:
+                # Um inode liberado pode voltar em um arquivo novo: a primeira linha confirma
+                posicao = next(
+                    (
+                        i for i, (caminho, info) in enumerate(segmentos)
+                        if info.st_ino == estado['inode']
+                        and estado['assinatura'] in (None, _assinatura(caminho))
+                    ),
+                    None
+                )
+            if posicao is None:
+                # Arquivo lido por último já saiu dos backups: os segmentos atuais são relidos
+                # do início, então as entradas antigas do tipo saem para não duplicar
+                if estado:
+                    conexao.execute(
+                        'DELETE FROM entradas_fts WHERE rowid IN (SELECT id FROM entradas WHERE tipo = ?)', (tipo,)
+                    )
+                    conexao.execute('DELETE FROM entradas WHERE tipo = ?', (tipo,))
+                pendentes = [(caminho, 0) for caminho, _ in reversed(segmentos)]
+                ultima_entrada = None
+            else:
+                offset = estado['offset'] if segmentos[posicao][1].st_size >= estado['offset'] else 0
+                pendentes = [(segmentos[posicao][0], offset)]
+                pendentes += [(segmentos[i][0], 0) for i in range(posicao - 1, -1, -1)]
+                ultima_entrada = estado['ultima_entrada']
+
+            novas = 0
+            offset_final = 0
+            for caminho, inicio in pendentes:
+                # Só o arquivo ativo pode ter uma última linha ainda incompleta
+                ativo = caminho == segmentos[0][0]
+                lidas, offset_final, ultima_entrada = self._indexar_segmento(
+                    conexao, tipo=tipo, caminho=caminho, inicio=inicio,
+                    ultima_entrada=ultima_entrada, apenas_linhas_completas=ativo
+                )
+                novas += lidas
+
+            conexao.execute(
+                'INSERT INTO arquivos (tipo, inode, offset, ultima_entrada, assinatura) VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT (tipo) DO UPDATE SET inode = excluded.inode, offset = excluded.offset, '
+                'ultima_entrada = excluded.ultima_entrada, assinatura = excluded.assinatura',
+                (tipo, segmentos[0][1].st_ino, offset_final, ultima_entrada, _assinatura(segmentos[0][0]))
+            )
+            conexao.execute('COMMIT')
+            return novas
+        except Exception:
+            conexao.execute('ROLLBACK')
+            raise
+        finally:
+            conexao.close()
+
+    def _indexar_segmento(self, conexao, *, tipo, caminho, inicio, ultima_entrada, apenas_linhas_completas) -> Tuple[int, int, Optional[int]]:
+        novas = 0
+        # Entrada em aberto: linhas sem cabeçalho (tracebacks) são anexadas a ela
+        atual_id, atual_mensagem, alterada = ultima_entrada, None, False
+
+        def gravar_continuacao():
+            conexao.execute('UPDATE entradas SET mensagem = ? WHERE id = ?', (atual_mensagem, atual_id))
+            conexao.execute('UPDATE entradas_fts SET mensagem = ? WHERE rowid = ?', (atual_mensagem, atual_id))
+
+        with open(caminho, 'rb') as arquivo:
+            arquivo.seek(inicio)
+            offset = inicio
+            while True:
+                bruta = arquivo.readline()
+                if not bruta or (apenas_linhas_completas and not bruta.endswith(b'\n')):
+                    break
+                offset += len(bruta)
+                linha = bruta.decode('utf-8', errors='replace').rstrip('\r\n')
+
+                cabecalho = LINHA_LOG_RE.match(linha)
+                if cabecalho:
+                    if alterada:
+                        gravar_continuacao()
+                    mensagem = cabecalho.group('mensagem')
+                    cursor = conexao.execute(
+                        'INSERT INTO entradas (tipo, nivel, momento, usuario, rota, mensagem) VALUES (?, ?, ?, ?, ?, ?)',
+                        (
+                            tipo,
+                            cabecalho.group('nivel'),
+                            cabecalho.group('momento'),
+                            _extrair(USUARIO_RES, mensagem),
+                            _extrair(ROTA_RES, mensagem),
+                            mensagem,
+                        )
+                    )
+                    atual_id, atual_mensagem, alterada = cursor.lastrowid, mensagem, False
+                    conexao.execute('INSERT INTO entradas_fts (rowid, mensagem) VALUES (?, ?)', (atual_id, mensagem))
+                    novas += 1
+                elif atual_id is not None:
+                    if atual_mensagem is None:
+                        registro = conexao.execute('SELECT mensagem FROM entradas WHERE id = ?', (atual_id,)).fetchone()
+                        if registro is None:
+                            atual_id = None
+                            continue
+                        atual_mensagem = registro['mensagem']
+                    atual_mensagem = f'{atual_mensagem}\n{linha}'
+                    alterada = True
+
+        if alterada:
+            gravar_continuacao()
+        return novas, offset, atual_id
+
+    # =====================
+    # BUSCA
+    # =====================
+    def buscar(
+        self,
+        *,
+        tipo: str,
+        texto: Optional[str] = None,
+        usuario: Optional[str] = None,
+        rota: Optional[str] = None,
+        inicio: Optional[str] = None,
+        fim: Optional[str] = None,
+        limite: int = 100,
+        antes_id: Optional[int] = None,
+    ) -> Tuple[List[sqlite3.Row], Optional[int]]:
+        """
+        Entradas mais recentes primeiro. inicio/fim no formato 'AAAA-MM-DD[ HH:MM:SS]'.
+        Retorna (entradas, id para a próxima página ou None).
+        """
+        condicoes = ['e.tipo = ?']
+        parametros = [tipo]
+        juncao = ''
+
+        if texto and texto.strip():
+            juncao = 'JOIN entradas_fts f ON f.rowid = e.id'
+            condicoes.append('entradas_fts MATCH ?')
+            parametros.append(_consulta_fts(texto))
+        if usuario:
+            condicoes.append('e.usuario = ?')
+            parametros.append(usuario)
+        if rota:
+            condicoes.append('e.rota LIKE ?')
+            parametros.append(f'%{rota}%')
+        if inicio:
+            condicoes.append('e.momento >= ?')
+            parametros.append(inicio)
+        if fim:
+            condicoes.append('e.momento <= ?')
+            parametros.append(fim)
+        if antes_id:
+            condicoes.append('e.id < ?')
+            parametros.append(antes_id)
+
+        sql = (
+            f'SELECT e.id, e.nivel, e.momento, e.usuario, e.rota, e.mensagem FROM entradas e {juncao} '
+            f'WHERE {" AND ".join(condicoes)} ORDER BY e.id DESC LIMIT ?'
+        )
+        parametros.append(limite + 1)
+
+        conexao = self._conectar()
+        try:
+            entradas = conexao.execute(sql, parametros).fetchall()
+        finally:
+            conexao.close()
+
+        if len(entradas) > limite:
+            entradas = entradas[:limite]
+            return entradas, entradas[-1]['id']
+        return entradas, None
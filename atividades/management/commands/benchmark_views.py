@@ -0,0 +1,302 @@
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, reset_queries
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from atividades.desempenho import percentil
+from atividades.models import Aluno, Atividade, Coordenador
+from atividades.services import RelatorioPdfService
+import contextlib
+import io
+import json
+import logging
+import statistics
+import tempfile
+import time
+
+
+class Command(BaseCommand):
+    CENARIOS = (
+        'dashboard_aluno',
+        'dashboard_aluno_htmx',
+        'dashboard_coordenador',
+        'dashboard_gestor',
+        'listar_atividades_coordenador',
+        'listar_alunos_coordenador',
+        'aprovar_horas_atividade',
+        'gerar_relatorio_aluno',
+        'listar_notificacoes',
+        'contar_notificacoes',
+        'marcar_todas_lidas',
+    )
+
+    help = (
+        'Mede latência (p50/p95/p99) e quantidade de consultas das views mais usadas em um banco de teste '
+        'populado com populate_massive_data. Salva o resultado em JSON e, com --baseline, falha se algum '
+        'cenário piorar além da tolerância.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--iteracoes', type=int, default=30, help='Requisições medidas por cenário (padrão: 30).')
+        parser.add_argument('--aquecimento', type=int, default=3, help='Requisições descartadas antes de medir (padrão: 3).')
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados gerados (padrão: 42).')
+        parser.add_argument('--cursos', type=int, help='Repassado ao populate_massive_data: limita os cursos usados.')
+        parser.add_argument('--semestres', type=int, help='Repassado ao populate_massive_data: limita os semestres usados.')
+        parser.add_argument('--alunos', type=int, default=60, help='Repassado ao populate_massive_data: alunos por curso/semestre (padrão: 60).')
+        parser.add_argument('--atividades', type=int, default=30, help='Repassado ao populate_massive_data: atividades por aluno (padrão: 30).')
+        parser.add_argument('--assimetria', type=float, default=0.0, help='Repassado ao populate_massive_data (padrão: 0).')
+        parser.add_argument(
+            '--cenarios',
+            nargs='+',
+            choices=self.CENARIOS,
+            metavar='CENARIO',
+            help=f'Executa apenas os cenários informados ({", ".join(self.CENARIOS)}).'
+        )
+        parser.add_argument('--saida', help='Arquivo JSON onde salvar os resultados.')
+        parser.add_argument('--baseline', help='JSON de uma execução anterior para comparação.')
+        parser.add_argument(
+            '--tolerancia',
+            type=float,
+            default=0.25,
+            help='Aumento relativo do p95 aceito em relação ao baseline (padrão: 0.25 = 25%%).'
+        )
+        parser.add_argument(
+            '--folga-ms',
+            type=float,
+            default=5.0,
+            help='Diferença absoluta de p95 sempre aceita, para não acusar ruído em cenários rápidos (padrão: 5 ms).'
+        )
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+
+        dados = {chave: options[chave] for chave in ('seed', 'cursos', 'semestres', 'alunos', 'atividades', 'assimetria')}
+
+        baseline = None
+        if options['baseline']:
+            try:
+                with open(options['baseline'], encoding='utf-8') as arquivo:
+                    conteudo = json.load(arquivo)
+                baseline = conteudo['cenarios']
+            except (OSError, ValueError, KeyError) as e:
+                raise CommandError(f'Não foi possível ler o baseline: {e}')
+            if conteudo.get('parametros', {}).get('dados', dados) != dados:
+                self.stdout.write(self.style.WARNING(
+                    'Atenção: o baseline foi gerado com outro volume de dados; a comparação pode não ser justa.'
+                ))
+
+        nome_original = connection.settings_dict['NAME']
+        self.stdout.write('Criando banco de teste...')
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+
+        try:
+            # Cache em memória própria: o cache configurado (sqlite/duas_camadas) é compartilhado com o
+            # site e os ids do banco de teste coincidem com os reais (perfil_usuario_v1_<id> etc.)
+            with tempfile.TemporaryDirectory() as pasta_relatorios, override_settings(
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+                DESEMPENHO_LIMITE_LENTO_MS=10 ** 9,
+                RELATORIOS_PDF_DIR=pasta_relatorios,
+                CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+            ), self._logs_desviados():
+                cache.clear()
+                self._popular(dados)
+                resultados = self._executar_cenarios(options)
+        finally:
+            connection.creation.destroy_test_db(nome_original, verbosity=0)
+
+        if options['saida']:
+            with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+                json.dump({
+                    'gerado_em': timezone.now().isoformat(),
+                    'parametros': {
+                        'iteracoes': options['iteracoes'],
+                        'aquecimento': options['aquecimento'],
+                        'dados': dados,
+                    },
+                    'cenarios': resultados,
+                }, arquivo, indent=2, ensure_ascii=False)
+            self.stdout.write(f'Resultados salvos em {options["saida"]}')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Benchmark concluído em {time.time() - tempo_inicio:.1f}s'))
+
+        if baseline is not None:
+            self._comparar(resultados, baseline, options['tolerancia'], options['folga_ms'])
+
+    @contextlib.contextmanager
+    def _logs_desviados(self):
+        """Descarta, durante a execução, os logs da aplicação (aprovações, acessos, lentidão),
+        para que as operações do banco de teste não apareçam nos arquivos de log reais."""
+        loggers = [logging.getLogger(nome) for nome in settings.LOGGING['loggers'] if nome.startswith('atividades.')]
+        originais = [(logger, logger.handlers, logger.propagate) for logger in loggers]
+        for logger in loggers:
+            logger.handlers, logger.propagate = [logging.NullHandler()], False
+        try:
+            yield
+        finally:
+            for logger, handlers, propagate in originais:
+                logger.handlers, logger.propagate = handlers, propagate
+
+    # =====================
+    # DADOS
+    # =====================
+    def _popular(self, dados):
+        self.stdout.write('Populando banco de teste (populate_initial_data + populate_massive_data)...')
+        silencioso = io.StringIO()
+        call_command('populate_initial_data', stdout=silencioso)
+        call_command(
+            'populate_massive_data',
+            **{chave: valor for chave, valor in dados.items() if valor is not None},
+            stdout=silencioso
+        )
+
+    def _cenarios(self, total_requisicoes):
+        coordenador = (
+            Coordenador.objects
+            .select_related('user', 'curso')
+            .filter(curso__alunos__atividades__status='Pendente')
+            .order_by('id')
+            .first()
+        )
+        if coordenador is None:
+            raise CommandError('Nenhum coordenador com atividades pendentes no banco de teste.')
+
+        aluno = (
+            Aluno.objects
+            .select_related('user')
+            .filter(curso=coordenador.curso, atividades__isnull=False)
+            .order_by('id')
+            .first()
+        )
+        gestor = User.objects.filter(groups__name='Gestor').order_by('id').first()
+
+        pendentes = list(
+            Atividade.objects
+            .filter(aluno__curso=coordenador.curso, status='Pendente')
+            .order_by('id')
+            .values_list('id', 'horas')[:total_requisicoes]
+        )
+        if len(pendentes) < total_requisicoes:
+            raise CommandError(f'São necessárias {total_requisicoes} atividades pendentes para o cenário de aprovação.')
+
+        def aprovar(client, i):
+            atividade_id, horas = pendentes[i]
+            return client.post(f'/aprovar-horas-atividade/{atividade_id}/', {'horas_aprovadas': horas})
+
+        # nome: (usuário, requisição)
+        return {
+            'dashboard_aluno': (aluno.user, lambda client, i: client.get('/')),
+            'dashboard_aluno_htmx': (aluno.user, lambda client, i: client.get('/', HTTP_HX_REQUEST='true')),
+            'dashboard_coordenador': (coordenador.user, lambda client, i: client.get('/')),
+            'dashboard_gestor': (gestor, lambda client, i: client.get('/')),
+            'listar_atividades_coordenador': (coordenador.user, lambda client, i: client.get('/atividades-coordenador/')),
+            'listar_alunos_coordenador': (coordenador.user, lambda client, i: client.get('/alunos-coordenador/')),
+            'aprovar_horas_atividade': (coordenador.user, aprovar),
+            'gerar_relatorio_aluno': (aluno.user, lambda client, i: client.get('/relatorio/gerar/')),
+            'listar_notificacoes': (aluno.user, lambda client, i: client.get('/notificacoes/')),
+            'contar_notificacoes': (aluno.user, lambda client, i: client.get('/notificacoes/count-nao-lidas/')),
+            'marcar_todas_lidas': (aluno.user, lambda client, i: client.post('/notificacoes/marcar-todas-lidas/')),
+        }, aluno
+
+    # =====================
+    # EXECUÇÃO
+    # =====================
+    def _executar_cenarios(self, options):
+        iteracoes, aquecimento = options['iteracoes'], options['aquecimento']
+        cenarios, aluno = self._cenarios(iteracoes + aquecimento)
+
+        selecionados = options['cenarios'] or self.CENARIOS
+
+        if 'gerar_relatorio_aluno' in selecionados:
+            self._aguardar_relatorio(aluno)
+
+        resultados = {}
+        self.stdout.write(f'\n{"Cenário":32} {"p50":>9} {"p95":>9} {"p99":>9} {"SQL":>5}')
+        for nome in selecionados:
+            usuario, requisicao = cenarios[nome]
+            client = Client()
+            client.force_login(usuario)
+
+            resultado = self._medir(client, requisicao, iteracoes, aquecimento)
+            resultados[nome] = resultado
+            self.stdout.write(
+                f'{nome:32} {resultado["p50_ms"]:>7.1f}ms {resultado["p95_ms"]:>7.1f}ms '
+                f'{resultado["p99_ms"]:>7.1f}ms {resultado["consultas_max"]:>5}'
+            )
+
+        return resultados
+
+    def _aguardar_relatorio(self, aluno, timeout=60):
+        """O relatório é gerado em segundo plano; o cenário mede a entrega do PDF já em disco"""
+        limite = time.time() + timeout
+        while RelatorioPdfService.solicitar_relatorio(aluno=aluno)[0] != RelatorioPdfService.PRONTO:
+            if time.time() > limite:
+                raise CommandError('O relatório do aluno não ficou pronto a tempo.')
+            time.sleep(0.2)
+
+    def _medir(self, client, requisicao, iteracoes, aquecimento):
+        for i in range(aquecimento):
+            self._consumir(requisicao(client, i))
+
+        tempos, consultas, status = [], [], set()
+        for i in range(aquecimento, aquecimento + iteracoes):
+            # O log de consultas tem tamanho máximo: cheio, CaptureQueriesContext não vê as novas
+            reset_queries()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                response = requisicao(client, i)
+                self._consumir(response)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas.append(len(capturadas))
+            status.add(response.status_code)
+
+        tempos.sort()
+        return {
+            'p50_ms': round(percentil(tempos, 50), 2),
+            'p95_ms': round(percentil(tempos, 95), 2),
+            'p99_ms': round(percentil(tempos, 99), 2),
+            'media_ms': round(statistics.fmean(tempos), 2),
+            'consultas_mediana': statistics.median_low(consultas),
+            'consultas_max': max(consultas),
+            'status': sorted(status),
+        }
+
+    def _consumir(self, response):
+        if response.streaming:
+            b''.join(response.streaming_content)
+        response.close()
+
+    # =====================
+    # COMPARAÇÃO
+    # =====================
+    def _comparar(self, resultados, baseline, tolerancia, folga_ms):
+        self.stdout.write(f'\nComparação com o baseline (tolerância {tolerancia:.0%}, folga {folga_ms} ms):')
+        regressoes = []
+
+        for nome, atual in resultados.items():
+            anterior = baseline.get(nome)
+            if anterior is None:
+                self.stdout.write(f'  • {nome}: sem baseline')
+                continue
+
+            problemas = []
+            limite_p95 = max(anterior['p95_ms'] * (1 + tolerancia), anterior['p95_ms'] + folga_ms)
+            if atual['p95_ms'] > limite_p95:
+                problemas.append(f'p95 {anterior["p95_ms"]} → {atual["p95_ms"]} ms')
+            if atual['consultas_max'] > anterior['consultas_max']:
+                problemas.append(f'consultas {anterior["consultas_max"]} → {atual["consultas_max"]}')
+
+            if problemas:
+                regressoes.append(nome)
+                self.stdout.write(self.style.ERROR(f'  ✗ {nome}: {"; ".join(problemas)}'))
+            else:
+                self.stdout.write(self.style.SUCCESS(
+                    f'  ✓ {nome}: p95 {anterior["p95_ms"]} → {atual["p95_ms"]} ms, '
+                    f'consultas {anterior["consultas_max"]} → {atual["consultas_max"]}'
+                ))
+
+        if regressoes:
+            raise CommandError(f'{len(regressoes)} cenário(s) pioraram em relação ao baseline: {", ".join(regressoes)}')
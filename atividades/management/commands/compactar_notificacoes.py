@@ -0,0 +1,112 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.template.defaultfilters import filesizeformat
+from django.utils import timezone
+from datetime import timedelta
+from atividades.selectors import NotificationSelectors
+from atividades.services import RetencaoNotificacoesService
+import time
+
+class Command(BaseCommand):
+    help = (
+        'Apaga (ou arquiva, com --arquivar) em lotes as notificações lidas mais antigas que a retenção '
+        'e, com --resumir, junta as lidas repetidas de cada usuário. Feito para rodar agendado (cron); '
+        'uma execução interrompida é continuada na próxima com o mesmo corte por idade.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias',
+            type=int,
+            default=settings.NOTIFICACOES_RETENCAO_DIAS,
+            help='Idade mínima, em dias, das notificações lidas removidas (padrão: NOTIFICACOES_RETENCAO_DIAS).'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=settings.NOTIFICACOES_RETENCAO_LOTE,
+            help='Notificações (ou usuários, no --resumir) por transação (padrão: NOTIFICACOES_RETENCAO_LOTE).'
+        )
+        parser.add_argument(
+            '--pausa',
+            type=int,
+            default=settings.NOTIFICACOES_RETENCAO_PAUSA_MS,
+            help='Pausa entre lotes em milissegundos, para dar vez às escritas das requisições.'
+        )
+        parser.add_argument(
+            '--arquivar',
+            action='store_true',
+            help='Grava as notificações removidas em NOTIFICACOES_ARQUIVO_DIR (JSON Lines com gzip) antes de apagá-las.'
+        )
+        parser.add_argument(
+            '--resumir',
+            action='store_true',
+            help='Junta as notificações lidas com o mesmo texto de cada usuário em uma só, com "[N×]" no início.'
+        )
+        parser.add_argument(
+            '--simular',
+            action='store_true',
+            help='Apenas informa quantas notificações seriam removidas pela retenção, sem alterar nada.'
+        )
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+        dias, tamanho_lote = options['dias'], options['lote']
+        if dias < 0 or tamanho_lote <= 0:
+            raise CommandError('--dias não pode ser negativo e --lote deve ser maior que zero.')
+
+        if options['simular']:
+            total = RetencaoNotificacoesService.antigas(limite=timezone.now() - timedelta(days=dias)).count()
+            self.stdout.write(self.style.SUCCESS(f'✓ {total} notificações lidas há mais de {dias} dias seriam removidas'))
+            return
+
+        pausa = options['pausa'] / 1000
+        espaco_antes = NotificationSelectors.espaco_ocupado()
+
+        execucao = RetencaoNotificacoesService.iniciar_execucao(dias=dias, arquivar=options['arquivar'])
+        arquivo = execucao['arquivo']
+        if execucao['continuada']:
+            self.stdout.write(
+                f'  ✓ Continuando a execução interrompida: corte em {timezone.localtime(execucao["limite"]):%d/%m/%Y %H:%M}'
+            )
+
+        removidas = RetencaoNotificacoesService.remover_antigas(
+            limite=execucao['limite'],
+            tamanho_lote=tamanho_lote,
+            arquivo=arquivo,
+            pausa=pausa,
+            progresso=self._progresso('removidas', options['verbosity']),
+        )
+        self.stdout.write(f'  ✓ Retenção: {removidas} notificações lidas há mais de {dias} dias removidas')
+        if arquivo is not None and removidas:
+            self.stdout.write(f'  ✓ Arquivadas em {arquivo}')
+
+        resumidas = 0
+        if options['resumir']:
+            resumidas = RetencaoNotificacoesService.resumir_repetidas(
+                tamanho_lote=tamanho_lote,
+                pausa=pausa,
+                progresso=self._progresso('juntadas', options['verbosity']),
+            )
+            self.stdout.write(f'  ✓ Resumos: {resumidas} notificações repetidas juntadas')
+
+        RetencaoNotificacoesService.concluir_execucao()
+
+        espaco_depois = NotificationSelectors.espaco_ocupado()
+        if espaco_antes is not None and espaco_depois is not None:
+            # No SQLite as páginas liberadas voltam para o próprio arquivo (reaproveitadas
+            # pelas próximas escritas); o arquivo só diminui com VACUUM
+            self.stdout.write(
+                f'  ✓ Espaço da tabela e índices: {filesizeformat(espaco_antes)} → {filesizeformat(espaco_depois)} '
+                f'({filesizeformat(max(espaco_antes - espaco_depois, 0))} liberados)'
+            )
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {removidas + resumidas} notificações removidas em {time.time() - tempo_inicio:.1f}s'
+        ))
+
+    def _progresso(self, acao: str, verbosity: int):
+        def mostrar(total: int):
+            if verbosity >= 2:
+                self.stdout.write(f'    ... {total} {acao}')
+        return mostrar
@@ -0,0 +1,66 @@
+from django.core.management.base import BaseCommand, CommandError
+from atividades.models import Curso, Semestre
+from atividades.selectors import AlunoSelectors
+from atividades.services import RelatorioLoteService
+import time
+
+class Command(BaseCommand):
+    help = 'Gera os relatórios em PDF de todos os alunos de um curso (opcionalmente de um semestre de ingresso) em um arquivo ZIP.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('curso_id', type=int, help='ID do curso.')
+        parser.add_argument(
+            '--semestre',
+            type=int,
+            help='ID do semestre de ingresso (padrão: todos).'
+        )
+        parser.add_argument(
+            '--saida',
+            help='Caminho do arquivo ZIP (padrão: relatorios_<curso>[_<semestre>].zip).'
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            help='Processos usados na renderização (padrão: RELATORIOS_LOTE_WORKERS, limitado aos núcleos disponíveis).'
+        )
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+
+        curso = Curso.objects.filter(id=options['curso_id']).first()
+        if not curso:
+            raise CommandError(f'Curso {options["curso_id"]} não encontrado.')
+
+        semestre = None
+        if options['semestre']:
+            semestre = Semestre.objects.filter(id=options['semestre']).first()
+            if not semestre:
+                raise CommandError(f'Semestre {options["semestre"]} não encontrado.')
+
+        alunos = AlunoSelectors.get_alunos_da_turma(curso=curso, semestre_ingresso=semestre)
+        lote = RelatorioLoteService.gerar_dados_relatorios(alunos=alunos, curso=curso, semestre_ingresso=semestre)
+        if not lote:
+            self.stdout.write(self.style.WARNING('Nenhum aluno encontrado para a turma informada.'))
+            return
+
+        saida = options['saida'] or f'relatorios_{curso.id}{f"_{semestre.id}" if semestre else ""}.zip'
+        workers = RelatorioLoteService.limitar_workers(options['workers'], total=len(lote))
+        self.stdout.write(f'Gerando {len(lote)} relatórios de {curso.nome} com {workers} processos...')
+
+        falhas = 0
+
+        def progresso(concluidos, total, aluno, sucesso):
+            nonlocal falhas
+            if not sucesso:
+                falhas += 1
+            marca = '✓' if sucesso else '✗'
+            self.stdout.write(f'  [{concluidos}/{total}] {marca} {aluno.matricula} - {aluno.nome}')
+
+        with open(saida, 'wb') as arquivo:
+            for parte in RelatorioLoteService.gerar_zip(lote=lote, max_workers=workers, progresso=progresso):
+                arquivo.write(parte)
+
+        mensagem = f'✓ {len(lote) - falhas} relatórios gerados em {saida} ({time.time() - tempo_inicio:.1f}s)'
+        self.stdout.write(self.style.SUCCESS(mensagem))
+        if falhas:
+            self.stdout.write(self.style.ERROR(f'✗ {falhas} relatórios falharam (ver erros.txt no ZIP)'))
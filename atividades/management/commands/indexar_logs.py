@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from atividades.logs_indice import IndiceLogs
+import time
+
+class Command(BaseCommand):
+    help = 'Atualiza o índice de busca dos logs (errors, business, security e desempenho) com as linhas novas desde a última execução.'
+
+    tipos = {
+        'errors': 'file_errors',
+        'business': 'file_business',
+        'security': 'file_security',
+        'desempenho': 'file_desempenho',
+    }
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+        indice = IndiceLogs()
+
+        for tipo, nome_handler in self.tipos.items():
+            handler = settings.LOGGING['handlers'][nome_handler]
+            novas = indice.indexar(
+                tipo=tipo,
+                arquivo=handler['filename'],
+                backups=handler.get('backupCount', 0)
+            )
+            self.stdout.write(f'  ✓ {tipo}: {novas} entradas novas')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ Índice de logs atualizado em {time.time() - tempo_inicio:.1f}s'))
@@ -1,330 +1,289 @@
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
+from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import User
-from atividades.models import Curso, Categoria, CategoriaCurso, Aluno, Semestre, Atividade
-from datetime import datetime, timedelta
-from django.db import connection, transaction
+from atividades.models import Curso, CategoriaCurso, Aluno, Semestre, Atividade
+from atividades.services import PendenciasService, SaldoHorasService
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, timedelta
+from django.db import transaction
+import django
+import multiprocessing
+import os
 import random
 import time
 
+# Nomes fictícios para alunos
+PRIMEIROS_NOMES = [
+    'João', 'Maria', 'Pedro', 'Ana', 'Lucas', 'Juliana', 'Carlos', 'Fernanda',
+    'Rafael', 'Beatriz', 'Bruno', 'Camila', 'Gabriel', 'Larissa', 'Felipe',
+    'Mariana', 'Diego', 'Amanda', 'Thiago', 'Letícia', 'André', 'Bianca',
+    'Rodrigo', 'Carolina', 'Leonardo', 'Isabela', 'Gustavo', 'Natália', 'Matheus',
+    'Bruna', 'Ricardo', 'Patrícia', 'Vinícius', 'Aline', 'Marcelo', 'Jéssica',
+    'Daniel', 'Vanessa', 'Paulo', 'Cristina', 'Fernando', 'Renata', 'Alexandre',
+    'Priscila', 'Fábio', 'Adriana', 'Henrique', 'Simone', 'Maurício', 'Tatiana'
+]
+
+SOBRENOMES = [
+    'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira',
+    'Rodrigues', 'Almeida', 'Nascimento', 'Carvalho', 'Araújo', 'Ribeiro', 'Martins',
+    'Rocha', 'Alves', 'Monteiro', 'Mendes', 'Barbosa', 'Cardoso', 'Castro', 'Dias',
+    'Gomes', 'Pinto', 'Ramos', 'Fernandes', 'Freitas', 'Moura', 'Cavalcanti'
+]
+
+# Nomes de atividades fictícias
+ATIVIDADES_NOMES = [
+    'Workshop de Tecnologia',
+    'Palestra sobre Inovação',
+    'Curso de Python Avançado',
+    'Seminário de Engenharia',
+    'Minicurso de Design Thinking',
+    'Congresso Nacional',
+    'Evento Acadêmico Internacional',
+    'Oficina de Desenvolvimento Web',
+    'Curso de Inglês Técnico',
+    'Participação em Mesa Redonda',
+    'Monitoria de Programação',
+    'Iniciação Científica',
+    'Publicação de Artigo',
+    'Apresentação de TCC',
+    'Curso de Gestão de Projetos',
+    'Workshop de UX/UI',
+    'Palestra sobre Inteligência Artificial',
+    'Curso de Análise de Dados',
+    'Seminário de Sustentabilidade',
+    'Minicurso de Robótica',
+    'Congresso Regional',
+    'Evento de Empreendedorismo',
+    'Oficina de Marketing Digital',
+    'Curso de Espanhol',
+    'Participação em Defesa de Mestrado',
+    'Extensão Universitária',
+    'Pesquisa de Campo',
+    'Produção de Conteúdo Digital',
+    'Curso de Fotografia',
+    'Workshop de Comunicação',
+    'Palestra sobre Liderança',
+    'Curso de Excel Avançado',
+    'Seminário de Direitos Humanos',
+    'Minicurso de Blockchain',
+    'Congresso Internacional',
+    'Evento de Networking',
+    'Oficina de Redação Científica',
+    'Curso de Alemão Básico',
+    'Participação em Banca de TCC',
+    'Projeto de Extensão',
+    'Estudo de Caso',
+    'Produção Audiovisual',
+    'Curso de Edição de Vídeo',
+    'Workshop de Produtividade',
+    'Palestra sobre Carreira',
+    'Curso de Power BI',
+    'Seminário de Ética',
+    'Minicurso de Cloud Computing',
+    'Congresso de Ciências',
+    'Evento Cultural'
+]
+
+DESCRICOES = [
+    'Participação como ouvinte no evento',
+    'Atividade realizada com aproveitamento',
+    'Curso completo com certificado',
+    'Participação ativa durante todo o evento',
+    'Aprendizado significativo na área',
+    'Experiência enriquecedora',
+    'Desenvolvimento de competências técnicas',
+    'Networking e troca de experiências',
+    'Atualização profissional',
+    'Aprofundamento teórico e prático'
+]
+
+
+def _distribuir_atividades(rng, alunos, atividades_por_aluno, assimetria):
+    """
+    Quantidade de atividades de cada aluno. Com assimetria 0 todos recebem o
+    mesmo número; acima disso segue uma distribuição de Zipf (poucos alunos
+    concentram muitas atividades) mantendo o total alunos * atividades_por_aluno.
+    """
+    if assimetria <= 0:
+        return [atividades_por_aluno] * alunos
+
+    pesos = [1 / (posicao ** assimetria) for posicao in range(1, alunos + 1)]
+    rng.shuffle(pesos)
+    total = alunos * atividades_por_aluno
+    soma = sum(pesos)
+    quantidades = [int(total * peso / soma) for peso in pesos]
+    # Sobras do arredondamento vão para os alunos de maior peso
+    for indice in sorted(range(alunos), key=pesos.__getitem__, reverse=True)[:total - sum(quantidades)]:
+        quantidades[indice] += 1
+    return quantidades
+
+
+def gerar_combinacao(tarefa: dict) -> dict:
+    """
+    Gera os alunos e atividades de uma combinação curso/semestre. Roda nos
+    processos do pool: só usa dados primitivos e não acessa o banco.
+    """
+    rng = random.Random(tarefa['seed'])
+
+    alunos = []
+    for i in range(tarefa['alunos']):
+        matricula = f'{tarefa["prefixo"]}{i + 1:04d}'
+        alunos.append((matricula, f'{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)}'))
+
+    data_inicio, data_fim = tarefa['data_inicio'], tarefa['data_fim']
+    dias_diferenca = (data_fim - data_inicio).days if data_inicio and data_fim else 0
+
+    atividades = []
+    quantidades = _distribuir_atividades(rng, tarefa['alunos'], tarefa['atividades'], tarefa['assimetria'])
+    for indice_aluno, quantidade in enumerate(quantidades):
+        for _ in range(quantidade):
+            horas = rng.randint(2, 40)
+
+            sorteio = rng.random()
+            if sorteio < tarefa['aprovadas']:
+                status, horas_aprovadas = 'Aprovada', rng.randint(int(horas * 0.8), horas)
+            elif sorteio < tarefa['aprovadas'] + tarefa['rejeitadas']:
+                status, horas_aprovadas = 'Rejeitada', 0
+            else:
+                status, horas_aprovadas = 'Pendente', None
+
+            if data_inicio and data_fim:
+                data_atividade = data_inicio + timedelta(days=rng.randint(0, max(1, dias_diferenca)))
+            else:
+                data_atividade = tarefa['hoje']
+
+            atividades.append((
+                indice_aluno,
+                rng.choice(tarefa['categorias']),
+                rng.choice(ATIVIDADES_NOMES),
+                rng.choice(DESCRICOES),
+                horas,
+                horas_aprovadas,
+                data_atividade,
+                status,
+            ))
+
+    return {'alunos': alunos, 'atividades': atividades}
+
+
+def _com_campos_busca(objeto):
+    # bulk_create não chama save(): preenche aqui as colunas normalizadas da busca
+    objeto.atualizar_campos_busca()
+    return objeto
+
+
 class Command(BaseCommand):
-    help = 'Popula o sistema com dados massivos: 50 alunos por curso/semestre e 50 atividades por aluno.'
+    help = (
+        'Popula o sistema com dados sintéticos em massa: alunos por curso/semestre e atividades por aluno, '
+        'com volume, proporção de status e assimetria configuráveis. A geração é dividida entre processos '
+        'e a inserção usa bulk_create, funcionando em qualquer banco suportado pelo Django.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--cursos', type=int, help='Limita a quantidade de cursos usados (padrão: todos).')
+        parser.add_argument('--semestres', type=int, help='Limita a quantidade de semestres usados (padrão: todos).')
+        parser.add_argument('--alunos', type=int, default=60, help='Alunos por combinação curso/semestre (padrão: 60).')
+        parser.add_argument('--atividades', type=int, default=30, help='Média de atividades por aluno (padrão: 30).')
+        parser.add_argument(
+            '--aprovadas',
+            type=float,
+            default=0.63,
+            help='Fração de atividades aprovadas (padrão: 0.63).'
+        )
+        parser.add_argument(
+            '--rejeitadas',
+            type=float,
+            default=0.07,
+            help='Fração de atividades rejeitadas; o restante fica pendente (padrão: 0.07).'
+        )
+        parser.add_argument(
+            '--assimetria',
+            type=float,
+            default=0.0,
+            help='Expoente de Zipf da distribuição de atividades entre os alunos; 0 = todos iguais (padrão: 0).'
+        )
+        parser.add_argument('--seed', type=int, default=42, help='Semente dos dados gerados (padrão: 42).')
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Processos usados para gerar os dados (padrão: número de CPUs).'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=2000,
+            help='Registros inseridos por lote (padrão: 2000).'
+        )
 
     def handle(self, *args, **options):
         tempo_inicio = time.time()
-        
+
+        if options['alunos'] < 1 or options['atividades'] < 0:
+            raise CommandError('--alunos deve ser maior que zero e --atividades não pode ser negativo.')
+        if options['alunos'] > 9999:
+            raise CommandError('--alunos aceita no máximo 9999 alunos por combinação curso/semestre.')
+        if options['aprovadas'] < 0 or options['rejeitadas'] < 0 or options['aprovadas'] + options['rejeitadas'] > 1:
+            raise CommandError('--aprovadas e --rejeitadas devem ser frações não negativas com soma até 1.')
+
         self.stdout.write(self.style.WARNING('='*60))
-        self.stdout.write(self.style.WARNING('POPULAÇÃO MASSIVA ULTRA-RÁPIDA (SQL PURO)'))
+        self.stdout.write(self.style.WARNING('POPULAÇÃO MASSIVA'))
         self.stdout.write(self.style.WARNING('='*60))
-        
-        # Otimizações SQLite
-        self.stdout.write('\n[OTIMIZAÇÃO] Configurando SQLite para máxima velocidade...')
-        with connection.cursor() as cursor:
-            cursor.execute("PRAGMA synchronous = OFF")
-            cursor.execute("PRAGMA journal_mode = MEMORY")
-            cursor.execute("PRAGMA temp_store = MEMORY")
-            cursor.execute("PRAGMA cache_size = 1000000")
-        self.stdout.write(self.style.SUCCESS('  ✓ SQLite otimizado'))
-        
-        # Buscar todos os cursos e semestres
-        cursos = list(Curso.objects.all())
-        semestres = list(Semestre.objects.all())
-        
-        if not cursos:
-            self.stdout.write(self.style.ERROR('Nenhum curso encontrado. Execute populate_initial_data primeiro.'))
-            return
-        
-        if not semestres:
-            self.stdout.write(self.style.ERROR('Nenhum semestre encontrado. Execute populate_initial_data primeiro.'))
-            return
-        
-        # Nomes fictícios para alunos
-        primeiros_nomes = [
-            'João', 'Maria', 'Pedro', 'Ana', 'Lucas', 'Juliana', 'Carlos', 'Fernanda',
-            'Rafael', 'Beatriz', 'Bruno', 'Camila', 'Gabriel', 'Larissa', 'Felipe',
-            'Mariana', 'Diego', 'Amanda', 'Thiago', 'Letícia', 'André', 'Bianca',
-            'Rodrigo', 'Carolina', 'Leonardo', 'Isabela', 'Gustavo', 'Natália', 'Matheus',
-            'Bruna', 'Ricardo', 'Patrícia', 'Vinícius', 'Aline', 'Marcelo', 'Jéssica',
-            'Daniel', 'Vanessa', 'Paulo', 'Cristina', 'Fernando', 'Renata', 'Alexandre',
-            'Priscila', 'Fábio', 'Adriana', 'Henrique', 'Simone', 'Maurício', 'Tatiana'
-        ]
-        
-        sobrenomes = [
-            'Silva', 'Santos', 'Oliveira', 'Souza', 'Lima', 'Pereira', 'Costa', 'Ferreira',
-            'Rodrigues', 'Almeida', 'Nascimento', 'Carvalho', 'Araújo', 'Ribeiro', 'Martins',
-            'Rocha', 'Alves', 'Monteiro', 'Mendes', 'Barbosa', 'Cardoso', 'Castro', 'Dias',
-            'Gomes', 'Pinto', 'Ramos', 'Fernandes', 'Freitas', 'Moura', 'Cavalcanti'
-        ]
-        
-        # Nomes de atividades fictícias
-        atividades_nomes = [
-            'Workshop de Tecnologia',
-            'Palestra sobre Inovação',
-            'Curso de Python Avançado',
-            'Seminário de Engenharia',
-            'Minicurso de Design Thinking',
-            'Congresso Nacional',
-            'Evento Acadêmico Internacional',
-            'Oficina de Desenvolvimento Web',
-            'Curso de Inglês Técnico',
-            'Participação em Mesa Redonda',
-            'Monitoria de Programação',
-            'Iniciação Científica',
-            'Publicação de Artigo',
-            'Apresentação de TCC',
-            'Curso de Gestão de Projetos',
-            'Workshop de UX/UI',
-            'Palestra sobre Inteligência Artificial',
-            'Curso de Análise de Dados',
-            'Seminário de Sustentabilidade',
-            'Minicurso de Robótica',
-            'Congresso Regional',
-            'Evento de Empreendedorismo',
-            'Oficina de Marketing Digital',
-            'Curso de Espanhol',
-            'Participação em Defesa de Mestrado',
-            'Extensão Universitária',
-            'Pesquisa de Campo',
-            'Produção de Conteúdo Digital',
-            'Curso de Fotografia',
-            'Workshop de Comunicação',
-            'Palestra sobre Liderança',
-            'Curso de Excel Avançado',
-            'Seminário de Direitos Humanos',
-            'Minicurso de Blockchain',
-            'Congresso Internacional',
-            'Evento de Networking',
-            'Oficina de Redação Científica',
-            'Curso de Alemão Básico',
-            'Participação em Banca de TCC',
-            'Projeto de Extensão',
-            'Estudo de Caso',
-            'Produção Audiovisual',
-            'Curso de Edição de Vídeo',
-            'Workshop de Produtividade',
-            'Palestra sobre Carreira',
-            'Curso de Power BI',
-            'Seminário de Ética',
-            'Minicurso de Cloud Computing',
-            'Congresso de Ciências',
-            'Evento Cultural'
-        ]
-        
-        descricoes = [
-            'Participação como ouvinte no evento',
-            'Atividade realizada com aproveitamento',
-            'Curso completo com certificado',
-            'Participação ativa durante todo o evento',
-            'Aprendizado significativo na área',
-            'Experiência enriquecedora',
-            'Desenvolvimento de competências técnicas',
-            'Networking e troca de experiências',
-            'Atualização profissional',
-            'Aprofundamento teórico e prático'
-        ]
-        
+
+        tarefas = self._planejar(options)
+        if not tarefas:
+            raise CommandError('Nenhuma combinação curso/semestre com categorias. Execute populate_initial_data primeiro.')
+
+        total_previsto = len(tarefas) * options['alunos'] * options['atividades']
+        self.stdout.write(self.style.SUCCESS(f'\n[PLANEJAMENTO]'))
+        self.stdout.write(self.style.SUCCESS(f'  → Combinações curso/semestre: {len(tarefas)}'))
+        self.stdout.write(self.style.SUCCESS(f'  → Alunos a criar: {len(tarefas) * options["alunos"]}'))
+        self.stdout.write(self.style.SUCCESS(f'  → Atividades a criar: {total_previsto}'))
+
+        workers = max(1, min(options['workers'], len(tarefas)))
+        self.stdout.write(f'\n[PROCESSAMENTO] Gerando com {workers} processo(s) e inserindo em lotes de {options["batch_size"]}...\n')
+
+        senha = make_password(None)
         total_alunos = 0
         total_atividades = 0
-        tempo_inicio = time.time()
-        
-        # Contar total de combinações
-        total_combinacoes = 0
-        for curso in cursos:
-            categorias_curso = list(CategoriaCurso.objects.filter(curso_semestre__curso=curso))
-            if categorias_curso:
-                for semestre in semestres:
-                    categorias_semestre = [cc for cc in categorias_curso if cc.curso_semestre.semestre == semestre]
-                    if categorias_semestre:
-                        total_combinacoes += 1
-        
-        self.stdout.write(self.style.SUCCESS(f'\n[PLANEJAMENTO]'))
-        self.stdout.write(self.style.SUCCESS(f'  → Combinações curso/semestre: {total_combinacoes}'))
-        self.stdout.write(self.style.SUCCESS(f'  → Alunos a criar: ~{total_combinacoes * 60}'))
-        self.stdout.write(self.style.SUCCESS(f'  → Atividades a criar: ~{total_combinacoes * 60 * 60}'))
-        
-        combinacao_atual = 0
-        
-        # Usar uma grande transação para tudo
-        with transaction.atomic():
-            self.stdout.write(f'\n[PROCESSAMENTO] Iniciando inserção em lote...\n')
-            
-            # Para cada curso
-            for idx_curso, curso in enumerate(cursos, 1):
-                # Buscar todas as categorias associadas a este curso
-                categorias_curso = list(CategoriaCurso.objects.filter(curso_semestre__curso=curso))
-                
-                if not categorias_curso:
-                    continue
-                
-                # Para cada semestre
-                for semestre in semestres:
-                    # Filtrar categorias deste semestre
-                    categorias_semestre = [cc for cc in categorias_curso if cc.curso_semestre.semestre == semestre]
-                    
-                    if not categorias_semestre:
-                        continue
-                    
-                    combinacao_atual += 1
-                    tempo_decorrido = time.time() - tempo_inicio
-                    
-                    self.stdout.write(f'[{combinacao_atual}/{total_combinacoes}] {curso.nome[:30]:30} | {semestre.nome} | {tempo_decorrido:.1f}s')
-                    
-                    # Preparar SQL em massa
-                    inicio_batch = time.time()
-                    
-                    # 1. Criar usuários em massa com SQL puro
-                    usuarios_sql = []
-                    usernames_batch = []  # Agora são matrículas
-                    nomes_batch = []  # Nomes completos
-                    
-                    for i in range(60):
-                        primeiro_nome = random.choice(primeiros_nomes)
-                        sobrenome = random.choice(sobrenomes)
-                        nome_completo = f'{primeiro_nome} {sobrenome}'
-                        # Gerar matrícula única com timestamp para evitar conflitos
-                        matricula = f'{curso.nome[:3].upper()}{semestre.nome.replace(".", "")}{i+1:03d}'
-                        email = f'{matricula.lower()}@example.com'
-                        password = 'pbkdf2_sha256$600000$salt$hash'  # Senha dummy
-                        
-                        usernames_batch.append(matricula)
-                        nomes_batch.append(nome_completo)
-                        usuarios_sql.append(
-                            f"('{matricula}', '{password}', '{email}', '', '', 0, 1, 1, datetime('now'), datetime('now'))"
-                        )
-                    
-                    # Inserir usuários (com first_name e last_name vazios)
-                    if usuarios_sql:
-                        sql = f"""
-                        INSERT OR IGNORE INTO auth_user 
-                        (username, password, email, first_name, last_name, is_superuser, is_staff, is_active, date_joined, last_login)
-                        VALUES {','.join(usuarios_sql)}
-                        """
-                        with connection.cursor() as cursor:
-                            cursor.execute(sql)
-                            rows_affected = cursor.rowcount
-                            if rows_affected > 0:
-                                total_alunos += rows_affected
-                    
-                    # 2. Buscar IDs dos usuários criados
-                    usernames_escaped = ','.join([f"'{u}'" for u in usernames_batch])
-                    with connection.cursor() as cursor:
-                        cursor.execute(
-                            f"SELECT id, username FROM auth_user WHERE username IN ({usernames_escaped})"
-                        )
-                        user_ids = {row[1]: row[0] for row in cursor.fetchall()}
-                    
-                    # 3. Criar alunos em massa com nome e matrícula
-                    alunos_sql = []
-                    for idx, matricula in enumerate(usernames_batch):
-                        if matricula in user_ids:
-                            nome_escapado = nomes_batch[idx].replace("'", "''")
-                            alunos_sql.append(
-                                f"({user_ids[matricula]}, '{nome_escapado}', '{matricula}', {curso.id}, {semestre.id})"
-                            )
-                    
-                    if alunos_sql:
-                        sql = f"""
-                        INSERT OR IGNORE INTO atividades_aluno 
-                        (user_id, nome, matricula, curso_id, semestre_ingresso_id)
-                        VALUES {','.join(alunos_sql)}
-                        """
-                        with connection.cursor() as cursor:
-                            cursor.execute(sql)
-                    
-                    # 4. Buscar IDs dos alunos
-                    user_ids_list = list(user_ids.values())
-                    user_ids_escaped = ','.join([str(uid) for uid in user_ids_list])
-                    with connection.cursor() as cursor:
-                        cursor.execute(
-                            f"SELECT id, user_id FROM atividades_aluno WHERE user_id IN ({user_ids_escaped})"
+
+        executor = None
+        if workers > 1:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=django.setup
+            )
+        try:
+            # map preserva a ordem das tarefas: o resultado não depende do número de processos
+            resultados = executor.map(gerar_combinacao, tarefas, chunksize=4) if executor else map(gerar_combinacao, tarefas)
+
+            with transaction.atomic():
+                for numero, (tarefa, dados) in enumerate(zip(tarefas, resultados), start=1):
+                    alunos, atividades = self._inserir(tarefa, dados, senha=senha, batch_size=options['batch_size'])
+                    total_alunos += alunos
+                    total_atividades += atividades
+
+                    if numero % 10 == 0 or numero == len(tarefas):
+                        self.stdout.write(
+                            f'[{numero}/{len(tarefas)}] {total_alunos} alunos, {total_atividades} atividades | '
+                            f'{time.time() - tempo_inicio:.1f}s'
                         )
-                        aluno_ids = {row[1]: row[0] for row in cursor.fetchall()}
-                    
-                    # 5. Criar atividades em massa (SUPER OTIMIZADO)
-                    atividades_sql = []
-                    batch_size = 500  # Criar em lotes de 500
-                    
-                    for username in usernames_batch:
-                        if username not in user_ids or user_ids[username] not in aluno_ids:
-                            continue
-                        
-                        aluno_id = aluno_ids[user_ids[username]]
-                        
-                        for j in range(30):
-                            categoria = random.choice(categorias_semestre)
-                            
-                            # Definir datas
-                            if semestre.data_inicio and semestre.data_fim:
-                                data_inicio = datetime.strptime(str(semestre.data_inicio), '%Y-%m-%d')
-                                data_fim = datetime.strptime(str(semestre.data_fim), '%Y-%m-%d')
-                                dias_diferenca = (data_fim - data_inicio).days
-                                data_atividade = data_inicio + timedelta(days=random.randint(0, max(1, dias_diferenca)))
-                            else:
-                                data_atividade = datetime.now()
-                            
-                            horas = random.randint(2, 40)
-                            
-                            # 70% aprovadas
-                            if random.random() < 0.7:
-                                if random.random() < 0.9:
-                                    horas_aprovadas = random.randint(int(horas * 0.8), horas)
-                                    status = 'Aprovada'
-                                else:
-                                    horas_aprovadas = 0
-                                    status = 'Rejeitada'
-                                horas_aprovadas_sql = str(horas_aprovadas)
-                            else:
-                                horas_aprovadas_sql = 'NULL'
-                                status = 'Pendente'
-                            
-                            nome = random.choice(atividades_nomes).replace("'", "''")
-                            descricao = random.choice(descricoes).replace("'", "''")
-                            data_str = data_atividade.strftime('%Y-%m-%d')
-                            
-                            atividades_sql.append(
-                                f"({aluno_id}, {categoria.id}, '{nome}', '{descricao}', {horas}, {horas_aprovadas_sql}, '{data_str}', NULL, '{status}')"
-                            )
-                            
-                            # Inserir em lotes
-                            if len(atividades_sql) >= batch_size:
-                                sql = f"""
-                                INSERT INTO atividades_atividade 
-                                (aluno_id, categoria_id, nome, descricao, horas, horas_aprovadas, data, documento, status)
-                                VALUES {','.join(atividades_sql)}
-                                """
-                                with connection.cursor() as cursor:
-                                    cursor.execute(sql)
-                                    total_atividades += cursor.rowcount
-                                atividades_sql = []
-                    
-                    # Inserir atividades restantes
-                    if atividades_sql:
-                        sql = f"""
-                        INSERT INTO atividades_atividade 
-                        (aluno_id, categoria_id, nome, descricao, horas, horas_aprovadas, data, documento, status)
-                        VALUES {','.join(atividades_sql)}
-                        """
-                        with connection.cursor() as cursor:
-                            cursor.execute(sql)
-                            total_atividades += cursor.rowcount
-                    
-                    tempo_batch = time.time() - inicio_batch
-                    self.stdout.write(f'    ✓ Lote processado em {tempo_batch:.1f}s | Total: {total_alunos} alunos, {total_atividades} atividades')
-                
-                # Feedback a cada curso
-                if idx_curso % 5 == 0:
-                    self.stdout.write(self.style.SUCCESS(f'\n  → Progresso: {idx_curso}/{len(cursos)} cursos processados\n'))
-        
-        # Restaurar configurações SQLite
-        self.stdout.write('\n[FINALIZAÇÃO] Restaurando configurações SQLite...')
-        with connection.cursor() as cursor:
-            cursor.execute("PRAGMA synchronous = FULL")
-            cursor.execute("PRAGMA journal_mode = DELETE")
-        self.stdout.write(self.style.SUCCESS('  ✓ Configurações restauradas'))
-        
+        finally:
+            if executor:
+                executor.shutdown(cancel_futures=True)
+
+        # bulk_create não passa pelos services que mantêm saldos e contadores
+        self.stdout.write('\n[FINALIZAÇÃO] Reconstruindo saldos de horas e contadores de pendências...')
+        saldos = SaldoHorasService.reconstruir_saldos(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'  ✓ {saldos} saldos reconstruídos'))
+        PendenciasService.reconstruir_contadores()
+        self.stdout.write(self.style.SUCCESS('  ✓ Contadores de pendências reconstruídos'))
+
         tempo_total = time.time() - tempo_inicio
         minutos = int(tempo_total // 60)
         segundos = tempo_total % 60
-        
+
         self.stdout.write(self.style.SUCCESS(f'\n{'='*60}'))
         self.stdout.write(self.style.SUCCESS(f'✓ POPULAÇÃO MASSIVA CONCLUÍDA!'))
         self.stdout.write(self.style.SUCCESS(f'{'='*60}'))
@@ -334,3 +293,98 @@ class Command(BaseCommand):
         if tempo_total > 0:
             self.stdout.write(self.style.SUCCESS(f'  → Velocidade: {total_atividades/tempo_total:.0f} atividades/segundo'))
         self.stdout.write(self.style.SUCCESS(f'{'='*60}'))
+
+    def _planejar(self, options):
+        """Uma tarefa por combinação curso/semestre que tenha categorias, com semente própria"""
+        cursos = Curso.objects.order_by('id')
+        semestres = Semestre.objects.order_by('id')
+        if options['cursos'] is not None:
+            cursos = cursos[:options['cursos']]
+        if options['semestres'] is not None:
+            semestres = semestres[:options['semestres']]
+        semestres = list(semestres)
+
+        categorias_por_combinacao = {}
+        for categoria_id, curso_id, semestre_id in (
+            CategoriaCurso.objects
+            .filter(curso_semestre__curso__in=list(cursos), curso_semestre__semestre__in=semestres)
+            .order_by('id')
+            .values_list('id', 'curso_semestre__curso_id', 'curso_semestre__semestre_id')
+        ):
+            categorias_por_combinacao.setdefault((curso_id, semestre_id), []).append(categoria_id)
+
+        rng = random.Random(options['seed'])
+        hoje = date.today()
+        tarefas = []
+        for curso in cursos:
+            for semestre in semestres:
+                categorias = categorias_por_combinacao.get((curso.id, semestre.id))
+                if not categorias:
+                    continue
+                tarefas.append({
+                    'prefixo': f'{curso.nome[:3].upper()}{curso.id:03d}{semestre.nome.replace(".", "")}',
+                    'curso_id': curso.id,
+                    'semestre_id': semestre.id,
+                    'data_inicio': semestre.data_inicio,
+                    'data_fim': semestre.data_fim,
+                    'hoje': hoje,
+                    'categorias': categorias,
+                    'alunos': options['alunos'],
+                    'atividades': options['atividades'],
+                    'aprovadas': options['aprovadas'],
+                    'rejeitadas': options['rejeitadas'],
+                    'assimetria': options['assimetria'],
+                    'seed': rng.getrandbits(64),
+                })
+        return tarefas
+
+    def _inserir(self, tarefa, dados, *, senha, batch_size):
+        """Insere uma combinação; alunos já existentes (mesma matrícula) são reaproveitados"""
+        matriculas = [matricula for matricula, _ in dados['alunos']]
+        existentes = set(User.objects.filter(username__in=matriculas).values_list('username', flat=True))
+
+        User.objects.bulk_create(
+            [
+                User(username=matricula, password=senha, email=f'{matricula.lower()}@example.com')
+                for matricula in matriculas
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        usuarios = User.objects.in_bulk(matriculas, field_name='username')
+
+        Aluno.objects.bulk_create(
+            [
+                _com_campos_busca(Aluno(
+                    user_id=usuarios[matricula].id,
+                    nome=nome,
+                    matricula=matricula,
+                    curso_id=tarefa['curso_id'],
+                    semestre_ingresso_id=tarefa['semestre_id'],
+                ))
+                for matricula, nome in dados['alunos']
+            ],
+            batch_size=batch_size,
+            ignore_conflicts=True
+        )
+        alunos = Aluno.objects.in_bulk(matriculas, field_name='matricula')
+        aluno_ids = [alunos[matricula].id for matricula in matriculas]
+
+        Atividade.objects.bulk_create(
+            (
+                _com_campos_busca(Atividade(
+                    aluno_id=aluno_ids[indice_aluno],
+                    categoria_id=categoria_id,
+                    nome=nome,
+                    descricao=descricao,
+                    horas=horas,
+                    horas_aprovadas=horas_aprovadas,
+                    data=data_atividade,
+                    status=status,
+                ))
+                for indice_aluno, categoria_id, nome, descricao, horas, horas_aprovadas, data_atividade, status in dados['atividades']
+            ),
+            batch_size=batch_size
+        )
+
+        return len(matriculas) - len(existentes), len(dados['atividades'])
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from atividades.services import PendenciasService
+import time
+
+class Command(BaseCommand):
+    help = 'Reconstrói (ou apenas verifica, com --verificar) os contadores de atividades pendentes de alunos e cursos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Apenas compara os contadores gravados com os calculados, sem alterar nada.'
+        )
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+
+        if options['verificar']:
+            divergencias = PendenciasService.verificar_contadores()
+            for modelo, id_registro, esperado, gravado in divergencias[:50]:
+                self.stdout.write(f'  ✗ {modelo}={id_registro} | esperado={esperado} | gravado={gravado}')
+            if len(divergencias) > 50:
+                self.stdout.write(f'  ... e mais {len(divergencias) - 50} divergências')
+
+            if divergencias:
+                raise CommandError(f'{len(divergencias)} contadores divergentes. Execute o comando sem --verificar para reconstruí-los.')
+
+            self.stdout.write(self.style.SUCCESS(f'✓ Contadores consistentes ({time.time() - tempo_inicio:.1f}s)'))
+            return
+
+        PendenciasService.reconstruir_contadores()
+        self.stdout.write(self.style.SUCCESS(f'✓ Contadores de pendências reconstruídos em {time.time() - tempo_inicio:.1f}s'))
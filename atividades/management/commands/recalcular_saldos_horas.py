@@ -0,0 +1,41 @@
+from django.core.management.base import BaseCommand, CommandError
+from atividades.services import SaldoHorasService
+import time
+
+class Command(BaseCommand):
+    help = 'Reconstrói (ou apenas verifica, com --verificar) os saldos de horas por aluno e categoria a partir das atividades.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Apenas compara os saldos gravados com os calculados, sem alterar nada.'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Quantidade de saldos inseridos por lote na reconstrução (padrão: 1000).'
+        )
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+
+        if options['verificar']:
+            divergencias = SaldoHorasService.verificar_saldos()
+            for aluno_id, categoria_id, esperado, gravado in divergencias[:50]:
+                self.stdout.write(
+                    f'  ✗ aluno={aluno_id} categoria={categoria_id} | '
+                    f'esperado (aprovadas, pendentes, válidas)={esperado} | gravado={gravado}'
+                )
+            if len(divergencias) > 50:
+                self.stdout.write(f'  ... e mais {len(divergencias) - 50} divergências')
+
+            if divergencias:
+                raise CommandError(f'{len(divergencias)} saldos divergentes. Execute o comando sem --verificar para reconstruí-los.')
+
+            self.stdout.write(self.style.SUCCESS(f'✓ Saldos consistentes ({time.time() - tempo_inicio:.1f}s)'))
+            return
+
+        total = SaldoHorasService.reconstruir_saldos(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ {total} saldos reconstruídos em {time.time() - tempo_inicio:.1f}s'))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+from atividades.services import BuscaService
+import time
+
+class Command(BaseCommand):
+    help = 'Recalcula (ou apenas verifica, com --verificar) as colunas normalizadas usadas na busca de alunos e atividades.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Apenas lista os registros com colunas de busca desatualizadas, sem alterar nada.'
+        )
+
+    def handle(self, *args, **options):
+        tempo_inicio = time.time()
+
+        if options['verificar']:
+            divergencias = BuscaService.verificar()
+            for modelo, id_registro in divergencias[:50]:
+                self.stdout.write(f'  ✗ {modelo}={id_registro}')
+            if len(divergencias) > 50:
+                self.stdout.write(f'  ... e mais {len(divergencias) - 50} divergências')
+
+            if divergencias:
+                raise CommandError(f'{len(divergencias)} registros desatualizados. Execute o comando sem --verificar para reindexá-los.')
+
+            self.stdout.write(self.style.SUCCESS(f'✓ Colunas de busca consistentes ({time.time() - tempo_inicio:.1f}s)'))
+            return
+
+        alterados = BuscaService.reindexar()
+        resumo = ', '.join(f'{modelo}: {total}' for modelo, total in alterados.items())
+        self.stdout.write(self.style.SUCCESS(f'✓ Busca reindexada em {time.time() - tempo_inicio:.1f}s ({resumo})'))
@@ -28,6 +28,9 @@ class Command(BaseCommand):
         self.stdout.write(self.style.NOTICE('Populando dados massivos para testes...'))
         call_command('populate_massive_data')
 
+        self.stdout.write(self.style.NOTICE('Reconstruindo saldos de horas por aluno e categoria...'))
+        call_command('recalcular_saldos_horas')
+
         # self.stdout.write(self.style.NOTICE('Iniciando servidor de desenvolvimento...'))
         # call_command('runserver')
 
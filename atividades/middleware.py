@@ -4,11 +4,22 @@ Middleware completo para capturar TODOS os tipos de erros e exceções do sistem
 
 import logging
 import sys
+import time
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from contextvars import ContextVar
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
+from django.utils.functional import SimpleLazyObject
+from whitenoise.middleware import WhiteNoiseMiddleware
+from atividades.desempenho import registrar_amostra
+from atividades.selectors import UserSelectors
 
 # Logger para erros críticos
 error_logger = logging.getLogger('django')
 
+# Logger para requisições acima de DESEMPENHO_LIMITE_LENTO_MS
+desempenho_logger = logging.getLogger('atividades.desempenho')
+
 
 class ErrorLoggingMiddleware(MiddlewareMixin):
     """
@@ -54,3 +65,152 @@ class ErrorLoggingMiddleware(MiddlewareMixin):
                 )
         
         return response
+
+
+class PerfilUsuarioMiddleware(MiddlewareMixin):
+    """
+    Disponibiliza request.perfil (grupos, aluno e coordenador do usuário).
+    O perfil é resolvido sob demanda, no máximo uma vez por requisição, e
+    reaproveitado por UserSelectors, mixins, filtros e templates.
+    """
+
+    def process_request(self, request):
+        request.perfil = SimpleLazyObject(lambda: UserSelectors.get_perfil(request.user))
+
+
+class _ContadorSQL:
+    """Consultas e tempo gasto no banco pela requisição em andamento"""
+
+    def __init__(self):
+        self.consultas = 0
+        self.tempo = 0.0
+
+
+# Contador da requisição em andamento. Uma ContextVar (e não connection.execute_wrapper)
+# porque no ASGI as views síncronas rodam em outra thread, com outra conexão: o contexto
+# é copiado para essa thread pelo sync_to_async, a conexão não
+_contador_atual = ContextVar('contador_sql', default=None)
+
+
+def contar_consultas(execute, sql, params, many, context):
+    """execute_wrapper instalado em toda conexão (AtividadesConfig.ready)"""
+    contador = _contador_atual.get()
+    if contador is None:
+        return execute(sql, params, many, context)
+
+    inicio = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        contador.tempo += time.perf_counter() - inicio
+        contador.consultas += 1
+
+
+def instalar_contador_consultas(sender, connection, **kwargs):
+    """Receiver de connection_created"""
+    if contar_consultas not in connection.execute_wrappers:
+        connection.execute_wrappers.append(contar_consultas)
+
+
+class DesempenhoMiddleware:
+    """
+    Mede tempo total, quantidade de consultas e tempo de banco por view
+    (separando requisições HTMX). Alimenta os percentis da página de
+    desempenho e registra no log as requisições acima do limite configurado.
+    Funciona nos dois modos, como o MiddlewareMixin: no ASGI não obriga o
+    Django a adaptar para síncrona a cadeia inteira de middlewares.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+
+        contador = _ContadorSQL()
+        token = _contador_atual.set(contador)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            _contador_atual.reset(token)
+
+        self._registrar(request, response, contador, (time.perf_counter() - inicio) * 1000)
+        return response
+
+    async def __acall__(self, request):
+        contador = _ContadorSQL()
+        token = _contador_atual.set(contador)
+        inicio = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            _contador_atual.reset(token)
+
+        self._registrar(request, response, contador, (time.perf_counter() - inicio) * 1000)
+        return response
+
+    def _registrar(self, request, response, contador, duracao_ms):
+        resolver_match = getattr(request, 'resolver_match', None)
+        if resolver_match is None:
+            return
+
+        view = resolver_match.view_name
+        htmx = bool(request.headers.get('HX-Request'))
+        sql_ms = contador.tempo * 1000
+
+        registrar_amostra(
+            view=view,
+            htmx=htmx,
+            duracao_ms=duracao_ms,
+            sql_consultas=contador.consultas,
+            sql_ms=sql_ms
+        )
+
+        if duracao_ms >= settings.DESEMPENHO_LIMITE_LENTO_MS:
+            user = getattr(request, 'user', None)
+            username = user.username if user is not None and user.is_authenticated else 'Anonymous'
+            desempenho_logger.warning(
+                f"REQUISIÇÃO LENTA: {view} em {request.path} | {request.method} | "
+                f"{duracao_ms:.0f} ms | SQL: {contador.consultas} consultas em {sql_ms:.0f} ms | "
+                f"HTMX: {'sim' if htmx else 'não'} | Status: {response.status_code} | User: {username}"
+            )
+
+
+class ArquivosEstaticosMiddleware(WhiteNoiseMiddleware):
+    """
+    WhiteNoiseMiddleware que também funciona no modo assíncrono. O original é só
+    síncrono e, sendo o último da lista, faria o Django adaptar para síncrona toda
+    a cadeia acima dele no ASGI; aqui só a entrega de um arquivo estático vai para
+    uma thread.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings)
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        return super().__call__(request)
+
+    async def __acall__(self, request):
+        if self.autorefresh:
+            static_file = await sync_to_async(self.find_file)(request.path_info)
+        else:
+            static_file = self.files.get(request.path_info)
+        if static_file is not None:
+            return await sync_to_async(self.serve)(static_file, request)
+        return await self.get_response(request)
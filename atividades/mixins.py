@@ -1,8 +1,14 @@
+import hashlib
 import logging
+from django.conf import settings
 from django.contrib import messages
+from django.core.cache import cache
+from django.db import connection
+from django.http import HttpResponse
 from django.shortcuts import redirect
 from django.contrib.auth.mixins import UserPassesTestMixin
-from atividades.selectors import UserSelectors
+from atividades.selectors import UserSelectors, busca_sequencia_key, get_geracoes_tabelas, lista_htmx_cache_key
+from atividades.utils import RegistroTabelasLidas
 
 security_logger = logging.getLogger('atividades.security')
 
@@ -59,13 +65,89 @@ class LoginRequiredMixin(UserPassesTestMixin):
         messages.warning(self.request, 'Por favor, faça login para continuar.')
         return redirect('login')
     
+class ListaAoVivoMixin:
+    """
+    Para listas filtradas ao vivo pelo HTMX (hx-trigger="change, keyup delay:200ms").
+
+    - Cada requisição do filtro traz o cabeçalho X-Busca-Seq (static/js/busca_ao_vivo.js).
+      A maior sequência vista por sessão/view fica no cache, e uma busca já superada
+      por outra mais nova recebe 204 (o HTMX não faz o swap) antes de consultar o
+      banco e de novo antes de renderizar.
+    - O HTML das respostas HTMX fica LISTAS_CACHE_TTL segundos em cache por view,
+      usuário, sessão (o HTML leva o token CSRF) e parâmetros GET. Junto vão as
+      gerações das tabelas lidas ao montá-lo; qualquer escrita nelas descarta a
+      entrada. Repetir uma busca (ex.: apagar a última letra) não consulta o banco.
+    """
+
+    def get(self, request, *args, **kwargs):
+        if not request.headers.get('HX-Request') or not request.session.session_key:
+            return super().get(request, *args, **kwargs)
+
+        sequencia = self._registrar_sequencia()
+        if self._busca_superada(sequencia):
+            return HttpResponse(status=204)
+
+        chave = self._chave_lista()
+        entrada = cache.get(chave)
+        if entrada is not None:
+            tabelas, geracoes, conteudo = entrada
+            if get_geracoes_tabelas(tabelas) == geracoes:
+                return HttpResponse(conteudo)
+
+        # O registro lê a geração de cada tabela antes da primeira consulta a ela:
+        # uma escrita durante a montagem já invalida a entrada
+        registro = RegistroTabelasLidas(connection)
+        with connection.execute_wrapper(registro):
+            response = super().get(request, *args, **kwargs)
+            response.render()
+
+        if self._busca_superada(sequencia):
+            return HttpResponse(status=204)
+        if response.status_code == 200:
+            tabelas = sorted(registro.geracoes)
+            cache.set(
+                chave,
+                (tabelas, [registro.geracoes[tabela] for tabela in tabelas], response.content),
+                settings.LISTAS_CACHE_TTL
+            )
+        return response
+
+    def _chave_lista(self):
+        request = self.request
+        # Parâmetros vazios equivalem a ausentes; a ordem na URL não importa
+        parametros = sorted((nome, valor) for nome, valor in request.GET.items() if valor.strip())
+        assinatura = hashlib.sha1(repr((
+            request.resolver_match.view_name,
+            request.user.pk,
+            request.session.session_key,
+            parametros,
+        )).encode()).hexdigest()
+        return lista_htmx_cache_key(assinatura)
+
+    def _registrar_sequencia(self):
+        try:
+            sequencia = int(self.request.headers.get('X-Busca-Seq', ''))
+        except ValueError:
+            return None
+        chave = busca_sequencia_key(self.request.session.session_key, self.request.resolver_match.view_name)
+        if sequencia > cache.get(chave, 0):
+            cache.set(chave, sequencia, 300)
+        return sequencia
+
+    def _busca_superada(self, sequencia):
+        if sequencia is None:
+            return False
+        chave = busca_sequencia_key(self.request.session.session_key, self.request.resolver_match.view_name)
+        return cache.get(chave, 0) > sequencia
+
+
 def create_log(*, user, route):
     if not user.is_authenticated:
         security_logger.warning(
                     f"ACESSO NEGADO: Usuário anônimo tentou acessar a rota '{route}' sem permissão."
                     )
     else:
-        group = user.groups.first().name if user.groups.exists() else "Aluno"
+        group = UserSelectors.get_user_primary_group(user) or "Aluno"
         security_logger.warning(
                         f"ACESSO NEGADO: Usuário {user.username} ({group})"
                         f" tentou acessar a rota '{route}' sem permissão."
@@ -1,5 +1,6 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from atividades.busca import normalizar_busca
 from atividades.validators import ValidadorDeArquivo, ValidadorDeHoras
 from django.utils.formats import date_format
 
@@ -7,9 +8,22 @@ class BaseModel(models.Model):
     created_at = models.DateTimeField(auto_now_add=True, null=True, blank=True, editable=False)
     updated_at = models.DateTimeField(auto_now=True, null=True, blank=True, editable=False)
 
+    # Campos mantidos só por UPDATE com F() (ex.: PendenciasService): um save()
+    # completo de uma instância já existente não os grava, senão sobrescreveria
+    # com o valor lido no início da requisição as mudanças feitas nesse meio tempo
+    CONTADORES = ()
+
     class Meta:
         abstract = True
 
+    def save(self, **kwargs):
+        if self.CONTADORES and kwargs.get('update_fields') is None and not self._state.adding:
+            kwargs['update_fields'] = [
+                campo.name for campo in self._meta.concrete_fields
+                if not campo.primary_key and campo.name not in self.CONTADORES
+            ]
+        return super().save(**kwargs)
+
 class Semestre(BaseModel):
     nome = models.CharField(max_length=20)
     data_inicio = models.DateField(null=True, blank=True)
@@ -35,6 +49,11 @@ class Categoria(BaseModel):
 class Curso(BaseModel):
     nome = models.CharField(max_length=100)
     horas_requeridas = models.PositiveIntegerField(help_text="Horas totais necessárias para conclusão do curso. (Será aplicado somente para novos semestres!)")
+    # Contadores mantidos por PendenciasService a cada mudança de status
+    atividades_pendentes = models.PositiveIntegerField(default=0, editable=False)
+    alunos_com_pendencias = models.PositiveIntegerField(default=0, editable=False)
+
+    CONTADORES = ('atividades_pendentes', 'alunos_com_pendencias')
     
     def __str__(self):
         return self.nome
@@ -70,20 +89,18 @@ class CategoriaCurso(BaseModel):
         return f"{self.categoria.nome} ({self.limite_horas}h)"
     
     def ultrapassou_limite_pelo_aluno(self, aluno):
-        from atividades.selectors import AtividadeSelectors
-        total_horas = AtividadeSelectors.get_total_horas_aluno(
+        from atividades.selectors import SaldoHorasSelectors
+        total_horas = SaldoHorasSelectors.get_horas_aprovadas(
             aluno=aluno,
-            categoria=self,
-            apenas_aprovadas=True
+            categoria=self
         )
         return total_horas > self.limite_horas
     
     def atingiu_limite_pelo_aluno(self, aluno):
-        from atividades.selectors import AtividadeSelectors
-        total_horas = AtividadeSelectors.get_total_horas_aluno(
+        from atividades.selectors import SaldoHorasSelectors
+        total_horas = SaldoHorasSelectors.get_horas_aprovadas(
             aluno=aluno,
-            categoria=self,
-            apenas_aprovadas=True
+            categoria=self
         )
         return total_horas >= self.limite_horas
     
@@ -100,15 +117,45 @@ class Aluno(BaseModel):
     matricula = models.CharField(max_length=20, unique=True, help_text="Matrícula do aluno")
     curso = models.ForeignKey(Curso, on_delete=models.PROTECT, related_name='alunos')
     semestre_ingresso = models.ForeignKey('Semestre', on_delete=models.PROTECT, null=True, blank=True)
+    # Mantido por PendenciasService a cada mudança de status das atividades
+    atividades_pendentes = models.PositiveIntegerField(default=0, editable=False)
+    # Cópias normalizadas (sem acento, minúsculas) usadas pela busca; ver atividades/busca.py
+    nome_busca = models.CharField(max_length=200, default='', editable=False)
+    matricula_busca = models.CharField(max_length=20, default='', editable=False)
 
     class Meta:
         indexes = [
             models.Index(fields=['matricula'], name='aluno_matricula_idx'),
+            models.Index(fields=['curso', 'atividades_pendentes'], name='aluno_curso_pendentes_idx'),
         ]
 
+    CONTADORES = ('atividades_pendentes',)
+
     def __str__(self):
         return f"{self.nome} - {self.matricula} ({self.semestre_ingresso})"
 
+    def atualizar_campos_busca(self):
+        # A normalização pode expandir alguns caracteres (ex.: ß → ss)
+        self.nome_busca = normalizar_busca(self.nome)[:200]
+        self.matricula_busca = normalizar_busca(self.matricula)[:20]
+
+    def save(self, **kwargs):
+        self.atualizar_campos_busca()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None:
+            if 'nome' in update_fields:
+                update_fields = {*update_fields, 'nome_busca'}
+            if 'matricula' in update_fields:
+                update_fields = {*update_fields, 'matricula_busca'}
+            kwargs['update_fields'] = update_fields
+        # Troca de curso leva as pendências do aluno junto (signals.transferir_pendencias_de_curso)
+        with transaction.atomic():
+            return super().save(**kwargs)
+
+    @property
+    def tem_pendencia(self) -> bool:
+        return self.atividades_pendentes > 0
+
 class Atividade(BaseModel):
 
     status_choices = [
@@ -128,6 +175,8 @@ class Atividade(BaseModel):
     data = models.DateField()
     documento = models.FileField(upload_to='comprovantes/', null=True, blank=True)
     status = models.CharField(max_length=20, choices=status_choices, default='Pendente')
+    # Cópia normalizada do nome usada pela busca; ver atividades/busca.py
+    nome_busca = models.CharField(max_length=70, default='', editable=False)
 
     class Meta:
         indexes = [
@@ -146,12 +195,51 @@ class Atividade(BaseModel):
         
         return super().clean()
     
+    def atualizar_campos_busca(self):
+        self.nome_busca = normalizar_busca(self.nome)[:70]
+
     def save(self):
         self.clean()
+        self.atualizar_campos_busca()
         return super().save()
     
+class SaldoHorasAluno(BaseModel):
+    """
+    Saldo desnormalizado de horas do aluno por categoria do curso.
+    Mantido pelo AtividadeService; pode ser reconstruído com o comando recalcular_saldos_horas.
+    """
+    aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name='saldos_horas')
+    categoria_curso = models.ForeignKey(CategoriaCurso, on_delete=models.CASCADE, related_name='saldos_horas')
+    horas_aprovadas = models.PositiveIntegerField(default=0, help_text="Soma das horas aprovadas na categoria")
+    horas_pendentes = models.PositiveIntegerField(default=0, help_text="Soma das horas de atividades pendentes na categoria")
+    horas_validas = models.PositiveIntegerField(default=0, help_text="Horas aprovadas limitadas ao limite da categoria")
+
+    class Meta:
+        unique_together = ('aluno', 'categoria_curso')
+
+    def __str__(self):
+        return f"{self.aluno} - {self.categoria_curso} ({self.horas_validas}h)"
+    
 class Notificacao(models.Model):
     user = models.ForeignKey(User, on_delete=models.CASCADE)
     texto = models.CharField(max_length=255)
     criada_em = models.DateTimeField(auto_now_add=True)
-    lida = models.BooleanField(default=False)
\ No newline at end of file
+    lida = models.BooleanField(default=False)
+
+    class Meta:
+        indexes = [
+            # Não lidas do usuário já na ordem do dropdown (mais recentes primeiro). Parcial porque
+            # lida=False vira "NOT lida" no SQL, que não usaria a coluna lida de um índice composto
+            models.Index(fields=['user', '-criada_em'], condition=models.Q(lida=False), name='notif_nao_lidas_user_idx'),
+            # Lidas por idade, para a limpeza em lotes (compactar_notificacoes)
+            models.Index(fields=['criada_em'], condition=models.Q(lida=True), name='notif_lidas_criada_idx'),
+        ]
+
+
+class ContadorNotificacoes(models.Model):
+    """Notificações não lidas por usuário, mantido por NotificacaoService"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='contador_notificacoes')
+    nao_lidas = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.user} - {self.nao_lidas} não lidas"
@@ -9,6 +9,7 @@ from reportlab.platypus import (
 from reportlab.lib.enums import TA_CENTER
 from django.conf import settings
 from datetime import datetime
+import io
 import os
 
 
@@ -173,3 +174,10 @@ class RelatorioAlunoPdfBuilder:
                 self.style_normal
             )
         )
+
+
+def renderizar_relatorio_pdf(dados) -> bytes:
+    """Renderiza o relatório em memória (executado nos processos da geração em lote)"""
+    buffer = io.BytesIO()
+    RelatorioAlunoPdfBuilder(response=buffer, dados=dados).build()
+    return buffer.getvalue()
@@ -1,8 +1,24 @@
-from django.db.models import QuerySet, OuterRef, Exists, Prefetch, Sum, Q
-from django.db.models.functions import Coalesce
-from typing import Optional, List
-from .models import Atividade, Aluno, Categoria, Curso, Coordenador, CategoriaCurso, CursoPorSemestre, Notificacao, Semestre
+from dataclasses import dataclass
+from django.contrib.auth.models import Group, User
+from django.core.cache import cache
+from django.db import DatabaseError, connection, transaction
+from django.db.models import QuerySet, OuterRef, Prefetch, Sum, Q, F, Case, When, BooleanField, Count, ExpressionWrapper, FilteredRelation, FloatField, StringAgg, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Least, Round
+from typing import Dict, Iterable, NamedTuple, Optional, List, Tuple
+from .models import Atividade, Aluno, Categoria, Curso, ContadorNotificacoes, Coordenador, CategoriaCurso, CursoPorSemestre, Notificacao, SaldoHorasAluno, Semestre
 from django.utils import timezone
+import time
+
+
+def _horas_validas_case(soma: str, limite: str) -> Case:
+    """Limita a soma da categoria ao limite de horas (limite 0 = sem limite)"""
+    return Case(
+        When(
+            Q(**{f'{limite}__gt': 0}) & Q(**{f'{soma}__gt': F(limite)}),
+            then=F(limite)
+        ),
+        default=F(soma),
+    )
 
 class AtividadeSelectors:
     
@@ -43,6 +59,34 @@ class AtividadeSelectors:
             'categoria__categoria'
         ).order_by('-created_at')[:limite]
     
+    @staticmethod
+    def get_assinatura_relatorio(aluno: Aluno) -> List[tuple]:
+        """Campos que aparecem no relatório em PDF do aluno (base do fingerprint do arquivo)"""
+        return list(
+            aluno.atividades
+            .order_by('id')
+            .values_list(
+                'id',
+                'nome',
+                'horas_aprovadas',
+                'updated_at',
+                'categoria_id',
+                'categoria__limite_horas',
+                'categoria__updated_at',
+                'categoria__categoria__nome',
+                'categoria__curso_semestre__horas_requeridas',
+            )
+        )
+    
+    @staticmethod
+    def get_atividades_dos_alunos(alunos: Iterable[Aluno]) -> QuerySet[Atividade]:
+        """Atividades de vários alunos, na mesma ordem de get_atividades_aluno"""
+        return Atividade.objects.filter(
+            aluno__in=alunos
+        ).select_related(
+            'categoria__categoria',
+        ).order_by('horas_aprovadas', '-created_at')
+    
     @staticmethod
     def get_atividades_pendentes(curso=None):
         atividades = Atividade.objects.filter(status='Pendente')
@@ -54,14 +98,19 @@ class AtividadeSelectors:
             'categoria__categoria'
         ).order_by('created_at')
     
+    @staticmethod
+    def get_atividades_do_curso_por_ids(*, ids, curso) -> QuerySet[Atividade]:
+        """Atividades selecionadas que pertencem a alunos do curso"""
+        return Atividade.objects.filter(id__in=ids, aluno__curso=curso)
+    
     @staticmethod
     def get_num_atividades_pendentes(*, curso=None, aluno=None) -> int:
-        atividades = Atividade.objects.filter(status='Pendente')
-        if curso:
-            atividades = atividades.filter(aluno__curso=curso)
+        """Lê os contadores mantidos por PendenciasService (sem percorrer as atividades)"""
         if aluno:
-            atividades = atividades.filter(aluno=aluno)
-        return atividades.count()
+            return Aluno.objects.filter(id=aluno.id).values_list('atividades_pendentes', flat=True).first() or 0
+        if curso:
+            return Curso.objects.filter(id=curso.id).values_list('atividades_pendentes', flat=True).first() or 0
+        return Curso.objects.aggregate(total=Coalesce(Sum('atividades_pendentes'), 0))['total']
 
     @staticmethod
     def get_total_horas_aluno(
@@ -160,18 +209,21 @@ class CategoriaCursoSelectors:
     @staticmethod
     def get_categorias_curso_usuario(user) -> QuerySet['CategoriaCurso']:
         """Retorna categorias de curso visíveis para o usuário"""
-        if user.groups.filter(name='Gestor').exists():
+        perfil = UserSelectors.get_perfil(user)
+        if perfil.is_gestor:
             return CategoriaCurso.objects.select_related('curso_semestre', 'categoria').all()
-        elif user.groups.filter(name='Coordenador').exists():
-            try:
-                coordenador = Coordenador.objects.get(user=user)
-                return CategoriaCurso.objects.select_related('curso_semestre', 'categoria').filter(curso_semestre__curso=coordenador.curso)
-            except Coordenador.DoesNotExist:
+        elif perfil.is_coordenador:
+            if perfil.coordenador is None:
                 return CategoriaCurso.objects.none()
+            return CategoriaCurso.objects.select_related('curso_semestre', 'categoria').filter(curso_semestre__curso_id=perfil.coordenador.curso_id)
         return CategoriaCurso.objects.none()
     
     @staticmethod
-    def get_categorias_curso_com_horas_por_aluno(*, aluno):
+    def get_categorias_curso_com_horas_por_aluno(*, aluno) -> QuerySet['CategoriaCurso']:
+        """
+        Categorias do curso/semestre do aluno anotadas a partir do saldo de horas
+        (uma linha de saldo por categoria, sem agregar as atividades).
+        """
         return (
             CategoriaCurso.objects
             .filter(
@@ -179,62 +231,120 @@ class CategoriaCursoSelectors:
                 curso_semestre__semestre_id=aluno.semestre_ingresso_id,
             )
             .annotate(
-                horas_aprovadas_total=Coalesce(
-                    Sum(
-                        'atividade__horas_aprovadas',
-                        filter=Q(
-                            atividade__aluno_id=aluno.id,
-                            atividade__horas_aprovadas__isnull=False
-                        )
-                    ),
-                    0
+                saldo_aluno=FilteredRelation(
+                    'saldos_horas',
+                    condition=Q(saldos_horas__aluno_id=aluno.id)
                 )
             )
-            .select_related('categoria')
+            .annotate(
+                horas_aprovadas_total=Coalesce(F('saldo_aluno__horas_aprovadas'), 0),
+                horas_pendentes_total=Coalesce(F('saldo_aluno__horas_pendentes'), 0),
+                horas_validas_total=Coalesce(F('saldo_aluno__horas_validas'), 0),
+            )
+            .select_related('categoria', 'curso_semestre')
             .only(
                 'id', 
                 'limite_horas', 
                 'equivalencia_horas',
-                'categoria__nome'
+                'categoria__nome',
+                'curso_semestre__horas_requeridas',
+            )
+            .order_by('categoria__nome')
+        )
+
+    @staticmethod
+    def get_categorias_menu_aluno(*, aluno) -> Tuple['CategoriaMenu', ...]:
+        """Mesmas categorias de get_categorias_curso_com_horas_por_aluno, como tuplas (sem instanciar models)"""
+        return tuple(
+            CategoriaMenu(*linha)
+            for linha in CategoriaCursoSelectors.get_categorias_curso_com_horas_por_aluno(aluno=aluno).values_list(
+                'id', 'categoria__nome', 'equivalencia_horas', 'limite_horas', 'horas_aprovadas_total'
+            )
+        )
+
+    @staticmethod
+    def get_categorias_curso_com_horas_validas(*, aluno, apenas_aprovadas: bool = False) -> QuerySet['CategoriaCurso']:
+        """
+        Categorias do curso/semestre do aluno anotadas com a soma bruta
+        (horas_soma) e a soma limitada ao limite da categoria (horas_validas).
+        """
+        campo = 'horas_aprovadas' if apenas_aprovadas else 'horas'
+        return (
+            CategoriaCurso.objects
+            .filter(
+                curso_semestre__curso_id=aluno.curso_id,
+                curso_semestre__semestre_id=aluno.semestre_ingresso_id,
+            )
+            .annotate(
+                ativ_aluno=FilteredRelation(
+                    'atividade',
+                    condition=Q(atividade__aluno_id=aluno.id)
+                )
             )
+            .annotate(horas_soma=Coalesce(Sum(f'ativ_aluno__{campo}'), 0))
+            .annotate(horas_validas=_horas_validas_case('horas_soma', 'limite_horas'))
+            .select_related('categoria')
             .order_by('categoria__nome')
         )
     
 class AlunoSelectors:
 
-    def _with_pendencia_annotation(queryset: QuerySet[Aluno]) -> QuerySet[Aluno]:
-        pendentes = Atividade.objects.filter(
-            aluno=OuterRef('pk'),
-            status='Pendente'
+    @staticmethod
+    def _with_progresso_annotation(queryset: QuerySet[Aluno]) -> QuerySet[Aluno]:
+        """
+        Anota horas_validas (soma dos saldos já limitados), horas_requeridas do
+        CursoPorSemestre e progresso_percentual (0-100), tudo calculado no banco.
+        """
+        horas_validas = (
+            SaldoHorasAluno.objects
+            .filter(
+                aluno_id=OuterRef('pk'),
+                categoria_curso__curso_semestre__curso_id=OuterRef('curso_id'),
+                categoria_curso__curso_semestre__semestre_id=OuterRef('semestre_ingresso_id'),
+            )
+            .values('aluno_id')
+            .annotate(total=Sum('horas_validas'))
+            .values('total')
         )
+        horas_requeridas = CursoPorSemestre.objects.filter(
+            curso_id=OuterRef('curso_id'),
+            semestre_id=OuterRef('semestre_ingresso_id'),
+        ).values('horas_requeridas')[:1]
+
         return queryset.annotate(
-            tem_pendencia=Exists(pendentes)
+            horas_validas=Coalesce(Subquery(horas_validas), 0),
+            horas_requeridas=Coalesce(Subquery(horas_requeridas), 0),
+        ).annotate(
+            progresso_percentual=Case(
+                When(
+                    horas_requeridas__gt=0,
+                    then=Least(
+                        Value(100.0),
+                        Round(Cast('horas_validas', FloatField()) * 100 / F('horas_requeridas'))
+                    )
+                ),
+                default=Value(0.0),
+                output_field=FloatField(),
+            )
         )
 
     @staticmethod
     def get_aluno_by_user(user) -> Optional[Aluno]:
-        try:
-            return Aluno.objects.select_related('curso', 'semestre_ingresso').get(user=user)
-        except Aluno.DoesNotExist:
-            return None
+        return UserSelectors.get_perfil(user).aluno
         
     @staticmethod
     def get_alunos_com_pendencias(*, curso=None) -> QuerySet[Aluno]:
-        alunos = Aluno.objects
+        alunos = Aluno.objects.filter(atividades_pendentes__gt=0)
         if curso:
             alunos = alunos.filter(curso=curso)
-        return AlunoSelectors._with_pendencia_annotation(alunos).filter(
-            tem_pendencia=True
-        ).select_related('user', 'curso')
+        return alunos.select_related('user', 'curso')
 
     @staticmethod
     def get_num_alunos_com_pendencias(*, curso=None) -> int:
-        alunos = Aluno.objects
+        """Lê os contadores mantidos por PendenciasService (sem percorrer as atividades)"""
         if curso:
-            alunos = alunos.filter(curso=curso)
-        return AlunoSelectors._with_pendencia_annotation(alunos).filter(
-            tem_pendencia=True
-        ).count()
+            return Curso.objects.filter(id=curso.id).values_list('alunos_com_pendencias', flat=True).first() or 0
+        return Curso.objects.aggregate(total=Coalesce(Sum('alunos_com_pendencias'), 0))['total']
     
     @staticmethod
     def get_num_alunos(*, curso=None) -> int:
@@ -242,68 +352,279 @@ class AlunoSelectors:
             return curso.alunos.count()
         return Aluno.objects.count()
     
+    @staticmethod
+    def get_alunos_da_turma(*, curso, semestre_ingresso=None) -> QuerySet[Aluno]:
+        alunos = Aluno.objects.filter(curso=curso)
+        if semestre_ingresso:
+            alunos = alunos.filter(semestre_ingresso=semestre_ingresso)
+        return alunos.select_related('curso', 'semestre_ingresso').order_by('nome')
+    
     @staticmethod
     def get_alunos_por_curso_order_by_pendencia(curso):
-        pendentes = Atividade.objects.filter(
-            aluno=OuterRef('pk'),
-            status='Pendente'
-        )
-
         alunos = Aluno.objects.filter(curso=curso)
 
         alunos = (
-            alunos
-            .annotate(tem_pendencia=Exists(pendentes))
-            .select_related('user', 'curso')
+            AlunoSelectors._with_progresso_annotation(alunos)
+            .select_related('user', 'curso', 'semestre_ingresso')
         )
-        return alunos.order_by('-tem_pendencia', 'user__first_name', 'user__last_name')
+        com_pendencia = ExpressionWrapper(Q(atividades_pendentes__gt=0), output_field=BooleanField())
+        return alunos.order_by(com_pendencia.desc(), 'user__first_name', 'user__last_name')
     
+    @staticmethod
+    def get_total_horas_validas(*, aluno: Aluno, apenas_aprovadas: bool = False) -> int:
+        """Soma das horas por categoria, já limitadas, calculada em uma única query"""
+        return CategoriaCursoSelectors.get_categorias_curso_com_horas_validas(
+            aluno=aluno,
+            apenas_aprovadas=apenas_aprovadas
+        ).aggregate(total=Sum('horas_validas'))['total'] or 0
+
+    @staticmethod
+    def get_resumo_aluno(aluno: Aluno, limite_recentes: int = 5) -> dict:
+        """
+        Resumo do dashboard do aluno: categorias com saldo (também usadas na
+        sidebar), totais, categorias acima do limite e atividades recentes.
+        Duas queries quando o curso/semestre tem categorias.
+        """
+        categorias = list(
+            CategoriaCursoSelectors.get_categorias_curso_com_horas_por_aluno(aluno=aluno)
+        ) if aluno.curso_id else []
+
+        if categorias:
+            horas_requeridas = categorias[0].curso_semestre.horas_requeridas
+        elif aluno.curso_id:
+            horas_requeridas = AlunoSelectors.get_horas_necessarias_para_conclusao(aluno=aluno)
+        else:
+            horas_requeridas = 0
+
+        total_horas = sum(c.horas_validas_total for c in categorias)
+        horas_pendentes = sum(c.horas_pendentes_total for c in categorias)
+        acima_do_limite = [c for c in categorias if c.horas_aprovadas_total > c.limite_horas]
+
+        progresso = 0
+        if horas_requeridas > 0:
+            progresso = min(100, round((total_horas / horas_requeridas) * 100))
+
+        return {
+            'categorias': categorias,
+            'total_horas': total_horas,
+            'horas_pendentes': horas_pendentes,
+            'horas_totais': horas_pendentes + total_horas,
+            'horas_requeridas': horas_requeridas,
+            'progresso_percentual': progresso,
+            'categorias_acima_do_limite': acima_do_limite,
+            'ultrapassou_limite': bool(acima_do_limite),
+            'atividades_recentes': list(
+                AtividadeSelectors.get_atividades_recentes_aluno(aluno, limite=limite_recentes)
+            ),
+        }
+
     @staticmethod
     def get_horas_necessarias_para_conclusao(aluno: Aluno) -> int:
         return aluno.curso.configuracoes_semestre.filter(
             semestre=aluno.semestre_ingresso
         ).first().horas_requeridas
     
+PERFIL_CACHE_VERSAO = 1
+PERFIL_CACHE_TTL = 300
+CATEGORIAS_MENU_CACHE_TTL = 600
+
+
+def perfil_cache_key(user_id: int) -> str:
+    return f'perfil_usuario_v{PERFIL_CACHE_VERSAO}_{user_id}'
+
+
+def categorias_menu_geracao_key(aluno_id: int) -> str:
+    return f'categorias_aluno_geracao_{aluno_id}'
+
+
+def categorias_menu_cache_key(aluno_id: int, geracao: int) -> str:
+    return f'categorias_aluno_{aluno_id}_g{geracao}'
+
+
+def get_geracao_categorias_menu(aluno_id: int) -> int:
+    """
+    Geração atual do cache de categorias do aluno. Invalidar é só incrementar
+    o contador; as entradas antigas deixam de ser lidas e expiram sozinhas.
+    O contador começa no relógio para nunca repetir uma geração já usada caso
+    seja removido do cache.
+    """
+    chave = categorias_menu_geracao_key(aluno_id)
+    geracao = cache.get(chave)
+    if geracao is None:
+        geracao = time.time_ns()
+        if not cache.add(chave, geracao, None):
+            geracao = cache.get(chave, geracao)
+    return geracao
+
+
+def tabela_geracao_key(tabela: str) -> str:
+    return f'tabela_geracao_{tabela}'
+
+
+def contagem_cache_key(assinatura: str) -> str:
+    return f'contagem_paginacao_{assinatura}'
+
+
+def notificacoes_versao_key(user_id: int) -> str:
+    return f'notificacoes_versao_{user_id}'
+
+
+def lista_htmx_cache_key(assinatura: str) -> str:
+    return f'lista_htmx_{assinatura}'
+
+
+def busca_sequencia_key(session_key: str, view: str) -> str:
+    return f'busca_sequencia_{session_key}_{view}'
+
+
+def get_geracoes_tabelas(tabelas: Iterable[str]) -> List[int]:
+    """
+    Gerações atuais das tabelas (na ordem recebida), usadas na chave das
+    contagens da paginação e das listas HTMX em cache. Cada escrita em uma tabela incrementa a sua
+    (ver utils.invalidar_tabelas); como em get_geracao_categorias_menu, o
+    contador começa no relógio.
+    """
+    chaves = [tabela_geracao_key(tabela) for tabela in tabelas]
+    geracoes = cache.get_many(chaves)
+    for chave in chaves:
+        if chave not in geracoes:
+            geracao = time.time_ns()
+            if not cache.add(chave, geracao, None):
+                geracao = cache.get(chave, geracao)
+            geracoes[chave] = geracao
+    return [geracoes[chave] for chave in chaves]
+
+
+class CategoriaMenu(NamedTuple):
+    """Categoria exibida no menu lateral do aluno (formato compacto guardado no cache)"""
+    id: int
+    nome: str
+    equivalencia_horas: Optional[str]
+    limite_horas: int
+    horas_aprovadas_total: int
+
+    @classmethod
+    def de_categoria_curso(cls, categoria: CategoriaCurso) -> 'CategoriaMenu':
+        return cls(
+            categoria.id,
+            categoria.categoria.nome,
+            categoria.equivalencia_horas,
+            categoria.limite_horas,
+            categoria.horas_aprovadas_total,
+        )
+
+
+@dataclass(frozen=True)
+class PerfilUsuario:
+    """Grupos e perfis (aluno/coordenador) do usuário, resolvidos uma vez por requisição"""
+    grupos: Tuple[str, ...] = ()
+    aluno: Optional[Aluno] = None
+    coordenador: Optional[Coordenador] = None
+
+    @property
+    def is_gestor(self) -> bool:
+        return 'Gestor' in self.grupos
+
+    @property
+    def is_coordenador(self) -> bool:
+        return 'Coordenador' in self.grupos
+
+    @property
+    def is_aluno(self) -> bool:
+        return self.aluno is not None
+
+
 class UserSelectors:
 
+    @staticmethod
+    def get_perfil(user) -> PerfilUsuario:
+        """
+        Retorna o perfil do usuário, memorizado no próprio objeto user e no cache.
+        Em caso de cache miss, grupos, aluno e coordenador vêm em uma única query.
+        """
+        if user is None or not user.is_authenticated:
+            return PerfilUsuario()
+
+        perfil = getattr(user, '_perfil', None)
+        if perfil is not None:
+            return perfil
+
+        cache_key = perfil_cache_key(user.pk)
+        perfil = cache.get(cache_key)
+        if perfil is None:
+            perfil = UserSelectors._carregar_perfil(user.pk)
+            cache.set(cache_key, perfil, PERFIL_CACHE_TTL)
+
+        user._perfil = perfil
+        # Evita novas queries em user.aluno / user.coordenador (ex.: templates)
+        user._state.fields_cache['aluno'] = perfil.aluno
+        user._state.fields_cache['coordenador'] = perfil.coordenador
+        return perfil
+
+    @staticmethod
+    def _carregar_perfil(user_id: int) -> PerfilUsuario:
+        grupos = (
+            Group.objects
+            .filter(user=OuterRef('pk'))
+            .values('user')
+            .annotate(nomes=StringAgg('name', delimiter=Value('|')))
+            .values('nomes')
+        )
+        user = (
+            User.objects
+            .select_related('aluno__curso', 'aluno__semestre_ingresso', 'coordenador__curso')
+            .annotate(grupos=Subquery(grupos))
+            .filter(pk=user_id)
+            .first()
+        )
+        if user is None:
+            return PerfilUsuario()
+
+        return PerfilUsuario(
+            grupos=tuple(user.grupos.split('|')) if user.grupos else (),
+            aluno=getattr(user, 'aluno', None),
+            coordenador=getattr(user, 'coordenador', None),
+        )
+
+    @staticmethod
+    def invalidar_cache_perfil(*user_ids: int):
+        """
+        Remove os perfis do cache depois do COMMIT: antes dele, uma requisição
+        concorrente ainda leria (e guardaria por PERFIL_CACHE_TTL) os vínculos antigos.
+        """
+        chaves = [perfil_cache_key(user_id) for user_id in user_ids]
+        if chaves:
+            transaction.on_commit(lambda: cache.delete_many(chaves))
+
     @staticmethod
     def is_user_coordenador(user) -> bool:
         """Verifica se o usuário é um coordenador"""
-        if user is None:
-            return False
-        return user.groups.filter(name='Coordenador').exists()
+        return UserSelectors.get_perfil(user).is_coordenador
     
     @staticmethod
     def is_user_gestor(user) -> bool:
         """Verifica se o usuário é um gestor"""
-        return user.groups.filter(name='Gestor').exists()
+        return UserSelectors.get_perfil(user).is_gestor
     
     @staticmethod
     def is_user_aluno(user) -> bool:
         """Verifica se o usuário é um aluno"""
-        return hasattr(user, 'aluno')
+        return UserSelectors.get_perfil(user).is_aluno
     
     @staticmethod
     def get_coordenador_by_user(user) -> Optional[Coordenador]:
         """Retorna o coordenador associado ao usuário, se existir"""
-        try:
-            return Coordenador.objects.select_related('curso').get(user=user)
-        except Coordenador.DoesNotExist:
-            return None
+        return UserSelectors.get_perfil(user).coordenador
         
     @staticmethod
     def get_gestor_users() -> QuerySet:
         """Retorna todos os usuários que são gestores"""
-        from django.contrib.auth.models import User, Group
-
         gestor_group = Group.objects.get(name='Gestor')
         return User.objects.filter(groups=gestor_group)
     
     @staticmethod
     def get_coordenador_users() -> QuerySet:
         """Retorna todos os usuários que são coordenadores"""
-        from django.contrib.auth.models import User, Group
-
         coordenador_group = Group.objects.get(name='Coordenador')
         return User.objects.filter(groups=coordenador_group)
     
@@ -312,9 +633,10 @@ class UserSelectors:
         """Retorna os nomes dos grupos aos quais o usuário pertence"""
         if not user.is_authenticated:
             return []
-        if hasattr(user, 'aluno'):
+        perfil = UserSelectors.get_perfil(user)
+        if perfil.is_aluno:
             return ['Aluno']
-        return list(user.groups.values_list('name', flat=True))
+        return list(perfil.grupos)
     
     @staticmethod
     def get_user_primary_group(user) -> Optional[str]:
@@ -383,6 +705,56 @@ class CursoPorSemestreSelectors:
             return CursoPorSemestre.objects.get(curso=curso, semestre=semestre)
         except CursoPorSemestre.DoesNotExist:
             return None
+
+    @staticmethod
+    def get_configuracoes_com_categorias(*, curso: Curso, semestre: Optional[Semestre] = None) -> QuerySet[CursoPorSemestre]:
+        """Configurações do curso por semestre com as categorias já carregadas"""
+        configuracoes = CursoPorSemestre.objects.filter(curso=curso)
+        if semestre:
+            configuracoes = configuracoes.filter(semestre=semestre)
+        return configuracoes.prefetch_related(
+            Prefetch(
+                'categorias_curso',
+                queryset=CategoriaCurso.objects.select_related('categoria').order_by('categoria__nome'),
+                to_attr='categorias_ordenadas'
+            )
+        )
+        
+class SaldoHorasSelectors:
+
+    @staticmethod
+    def get_horas_aprovadas(*, aluno: Aluno, categoria: CategoriaCurso) -> int:
+        """Lê as horas aprovadas do saldo; sem saldo gravado, agrega as atividades"""
+        horas = SaldoHorasAluno.objects.filter(
+            aluno_id=aluno.id,
+            categoria_curso_id=categoria.id
+        ).values_list('horas_aprovadas', flat=True).first()
+        if horas is not None:
+            return horas
+        return AtividadeSelectors.get_total_horas_aluno(
+            aluno=aluno,
+            categoria=categoria,
+            apenas_aprovadas=True
+        )
+
+    @staticmethod
+    def calcular_saldos(*, aluno_id: Optional[int] = None, categoria_id: Optional[int] = None) -> QuerySet:
+        """Saldos calculados a partir da tabela de atividades, agrupados por (aluno, categoria)"""
+        atividades = Atividade.objects.all()
+        if aluno_id:
+            atividades = atividades.filter(aluno_id=aluno_id)
+        if categoria_id:
+            atividades = atividades.filter(categoria_id=categoria_id)
+        return (
+            atividades
+            .values('aluno_id', 'categoria_id', 'categoria__limite_horas')
+            .annotate(
+                total_aprovadas=Coalesce(Sum('horas_aprovadas'), 0),
+                total_pendentes=Coalesce(Sum('horas', filter=Q(status='Pendente')), 0),
+            )
+            .annotate(total_validas=_horas_validas_case('total_aprovadas', 'categoria__limite_horas'))
+            .order_by()
+        )
         
 class NotificationSelectors:
 
@@ -396,10 +768,88 @@ class NotificationSelectors:
 
     @staticmethod
     def count_notificacoes_nao_lidas(user) -> int:
+        """
+        Lê o contador mantido por NotificacaoService (uma linha pela chave primária).
+        Usuários que ainda não têm contador caem na contagem pelo índice.
+        """
+        nao_lidas = ContadorNotificacoes.objects.filter(user_id=user.pk).values_list('nao_lidas', flat=True).first()
+        if nao_lidas is None:
+            return NotificationSelectors.contar_nao_lidas(user_id=user.pk)
+        return nao_lidas
 
-        return Notificacao.objects.filter(
-            user=user,
-            lida=False
-        ).count()
+    @staticmethod
+    def contar_nao_lidas(*, user_id: int) -> int:
+        """Contagem direto nas notificações (índice user + lida + criada_em)"""
+        return Notificacao.objects.filter(user_id=user_id, lida=False).count()
 
-    
\ No newline at end of file
+    @staticmethod
+    def espaco_ocupado() -> Optional[int]:
+        """
+        Bytes ocupados pela tabela de notificações e seus índices (SQLite com
+        dbstat ou PostgreSQL); None quando o banco não informa.
+        """
+        tabela = Notificacao._meta.db_table
+        with connection.cursor() as cursor:
+            if connection.vendor == 'sqlite':
+                try:
+                    cursor.execute(
+                        "SELECT SUM(pgsize) FROM dbstat WHERE name IN "
+                        "(SELECT name FROM sqlite_master WHERE tbl_name = %s)",
+                        [tabela],
+                    )
+                except DatabaseError:
+                    # SQLite compilado sem SQLITE_ENABLE_DBSTAT_VTAB
+                    return None
+            elif connection.vendor == 'postgresql':
+                cursor.execute('SELECT pg_total_relation_size(%s)', [tabela])
+            else:
+                return None
+            return cursor.fetchone()[0] or 0
+
+    @staticmethod
+    def calcular_contadores() -> Dict[int, int]:
+        """{user_id: não lidas} para os usuários com alguma notificação não lida"""
+        return dict(
+            Notificacao.objects.filter(lida=False)
+            .values('user_id').annotate(total=Count('id')).order_by()
+            .values_list('user_id', 'total')
+        )
+
+    
+
+
+class PendenciasSelectors:
+
+    @staticmethod
+    def contar_pendentes_aluno(*, aluno_id: int) -> int:
+        """Contagem direto nas atividades (índice aluno + status)"""
+        return Atividade.objects.filter(aluno_id=aluno_id, status='Pendente').count()
+
+    @staticmethod
+    def pendentes_por_aluno_subquery() -> Subquery:
+        return Subquery(
+            Atividade.objects
+            .filter(aluno_id=OuterRef('pk'), status='Pendente')
+            .values('aluno_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        )
+
+    @staticmethod
+    def calcular_contadores() -> Tuple[Dict[int, int], Dict[int, Tuple[int, int]]]:
+        """
+        Contadores esperados, calculados a partir das atividades:
+        ({aluno_id: pendentes}, {curso_id: (atividades_pendentes, alunos_com_pendencias)}).
+        """
+        por_aluno = dict(
+            Atividade.objects
+            .filter(status='Pendente')
+            .values('aluno_id')
+            .annotate(total=Count('id'))
+            .values_list('aluno_id', 'total')
+        )
+        por_curso = {}
+        for aluno_id, curso_id in Aluno.objects.filter(id__in=por_aluno.keys()).values_list('id', 'curso_id').iterator():
+            atividades, alunos = por_curso.get(curso_id, (0, 0))
+            por_curso[curso_id] = (atividades + por_aluno[aluno_id], alunos + 1)
+        return por_aluno, por_curso
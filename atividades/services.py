@@ -1,10 +1,34 @@
-from atividades.selectors import AlunoSelectors, AtividadeSelectors, CategoriaCursoSelectors, CursoPorSemestreSelectors, UserSelectors
-from .models import Aluno, Atividade, Categoria, Coordenador, CategoriaCurso, CursoPorSemestre, Notificacao, Semestre
-from django.db import transaction
+from atividades.selectors import AlunoSelectors, AtividadeSelectors, CategoriaCursoSelectors, CursoPorSemestreSelectors, NotificationSelectors, PendenciasSelectors, SaldoHorasSelectors, SemestreSelectors, UserSelectors, categorias_menu_geracao_key
+from .models import Aluno, Atividade, Categoria, ContadorNotificacoes, Coordenador, CategoriaCurso, Curso, CursoPorSemestre, Notificacao, SaldoHorasAluno, Semestre
+from .pdfBuilder.relatorio_aluno import RelatorioAlunoPdfBuilder, renderizar_relatorio_pdf
+from .eventos import publicar_apos_commit
+from .utils import cache_com_revalidacao, marcar_obsoleto
+from collections import Counter
+from datetime import datetime, timedelta
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
+from django.conf import settings
+from django.db import close_old_connections, transaction
 from django.contrib.auth.models import Group
 from django.contrib.auth.models import User
-from django.db.models import QuerySet
+from django.db.models import QuerySet, Count, F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Greatest
 from django.core.cache import cache
+from django.utils import timezone
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+import django
+import gzip
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import re
+import threading
+import time
+import zipfile
+
+error_logger = logging.getLogger('django')
 
     
 class SemestreService:
@@ -111,13 +135,15 @@ class AtividadeService:
 
     @staticmethod
     def invalidar_cache_aluno(aluno_id: int):
-        """Invalida o cache de categorias para um aluno específico"""
-        cache_key = f'categorias_aluno_{aluno_id}'
-        cache.delete(cache_key)
+        """Invalida o cache de categorias para um aluno específico (avança a geração das chaves)"""
+        try:
+            cache.incr(categorias_menu_geracao_key(aluno_id))
+        except ValueError:
+            # Sem contador gravado: a próxima leitura já começa uma geração nova
+            pass
 
     @staticmethod
-    def aprovar_horas(*, atividade: Atividade, horas_aprovadas: int):
-        
+    def validar_horas_aprovadas(*, atividade: Atividade, horas_aprovadas: int):
         if horas_aprovadas is None:
             raise ValueError('Informe a quantidade de horas.')
         
@@ -126,6 +152,11 @@ class AtividadeService:
 
         if horas_aprovadas > atividade.horas:
             raise ValueError('Horas aprovadas não podem exceder as horas da atividade')
+
+    @staticmethod
+    def aprovar_horas(*, atividade: Atividade, horas_aprovadas: int):
+        
+        AtividadeService.validar_horas_aprovadas(atividade=atividade, horas_aprovadas=horas_aprovadas)
         
         if atividade.status == 'Limite Atingido':
             raise ValueError('Não é possível aprovar horas para esta atividade, o limite da categoria já foi atingido.')
@@ -133,31 +164,145 @@ class AtividadeService:
         if atividade.categoria.atingiu_limite_pelo_aluno(atividade.aluno) and atividade.horas_aprovadas is None:
             raise ValueError('Não é possível aprovar horas para esta atividade, o limite da categoria já foi atingido para este aluno.')
 
-        atividade.horas_aprovadas = horas_aprovadas
-        atividade.save()
+        with transaction.atomic():
+            atividade.horas_aprovadas = horas_aprovadas
+            atividade.save()
+            # Saldo atualizado antes do recálculo para que os limites considerem esta aprovação
+            SaldoHorasService.atualizar_saldo(aluno_id=atividade.aluno_id, categoria_id=atividade.categoria_id)
 
-        Notificacao.objects.create(
-            user=atividade.aluno.user,
-            texto=f"Sua atividade \"{atividade.nome}\" foi avaliada com {horas_aprovadas} horas."
-        )
+            NotificacaoService.notificar(
+                user_id=atividade.aluno.user_id,
+                texto=f"Sua atividade \"{atividade.nome}\" foi avaliada com {horas_aprovadas} horas."
+            )
+
+            AtividadeService.recalcular_status_atividade(atividade=atividade)
+            SaldoHorasService.atualizar_saldo(aluno_id=atividade.aluno_id, categoria_id=atividade.categoria_id)
+            PendenciasService.atualizar_aluno(aluno_id=atividade.aluno_id)
         
         # Invalidar cache do aluno após aprovação
         AtividadeService.invalidar_cache_aluno(atividade.aluno_id)
         StatsService.invalidar_cache_coordenador(atividade.aluno.curso_id)
-        AtividadeService.recalcular_status_atividade(atividade=atividade)
+
+    @staticmethod
+    def avaliar_atividades_em_lote(*, atividades: QuerySet[Atividade], aprovar: bool) -> dict:
+        """
+        Aprova (com todas as horas da atividade) ou rejeita várias atividades em uma transação.
+
+        As atividades são processadas por (aluno, categoria), na ordem de cadastro, aplicando
+        as mesmas regras de limite de aprovar_horas como se fossem avaliadas uma a uma.
+        Retorna {'avaliadas': [...], 'erros': [(atividade, mensagem), ...]}.
+        """
+        grupos = {}
+        for atividade in atividades.select_related('aluno__user', 'categoria').order_by('created_at', 'id'):
+            grupos.setdefault((atividade.aluno_id, atividade.categoria_id), []).append(atividade)
+
+        avaliadas = []
+        erros = []
+        notificacoes = []
+
+        with transaction.atomic():
+            for grupo in grupos.values():
+                avaliadas_grupo = AtividadeService._avaliar_grupo(grupo=grupo, aprovar=aprovar, erros=erros)
+                if not avaliadas_grupo:
+                    continue
+
+                Atividade.objects.bulk_update(avaliadas_grupo, ['horas_aprovadas', 'status'])
+                ultima = avaliadas_grupo[-1]
+                SaldoHorasService.atualizar_saldo(aluno_id=ultima.aluno_id, categoria_id=ultima.categoria_id)
+                AtividadeService.recalcular_status_atividade(atividade=ultima)
+                SaldoHorasService.atualizar_saldo(aluno_id=ultima.aluno_id, categoria_id=ultima.categoria_id)
+
+                notificacoes.extend(
+                    Notificacao(
+                        user=atividade.aluno.user,
+                        texto=f"Sua atividade \"{atividade.nome}\" foi avaliada com {atividade.horas_aprovadas} horas."
+                    )
+                    for atividade in avaliadas_grupo
+                )
+                avaliadas.extend(avaliadas_grupo)
+
+            NotificacaoService.notificar_em_lote(notificacoes=notificacoes)
+            for aluno_id in {atividade.aluno_id for atividade in avaliadas}:
+                PendenciasService.atualizar_aluno(aluno_id=aluno_id)
+
+        for aluno_id in {atividade.aluno_id for atividade in avaliadas}:
+            AtividadeService.invalidar_cache_aluno(aluno_id)
+        for curso_id in {atividade.aluno.curso_id for atividade in avaliadas}:
+            StatsService.invalidar_cache_coordenador(curso_id)
+
+        return {'avaliadas': avaliadas, 'erros': erros}
+
+    @staticmethod
+    def _avaliar_grupo(*, grupo: list, aprovar: bool, erros: list) -> list:
+        """
+        Simula em memória a sequência de aprovar_horas para atividades do mesmo
+        (aluno, categoria), incluindo os status recalculados após cada aprovação.
+        """
+        primeira = grupo[0]
+        categoria = primeira.categoria
+        total_aprovado = SaldoHorasSelectors.get_horas_aprovadas(aluno=primeira.aluno, categoria=categoria)
+        status = {atividade.id: atividade.status for atividade in grupo}
+        avaliadas = []
+
+        for atividade in grupo:
+            horas_aprovadas = atividade.horas if aprovar else 0
+            try:
+                AtividadeService.validar_horas_aprovadas(atividade=atividade, horas_aprovadas=horas_aprovadas)
+                if status[atividade.id] == 'Limite Atingido':
+                    raise ValueError('Não é possível aprovar horas para esta atividade, o limite da categoria já foi atingido.')
+                if total_aprovado >= categoria.limite_horas and atividade.horas_aprovadas is None:
+                    raise ValueError('Não é possível aprovar horas para esta atividade, o limite da categoria já foi atingido para este aluno.')
+            except ValueError as e:
+                erros.append((atividade, str(e)))
+                continue
+
+            total_aprovado += horas_aprovadas - (atividade.horas_aprovadas or 0)
+            atividade.horas_aprovadas = horas_aprovadas
+            atividade.status = 'Aprovada' if horas_aprovadas > 0 else 'Rejeitada'
+            status[atividade.id] = atividade.status
+            avaliadas.append(atividade)
+
+            # Mesmo efeito de recalcular_status_atividade sobre as demais atividades do lote
+            for outra in grupo:
+                if outra is atividade or status[outra.id] == 'Aprovada':
+                    continue
+                if total_aprovado >= categoria.limite_horas:
+                    status[outra.id] = 'Limite Atingido'
+                elif outra.horas_aprovadas is None:
+                    status[outra.id] = 'Pendente'
+                elif outra.horas_aprovadas == 0:
+                    status[outra.id] = 'Rejeitada'
+                else:
+                    status[outra.id] = 'Aprovada'
+
+        return avaliadas
 
     @staticmethod
     def recalcular_status_atividades_qs(atividades: QuerySet[Atividade]):
+        # O limite só depende de (aluno, categoria): é consultado uma vez por par
+        # e apenas as atividades cujo status mudou são gravadas, em um único UPDATE.
+        limite_atingido = {}
+        alteradas = []
         for atividade in atividades:
-            if atividade.categoria.atingiu_limite_pelo_aluno(atividade.aluno):
-                atividade.status = 'Limite Atingido'
+            chave = (atividade.aluno_id, atividade.categoria_id)
+            if chave not in limite_atingido:
+                limite_atingido[chave] = atividade.categoria.atingiu_limite_pelo_aluno(atividade.aluno)
+
+            if limite_atingido[chave]:
+                status = 'Limite Atingido'
             elif atividade.horas_aprovadas is None:
-                atividade.status = 'Pendente'
+                status = 'Pendente'
             elif atividade.horas_aprovadas == 0:
-                atividade.status = 'Rejeitada'
+                status = 'Rejeitada'
             else:
-                atividade.status = 'Aprovada' 
-            atividade.save()
+                status = 'Aprovada'
+
+            if atividade.status != status:
+                atividade.status = status
+                alteradas.append(atividade)
+
+        if alteradas:
+            Atividade.objects.bulk_update(alteradas, ['status'])
 
     @staticmethod
     def recalcular_status_atividade(atividade: Atividade):
@@ -186,21 +331,486 @@ class AtividadeService:
     def exluir_atividade(atividade: Atividade):
         aluno = atividade.aluno
         categoria = atividade.categoria
-        atividade.delete()
-        AtividadeService.recalcular_status_atividades_apos_exclusao(aluno=aluno, categoria=categoria)
+        with transaction.atomic():
+            atividade.delete()
+            SaldoHorasService.atualizar_saldo(aluno_id=aluno.id, categoria_id=categoria.id)
+            AtividadeService.recalcular_status_atividades_apos_exclusao(aluno=aluno, categoria=categoria)
+            SaldoHorasService.atualizar_saldo(aluno_id=aluno.id, categoria_id=categoria.id)
+            PendenciasService.atualizar_aluno(aluno_id=aluno.id)
         AtividadeService.invalidar_cache_aluno(aluno.id)
 
     @staticmethod
     def cadastrar_atividade(*, form, aluno: Aluno):
         atividade = form.save(commit=False)
         atividade.aluno = aluno
-        if atividade.categoria.atingiu_limite_pelo_aluno(aluno):
-            atividade.status = 'Limite Atingido'
-        atividade.save()
+        with transaction.atomic():
+            if atividade.categoria.atingiu_limite_pelo_aluno(aluno):
+                atividade.status = 'Limite Atingido'
+            atividade.save()
+            SaldoHorasService.atualizar_saldo(aluno_id=aluno.id, categoria_id=atividade.categoria_id)
+            PendenciasService.atualizar_aluno(aluno_id=aluno.id)
         AtividadeService.invalidar_cache_aluno(aluno.id)
         StatsService.invalidar_cache_coordenador(aluno.curso_id)
         return atividade
 
+    @staticmethod
+    def editar_atividade(*, form):
+        categoria_anterior_id = form.initial.get('categoria')
+        with transaction.atomic():
+            atividade = form.save()
+            SaldoHorasService.atualizar_saldo(aluno_id=atividade.aluno_id, categoria_id=atividade.categoria_id)
+            if categoria_anterior_id and categoria_anterior_id != atividade.categoria_id:
+                SaldoHorasService.atualizar_saldo(aluno_id=atividade.aluno_id, categoria_id=categoria_anterior_id)
+        AtividadeService.invalidar_cache_aluno(atividade.aluno_id)
+        StatsService.invalidar_cache_coordenador(atividade.aluno.curso_id)
+        return atividade
+
+class SaldoHorasService:
+
+    @staticmethod
+    def atualizar_saldo(*, aluno_id: int, categoria_id: int):
+        """Regrava o saldo de um par (aluno, categoria) a partir das atividades"""
+        saldos = list(SaldoHorasSelectors.calcular_saldos(aluno_id=aluno_id, categoria_id=categoria_id))
+
+        if not saldos:
+            SaldoHorasAluno.objects.filter(aluno_id=aluno_id, categoria_curso_id=categoria_id).delete()
+            return
+
+        SaldoHorasAluno.objects.bulk_create(
+            [SaldoHorasService._saldo_from_row(saldos[0])],
+            update_conflicts=True,
+            unique_fields=['aluno', 'categoria_curso'],
+            update_fields=['horas_aprovadas', 'horas_pendentes', 'horas_validas', 'updated_at'],
+        )
+
+    @staticmethod
+    def recalcular_horas_validas_categoria(*, categoria: CategoriaCurso):
+        """Reaplica o limite da categoria aos saldos já gravados (ex.: após editar o limite)"""
+        saldos = SaldoHorasAluno.objects.filter(categoria_curso=categoria)
+        saldos.update(horas_validas=F('horas_aprovadas'))
+        if categoria.limite_horas > 0:
+            saldos.filter(horas_aprovadas__gt=categoria.limite_horas).update(horas_validas=categoria.limite_horas)
+
+    @staticmethod
+    def reconstruir_saldos(*, batch_size: int = 1000) -> int:
+        """Apaga e recria todos os saldos a partir da tabela de atividades"""
+        total = 0
+        with transaction.atomic():
+            SaldoHorasAluno.objects.all().delete()
+            lote = []
+            for row in SaldoHorasSelectors.calcular_saldos().iterator(chunk_size=batch_size):
+                lote.append(SaldoHorasService._saldo_from_row(row))
+                if len(lote) >= batch_size:
+                    SaldoHorasAluno.objects.bulk_create(lote)
+                    total += len(lote)
+                    lote = []
+            if lote:
+                SaldoHorasAluno.objects.bulk_create(lote)
+                total += len(lote)
+        return total
+
+    @staticmethod
+    def verificar_saldos() -> list:
+        """
+        Compara os saldos gravados com os calculados a partir das atividades.
+        Retorna uma lista de (aluno_id, categoria_id, esperado, gravado).
+        """
+        campos = ('horas_aprovadas', 'horas_pendentes', 'horas_validas')
+        zero = (0, 0, 0)
+
+        esperados = {
+            (row['aluno_id'], row['categoria_id']): (row['total_aprovadas'], row['total_pendentes'], row['total_validas'])
+            for row in SaldoHorasSelectors.calcular_saldos()
+        }
+        gravados = {
+            (aluno_id, categoria_id): tuple(valores)
+            for aluno_id, categoria_id, *valores in SaldoHorasAluno.objects.values_list('aluno_id', 'categoria_curso_id', *campos)
+        }
+
+        divergencias = []
+        for chave in esperados.keys() | gravados.keys():
+            esperado = esperados.get(chave, zero)
+            gravado = gravados.get(chave, zero)
+            if esperado != gravado:
+                divergencias.append((*chave, esperado, gravado))
+        return sorted(divergencias)
+
+    @staticmethod
+    def _saldo_from_row(row: dict) -> SaldoHorasAluno:
+        return SaldoHorasAluno(
+            aluno_id=row['aluno_id'],
+            categoria_curso_id=row['categoria_id'],
+            horas_aprovadas=row['total_aprovadas'],
+            horas_pendentes=row['total_pendentes'],
+            horas_validas=row['total_validas'],
+        )
+
+class PendenciasService:
+
+    @staticmethod
+    def atualizar_aluno(*, aluno_id: int):
+        """
+        Reconta as atividades pendentes do aluno e aplica a diferença aos
+        contadores do curso, na mesma transação da mudança de status.
+        """
+        with transaction.atomic():
+            aluno = Aluno.objects.select_for_update().only('curso_id', 'atividades_pendentes').get(id=aluno_id)
+            pendentes = PendenciasSelectors.contar_pendentes_aluno(aluno_id=aluno_id)
+            anterior = aluno.atividades_pendentes
+            if pendentes == anterior:
+                return
+
+            Aluno.objects.filter(id=aluno_id).update(atividades_pendentes=pendentes)
+            Curso.objects.filter(id=aluno.curso_id).update(
+                atividades_pendentes=F('atividades_pendentes') + (pendentes - anterior),
+                alunos_com_pendencias=F('alunos_com_pendencias') + (int(pendentes > 0) - int(anterior > 0)),
+            )
+
+    @staticmethod
+    def reconstruir_contadores():
+        """Recalcula os contadores de todos os alunos e cursos a partir das atividades"""
+        with transaction.atomic():
+            Aluno.objects.update(atividades_pendentes=Coalesce(PendenciasSelectors.pendentes_por_aluno_subquery(), 0))
+            alunos_do_curso = Aluno.objects.filter(curso_id=OuterRef('pk')).values('curso_id')
+            Curso.objects.update(
+                atividades_pendentes=Coalesce(
+                    Subquery(alunos_do_curso.annotate(total=Sum('atividades_pendentes')).values('total')), 0
+                ),
+                alunos_com_pendencias=Coalesce(
+                    Subquery(
+                        alunos_do_curso.filter(atividades_pendentes__gt=0).annotate(total=Count('id')).values('total')
+                    ), 0
+                ),
+            )
+
+    @staticmethod
+    def verificar_contadores() -> list:
+        """
+        Compara os contadores gravados com os calculados a partir das atividades.
+        Retorna uma lista de (modelo, id, esperado, gravado).
+        """
+        esperados_alunos, esperados_cursos = PendenciasSelectors.calcular_contadores()
+
+        divergencias = []
+        for aluno_id, gravado in Aluno.objects.values_list('id', 'atividades_pendentes').iterator():
+            esperado = esperados_alunos.get(aluno_id, 0)
+            if esperado != gravado:
+                divergencias.append(('aluno', aluno_id, esperado, gravado))
+        # Soma dos contadores gravados dos alunos em cada curso: diverge do curso quando uma
+        # troca de curso não levou as pendências do aluno junto
+        somas_alunos = {
+            curso_id: (atividades, alunos)
+            for curso_id, atividades, alunos in Aluno.objects.filter(atividades_pendentes__gt=0)
+            .values('curso_id').annotate(atividades=Sum('atividades_pendentes'), alunos=Count('id'))
+            .order_by().values_list('curso_id', 'atividades', 'alunos')
+        }
+        for curso_id, *gravado in Curso.objects.values_list('id', 'atividades_pendentes', 'alunos_com_pendencias'):
+            esperado = esperados_cursos.get(curso_id, (0, 0))
+            if esperado != tuple(gravado):
+                divergencias.append(('curso', curso_id, esperado, tuple(gravado)))
+            soma_alunos = somas_alunos.get(curso_id, (0, 0))
+            if soma_alunos != tuple(gravado):
+                divergencias.append(('curso (soma dos alunos)', curso_id, soma_alunos, tuple(gravado)))
+        return divergencias
+
+class NotificacaoService:
+    """
+    Cria e marca notificações mantendo ContadorNotificacoes na mesma transação,
+    para o badge ler uma linha em vez de contar as não lidas.
+    """
+
+    @staticmethod
+    def notificar(*, user_id: int, texto: str) -> Notificacao:
+        with transaction.atomic():
+            notificacao = Notificacao.objects.create(user_id=user_id, texto=texto)
+            NotificacaoService._ajustar_contador(user_id=user_id, delta=1)
+        publicar_apos_commit(user_id)
+        return notificacao
+
+    @staticmethod
+    def notificar_em_lote(*, notificacoes: List[Notificacao]) -> List[Notificacao]:
+        por_usuario = Counter(notificacao.user_id for notificacao in notificacoes)
+        with transaction.atomic():
+            criadas = Notificacao.objects.bulk_create(notificacoes)
+            for user_id, total in por_usuario.items():
+                NotificacaoService._ajustar_contador(user_id=user_id, delta=total)
+        for user_id in por_usuario:
+            publicar_apos_commit(user_id)
+        return criadas
+
+    @staticmethod
+    def marcar_lida(*, notificacao: Notificacao) -> bool:
+        """Marca como lida; False se ela já estava lida (o contador não muda)"""
+        with transaction.atomic():
+            # O filtro por lida=False faz de duas marcações simultâneas apenas uma
+            marcada = Notificacao.objects.filter(id=notificacao.id, lida=False).update(lida=True)
+            if marcada:
+                NotificacaoService._ajustar_contador(user_id=notificacao.user_id, delta=-1)
+        notificacao.lida = True
+        if marcada:
+            publicar_apos_commit(notificacao.user_id)
+        return bool(marcada)
+
+    @staticmethod
+    def marcar_todas_lidas(*, user_id: int) -> int:
+        with transaction.atomic():
+            marcadas = Notificacao.objects.filter(user_id=user_id, lida=False).update(lida=True)
+            if marcadas:
+                NotificacaoService._ajustar_contador(user_id=user_id, delta=-marcadas)
+        if marcadas:
+            publicar_apos_commit(user_id)
+        return marcadas
+
+    @staticmethod
+    def _ajustar_contador(*, user_id: int, delta: int):
+        """Aplica delta ao contador; chamar na transação que criou/marcou as notificações"""
+        atualizados = ContadorNotificacoes.objects.filter(user_id=user_id).update(
+            nao_lidas=Greatest(F('nao_lidas') + delta, 0)
+        )
+        if atualizados:
+            return
+
+        # Usuário ainda sem contador: parte da contagem, que já inclui esta mudança
+        _, criado = ContadorNotificacoes.objects.get_or_create(
+            user_id=user_id,
+            defaults={'nao_lidas': NotificationSelectors.contar_nao_lidas(user_id=user_id)},
+        )
+        if not criado:
+            # Criado por outra transação entre o UPDATE e o INSERT
+            ContadorNotificacoes.objects.filter(user_id=user_id).update(nao_lidas=Greatest(F('nao_lidas') + delta, 0))
+
+    @staticmethod
+    def reconstruir_contadores():
+        """Recalcula os contadores de todos os usuários com notificações a partir das não lidas"""
+        with transaction.atomic():
+            esperados = NotificationSelectors.calcular_contadores()
+            usuarios = Notificacao.objects.values_list('user_id', flat=True).distinct().order_by()
+            ContadorNotificacoes.objects.bulk_create(
+                [ContadorNotificacoes(user_id=user_id) for user_id in usuarios],
+                ignore_conflicts=True,
+            )
+            ContadorNotificacoes.objects.update(
+                nao_lidas=Coalesce(
+                    Subquery(
+                        Notificacao.objects.filter(user_id=OuterRef('user_id'), lida=False)
+                        .values('user_id').annotate(total=Count('id')).values('total')
+                    ), 0
+                )
+            )
+        for user_id in esperados:
+            publicar_apos_commit(user_id)
+
+    @staticmethod
+    def verificar_contadores() -> list:
+        """
+        Compara os contadores gravados com as notificações não lidas.
+        Retorna uma lista de (modelo, id, esperado, gravado); usuários sem contador contam como 0.
+        """
+        esperados = NotificationSelectors.calcular_contadores()
+        gravados = dict(ContadorNotificacoes.objects.values_list('user_id', 'nao_lidas'))
+
+        divergencias = []
+        for user_id in sorted(esperados.keys() | gravados.keys()):
+            esperado, gravado = esperados.get(user_id, 0), gravados.get(user_id, 0)
+            if esperado != gravado:
+                divergencias.append(('usuario', user_id, esperado, gravado))
+        return divergencias
+
+class RetencaoNotificacoesService:
+    """
+    Limpeza das notificações já lidas (comando compactar_notificacoes).
+    Trabalha em lotes, cada um em uma transação curta, para não segurar o
+    lock de escrita do banco. Não lidas nunca são tocadas, então
+    ContadorNotificacoes e o badge não mudam.
+
+    O corte por idade é calculado uma vez por execução e guardado em
+    NOTIFICACOES_RETENCAO_CHECKPOINT até ela terminar: uma execução
+    interrompida é continuada depois com o mesmo corte (e o mesmo arquivo).
+    """
+
+    # Prefixo dos resumos: "[3×] texto" junta três notificações com o mesmo texto
+    PREFIXO_RESUMO = re.compile(r'^\[(\d+)×\] ')
+
+    @staticmethod
+    def iniciar_execucao(*, dias: int, arquivar: bool) -> dict:
+        """
+        {'limite', 'arquivo', 'continuada'} da execução: a interrompida com os mesmos
+        `dias`, se houver, ou uma nova, com o corte calculado agora e gravado no checkpoint.
+        """
+        caminho = Path(settings.NOTIFICACOES_RETENCAO_CHECKPOINT)
+        try:
+            checkpoint = json.loads(caminho.read_text())
+        except (FileNotFoundError, ValueError):
+            checkpoint = None
+
+        if checkpoint and checkpoint.get('dias') == dias:
+            arquivo = checkpoint.get('arquivo')
+            if arquivar and not arquivo:
+                arquivo = RetencaoNotificacoesService._novo_arquivo()
+            return {
+                'limite': datetime.fromisoformat(checkpoint['limite']),
+                'arquivo': Path(arquivo) if arquivar and arquivo else None,
+                'continuada': True,
+            }
+
+        agora = timezone.now()
+        limite = agora - timedelta(days=dias)
+        arquivo = RetencaoNotificacoesService._novo_arquivo(agora) if arquivar else None
+        caminho.parent.mkdir(parents=True, exist_ok=True)
+        # Grava e renomeia: uma interrupção no meio não deixa um checkpoint pela metade
+        temporario = caminho.with_suffix('.tmp')
+        temporario.write_text(json.dumps({
+            'dias': dias,
+            'limite': limite.isoformat(),
+            'arquivo': str(arquivo) if arquivo else None,
+        }))
+        temporario.replace(caminho)
+        return {'limite': limite, 'arquivo': arquivo, 'continuada': False}
+
+    @staticmethod
+    def concluir_execucao():
+        Path(settings.NOTIFICACOES_RETENCAO_CHECKPOINT).unlink(missing_ok=True)
+
+    @staticmethod
+    def _novo_arquivo(momento=None) -> Path:
+        momento = momento or timezone.now()
+        return Path(settings.NOTIFICACOES_ARQUIVO_DIR) / f'notificacoes_{momento:%Y%m%d_%H%M%S}.jsonl.gz'
+
+    @staticmethod
+    def antigas(*, limite) -> QuerySet:
+        return Notificacao.objects.filter(lida=True, criada_em__lt=limite)
+
+    @staticmethod
+    def remover_antigas(*, limite, tamanho_lote: int, arquivo: Optional[Path] = None,
+                        pausa: float = 0, progresso: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Apaga as notificações lidas criadas antes de `limite`, mais antigas primeiro.
+        Com `arquivo`, cada lote é gravado antes (JSON Lines com gzip, acrescentado ao
+        arquivo) na mesma transação que o apaga. Retorna quantas foram removidas.
+        """
+        removidas = 0
+        saida = None
+        try:
+            while True:
+                with transaction.atomic():
+                    lote = list(
+                        RetencaoNotificacoesService.antigas(limite=limite)
+                        .order_by('criada_em')
+                        .values('id', 'user_id', 'texto', 'criada_em')[:tamanho_lote]
+                    )
+                    if not lote:
+                        break
+                    if arquivo is not None:
+                        if saida is None:
+                            arquivo.parent.mkdir(parents=True, exist_ok=True)
+                            saida = gzip.open(arquivo, 'at', encoding='utf-8')
+                        for notificacao in lote:
+                            saida.write(json.dumps(notificacao, default=str, ensure_ascii=False) + '\n')
+                        # Gravado no arquivo antes do COMMIT: uma falha pode repetir o lote, nunca perdê-lo
+                        saida.flush()
+                    Notificacao.objects.filter(id__in=[notificacao['id'] for notificacao in lote]).delete()
+
+                removidas += len(lote)
+                if progresso:
+                    progresso(removidas)
+                if len(lote) < tamanho_lote:
+                    break
+                time.sleep(pausa)
+        finally:
+            if saida is not None:
+                saida.close()
+        return removidas
+
+    @staticmethod
+    def resumir_repetidas(*, tamanho_lote: int, pausa: float = 0,
+                          progresso: Optional[Callable[[int], None]] = None) -> int:
+        """
+        Junta as notificações lidas de um usuário com o mesmo texto em uma só
+        (a mais recente), com o texto prefixado por "[N×] ". Resumos de execuções
+        anteriores entram na conta. Processa `tamanho_lote` usuários por transação
+        e retorna quantas notificações foram removidas.
+        """
+        usuarios = list(
+            Notificacao.objects.filter(lida=True).values_list('user_id', flat=True).distinct().order_by('user_id')
+        )
+        removidas = 0
+        for inicio in range(0, len(usuarios), tamanho_lote):
+            with transaction.atomic():
+                grupos = {}
+                for id_notificacao, user_id, texto in (
+                    Notificacao.objects.filter(lida=True, user_id__in=usuarios[inicio:inicio + tamanho_lote])
+                    .order_by('criada_em', 'id').values_list('id', 'user_id', 'texto').iterator()
+                ):
+                    prefixo = RetencaoNotificacoesService.PREFIXO_RESUMO.match(texto)
+                    vezes = int(prefixo.group(1)) if prefixo else 1
+                    grupos.setdefault((user_id, texto[prefixo.end():] if prefixo else texto), []).append((id_notificacao, vezes))
+
+                resumidas, apagar = [], []
+                for (user_id, texto), notificacoes in grupos.items():
+                    if len(notificacoes) < 2:
+                        continue
+                    *repetidas, (id_mais_recente, _) = notificacoes
+                    total = sum(vezes for _, vezes in notificacoes)
+                    resumidas.append(Notificacao(id=id_mais_recente, texto=f'[{total}×] {texto}'[:255]))
+                    apagar.extend(id_notificacao for id_notificacao, _ in repetidas)
+
+                Notificacao.objects.bulk_update(resumidas, ['texto'], batch_size=500)
+                for inicio_ids in range(0, len(apagar), 500):
+                    Notificacao.objects.filter(id__in=apagar[inicio_ids:inicio_ids + 500]).delete()
+
+            removidas += len(apagar)
+            if progresso:
+                progresso(removidas)
+            time.sleep(pausa)
+        return removidas
+
+class BuscaService:
+    """Colunas normalizadas usadas pela busca (atividades/busca.py)"""
+
+    CAMPOS = {
+        Aluno: ('nome_busca', 'matricula_busca'),
+        Atividade: ('nome_busca',),
+    }
+
+    @staticmethod
+    def _desatualizados(modelo, tamanho_lote):
+        """Gera os registros de modelo cujas colunas de busca não batem com o valor normalizado"""
+        campos = BuscaService.CAMPOS[modelo]
+        origem = [campo.removesuffix('_busca') for campo in campos]
+        for registro in modelo.objects.only('id', *origem, *campos).iterator(chunk_size=tamanho_lote):
+            gravados = [getattr(registro, campo) for campo in campos]
+            registro.atualizar_campos_busca()
+            if gravados != [getattr(registro, campo) for campo in campos]:
+                yield registro
+
+    @staticmethod
+    def reindexar(*, tamanho_lote: int = 2000) -> Dict[str, int]:
+        """Recalcula as colunas de busca de alunos e atividades; retorna quantos registros mudaram por model"""
+        alterados = {}
+        with transaction.atomic():
+            for modelo, campos in BuscaService.CAMPOS.items():
+                lote, total = [], 0
+                for registro in BuscaService._desatualizados(modelo, tamanho_lote):
+                    lote.append(registro)
+                    if len(lote) == tamanho_lote:
+                        modelo.objects.bulk_update(lote, campos)
+                        total += len(lote)
+                        lote = []
+                if lote:
+                    modelo.objects.bulk_update(lote, campos)
+                    total += len(lote)
+                alterados[modelo._meta.model_name] = total
+        return alterados
+
+    @staticmethod
+    def verificar() -> list:
+        """Lista de (model, id) com colunas de busca desatualizadas"""
+        return [
+            (modelo._meta.model_name, registro.id)
+            for modelo in BuscaService.CAMPOS
+            for registro in BuscaService._desatualizados(modelo, 2000)
+        ]
+
 class CategoriaCursoService:
    
    @staticmethod
@@ -313,67 +923,42 @@ class AlunoService:
             total = min(soma, limite) if limite > 0 else soma
             return total
 
-        categorias = CategoriaCursoSelectors.get_categorias_curso(
-            curso=aluno.curso,
-            semestre=aluno.semestre_ingresso
+        return AlunoSelectors.get_total_horas_validas(
+            aluno=aluno,
+            apenas_aprovadas=apenas_aprovadas
         )
 
-        total = 0
-
-        for curso_categoria in categorias:
-            soma = AtividadeSelectors.get_total_horas_aluno(
-                aluno=aluno,
-                categoria=curso_categoria,
-                apenas_aprovadas=apenas_aprovadas
-            )
-
-            limite = curso_categoria.limite_horas or 0
-            total += min(soma, limite) if limite > 0 else soma
-
-        return total
-    
 
 class RelatorioAlunoService:
 
     @staticmethod
     def gerar_dados_relatorio(*, aluno):
-        categorias = CategoriaCursoSelectors.get_categorias_curso(
-            curso=aluno.curso,
-            semestre=aluno.semestre_ingresso
+        categorias = CategoriaCursoSelectors.get_categorias_curso_com_horas_validas(
+            aluno=aluno,
+            apenas_aprovadas=True
         )
 
+        atividades_por_categoria = {}
+        for atividade in AtividadeSelectors.get_atividades_aluno(aluno=aluno):
+            atividades_por_categoria.setdefault(atividade.categoria_id, []).append(atividade)
+
         categorias_dados = []
+        total_horas_validas = 0
 
         for categoria in categorias:
-            atividades = AtividadeSelectors.get_atividades_aluno(
-                aluno=aluno,
-                curso_categoria=categoria,
-                aprovadas=True
-            )
+            total_horas_validas += categoria.horas_validas
+            atividades = atividades_por_categoria.get(categoria.id)
 
-            if not atividades.exists():
+            if not atividades:
                 continue
 
-            horas_brutas = sum(a.horas_aprovadas for a in atividades if a.horas_aprovadas is not None)
-
-            horas_validas = AlunoService.calcular_horas_complementares_validas(
-                aluno=aluno,
-                apenas_aprovadas=True,
-                categoria=categoria
-            )
-
             categorias_dados.append({
                 'categoria': categoria,
                 'atividades': atividades,
-                'horas_brutas': horas_brutas,
-                'horas_validas': horas_validas,
+                'horas_brutas': categoria.horas_soma,
+                'horas_validas': categoria.horas_validas,
             })
 
-        total_horas_validas = AlunoService.calcular_horas_complementares_validas(
-            aluno=aluno,
-            apenas_aprovadas=True
-        )
-
         horas_requeridas = AlunoSelectors.get_horas_necessarias_para_conclusao(aluno=aluno)
 
         return {
@@ -383,6 +968,268 @@ class RelatorioAlunoService:
             'horas_requeridas': horas_requeridas,
         }
     
+RELATORIO_PDF_VERSAO = 1
+
+_relatorios_executor = None
+_relatorios_lock = threading.Lock()
+_relatorios_tarefas: Dict[Path, Future] = {}
+
+
+def _get_relatorios_executor() -> ThreadPoolExecutor:
+    global _relatorios_executor
+    if _relatorios_executor is None:
+        _relatorios_executor = ThreadPoolExecutor(
+            max_workers=settings.RELATORIOS_PDF_WORKERS,
+            thread_name_prefix='relatorio-pdf'
+        )
+    return _relatorios_executor
+
+
+class RelatorioPdfService:
+    """
+    Gera o PDF do relatório fora da thread da requisição e o guarda em disco,
+    em RELATORIOS_PDF_DIR/<aluno_id>/<fingerprint>.pdf. Enquanto as atividades
+    do aluno não mudam no mesmo dia, o mesmo arquivo é servido sem renderizar
+    de novo (o PDF imprime a data de geração, que também entra no fingerprint).
+    """
+
+    PRONTO = 'pronto'
+    GERANDO = 'gerando'
+    ERRO = 'erro'
+
+    @staticmethod
+    def calcular_fingerprint(*, aluno) -> str:
+        linhas = AtividadeSelectors.get_assinatura_relatorio(aluno)
+        horas_requeridas = (
+            None if linhas else AlunoSelectors.get_horas_necessarias_para_conclusao(aluno=aluno)
+        )
+        base = repr((
+            RELATORIO_PDF_VERSAO,
+            timezone.localdate().isoformat(),
+            aluno.nome,
+            aluno.matricula,
+            aluno.curso.nome,
+            horas_requeridas,
+            linhas,
+        ))
+        return hashlib.sha256(base.encode()).hexdigest()[:32]
+
+    @staticmethod
+    def caminho_relatorio(*, aluno_id: int, fingerprint: str) -> Path:
+        return Path(settings.RELATORIOS_PDF_DIR) / str(aluno_id) / f'{fingerprint}.pdf'
+
+    @staticmethod
+    def solicitar_relatorio(*, aluno) -> Tuple[str, Path]:
+        """
+        Retorna (status, caminho). Se o PDF atual ainda não está em disco,
+        agenda a geração (uma única vez por arquivo neste processo).
+        """
+        fingerprint = RelatorioPdfService.calcular_fingerprint(aluno=aluno)
+        caminho = RelatorioPdfService.caminho_relatorio(aluno_id=aluno.id, fingerprint=fingerprint)
+
+        if caminho.exists():
+            return RelatorioPdfService.PRONTO, caminho
+
+        with _relatorios_lock:
+            tarefa = _relatorios_tarefas.get(caminho)
+
+            if tarefa is not None and tarefa.done() and tarefa.exception() is not None:
+                # Informa a falha uma vez; a próxima solicitação tenta de novo
+                del _relatorios_tarefas[caminho]
+                return RelatorioPdfService.ERRO, caminho
+
+            if tarefa is None or tarefa.done():
+                tarefa = _get_relatorios_executor().submit(
+                    RelatorioPdfService._gerar_em_disco,
+                    aluno_id=aluno.id,
+                    caminho=caminho
+                )
+                _relatorios_tarefas[caminho] = tarefa
+                tarefa.add_done_callback(
+                    lambda t, caminho=caminho: RelatorioPdfService._finalizar_tarefa(caminho, t)
+                )
+
+        return RelatorioPdfService.GERANDO, caminho
+
+    @staticmethod
+    def _finalizar_tarefa(caminho: Path, tarefa: Future):
+        if tarefa.exception() is None:
+            with _relatorios_lock:
+                if _relatorios_tarefas.get(caminho) is tarefa:
+                    del _relatorios_tarefas[caminho]
+
+    @staticmethod
+    def _gerar_em_disco(*, aluno_id: int, caminho: Path):
+        temporario = caminho.with_name(f'.{caminho.stem}.{threading.get_ident()}.tmp')
+        try:
+            aluno = Aluno.objects.select_related('curso', 'semestre_ingresso').get(id=aluno_id)
+            dados = RelatorioAlunoService.gerar_dados_relatorio(aluno=aluno)
+
+            caminho.parent.mkdir(parents=True, exist_ok=True)
+            with open(temporario, 'wb') as arquivo:
+                RelatorioAlunoPdfBuilder(response=arquivo, dados=dados).build()
+            os.replace(temporario, caminho)
+
+            # Versões anteriores do relatório deste aluno não serão mais servidas
+            for antigo in caminho.parent.glob('*.pdf'):
+                if antigo != caminho:
+                    antigo.unlink(missing_ok=True)
+        except Exception:
+            temporario.unlink(missing_ok=True)
+            error_logger.exception(f'Erro ao gerar relatório em PDF do aluno {aluno_id}')
+            raise
+        finally:
+            close_old_connections()
+
+
+_relatorios_lote_semaforo = threading.BoundedSemaphore(settings.RELATORIOS_LOTE_SIMULTANEOS)
+
+
+class _BufferZip:
+    """Destino do ZipFile: acumula os bytes escritos até serem enviados ao cliente"""
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, dados) -> int:
+        self._partes.append(bytes(dados))
+        return len(dados)
+
+    def flush(self):
+        pass
+
+    def consumir(self) -> bytes:
+        dados = b''.join(self._partes)
+        self._partes.clear()
+        return dados
+
+
+class RelatorioLoteService:
+    """Relatórios em PDF de uma turma inteira, renderizados em paralelo e entregues em um ZIP"""
+
+    @staticmethod
+    def gerar_dados_relatorios(*, alunos, curso, semestre_ingresso=None) -> List[dict]:
+        """
+        Mesmos dados de RelatorioAlunoService.gerar_dados_relatorio para todos
+        os alunos do curso, buscados em lote (alunos, atividades e configurações).
+        """
+        alunos = list(alunos)
+        if not alunos:
+            return []
+
+        configuracoes = {
+            configuracao.semestre_id: configuracao
+            for configuracao in CursoPorSemestreSelectors.get_configuracoes_com_categorias(
+                curso=curso,
+                semestre=semestre_ingresso
+            )
+        }
+
+        atividades_por_categoria = {}
+        for atividade in AtividadeSelectors.get_atividades_dos_alunos(alunos):
+            atividades_por_categoria.setdefault((atividade.aluno_id, atividade.categoria_id), []).append(atividade)
+
+        lote = []
+        for aluno in alunos:
+            configuracao = configuracoes.get(aluno.semestre_ingresso_id)
+            categorias = configuracao.categorias_ordenadas if configuracao else []
+
+            categorias_dados = []
+            total_horas_validas = 0
+
+            for categoria in categorias:
+                atividades = atividades_por_categoria.get((aluno.id, categoria.id))
+                if not atividades:
+                    continue
+
+                horas_brutas = sum(atividade.horas_aprovadas or 0 for atividade in atividades)
+                horas_validas = horas_brutas
+                if categoria.limite_horas > 0:
+                    horas_validas = min(horas_brutas, categoria.limite_horas)
+                total_horas_validas += horas_validas
+
+                categorias_dados.append({
+                    'categoria': categoria,
+                    'atividades': atividades,
+                    'horas_brutas': horas_brutas,
+                    'horas_validas': horas_validas,
+                })
+
+            lote.append({
+                'aluno': aluno,
+                'categorias': categorias_dados,
+                'total_horas_validas': total_horas_validas,
+                'horas_requeridas': configuracao.horas_requeridas if configuracao else 0,
+            })
+
+        return lote
+
+    @staticmethod
+    def limitar_workers(max_workers: Optional[int] = None, *, total: int) -> int:
+        workers = max_workers or settings.RELATORIOS_LOTE_WORKERS
+        return max(1, min(workers, os.cpu_count() or 1, total))
+
+    @staticmethod
+    def renderizar_pdfs(*, lote: List[dict], max_workers: Optional[int] = None, progresso: Optional[Callable] = None) -> Iterator[Tuple[dict, Optional[bytes]]]:
+        """
+        Renderiza os PDFs em um pool de processos e os devolve conforme ficam
+        prontos. Em caso de falha de um aluno, devolve (dados, None) e segue.
+        """
+        if not lote:
+            return
+
+        executor = ProcessPoolExecutor(
+            max_workers=RelatorioLoteService.limitar_workers(max_workers, total=len(lote)),
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup
+        )
+        try:
+            tarefas = {executor.submit(renderizar_relatorio_pdf, dados): dados for dados in lote}
+
+            for concluidos, tarefa in enumerate(as_completed(tarefas), start=1):
+                dados = tarefas[tarefa]
+                try:
+                    pdf = tarefa.result()
+                except Exception:
+                    error_logger.exception(f'Erro ao gerar relatório em lote do aluno {dados["aluno"].id}')
+                    pdf = None
+
+                if progresso:
+                    progresso(concluidos, len(lote), dados['aluno'], pdf is not None)
+                yield dados, pdf
+        finally:
+            executor.shutdown(wait=True, cancel_futures=True)
+
+    @staticmethod
+    def gerar_zip(*, lote: List[dict], max_workers: Optional[int] = None, progresso: Optional[Callable] = None) -> Iterator[bytes]:
+        """Gera o ZIP em pedaços, um por PDF concluído, sem montar o arquivo inteiro em memória"""
+        buffer = _BufferZip()
+        falhas = []
+
+        with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as arquivo_zip:
+            for dados, pdf in RelatorioLoteService.renderizar_pdfs(lote=lote, max_workers=max_workers, progresso=progresso):
+                aluno = dados['aluno']
+                if pdf is None:
+                    falhas.append(f'{aluno.matricula} - {aluno.nome}')
+                    continue
+                arquivo_zip.writestr(f'relatorio_{aluno.matricula}.pdf', pdf)
+                yield buffer.consumir()
+
+            if falhas:
+                arquivo_zip.writestr('erros.txt', 'Relatórios não gerados:\n' + '\n'.join(falhas) + '\n')
+
+        yield buffer.consumir()
+
+    @staticmethod
+    def reservar_geracao() -> bool:
+        """Limita as gerações em lote simultâneas neste processo (RELATORIOS_LOTE_SIMULTANEOS)"""
+        return _relatorios_lote_semaforo.acquire(blocking=False)
+
+    @staticmethod
+    def liberar_geracao():
+        _relatorios_lote_semaforo.release()
+
+
 class CursoService:
 
     @staticmethod
@@ -427,47 +1274,51 @@ class CursoService:
         return semestres_atualizados      
 
 class StatsService:
+    # Estatísticas ficam frescas por 10 minutos e podem ser servidas obsoletas
+    # por mais 5 enquanto uma única requisição as recalcula
+    TTL = 600
+    TTL_OBSOLETO = 300
 
     @staticmethod
     def get_stats_gestor():
-        CACHE_KEY = 'gestor_dashboard_stats'
-        TTL = 600
-
-        stats = cache.get(CACHE_KEY)
-        if stats is not None:
-            return stats
-
-        stats = {
-            'num_alunos': AlunoSelectors.get_num_alunos(),
-            'alunos_com_pendencias': AlunoSelectors.get_num_alunos_com_pendencias(),
-        }
-
-        cache.set(CACHE_KEY, stats, TTL)
-        return stats
+        return cache_com_revalidacao(
+            'gestor_dashboard_stats',
+            lambda: {
+                'num_alunos': AlunoSelectors.get_num_alunos(),
+                'alunos_com_pendencias': AlunoSelectors.get_num_alunos_com_pendencias(),
+            },
+            ttl=StatsService.TTL,
+            obsoleto=StatsService.TTL_OBSOLETO,
+        )
     
     @staticmethod
     def get_stats_coordenador(curso):
-        CACHE_KEY = f'coordenador_{curso.id}_dashboard_stats'
-        TTL = 600
-
-        stats = cache.get(CACHE_KEY)
-        if stats is not None:
-            return stats
-
-        stats = {
-            'num_alunos': AlunoSelectors.get_num_alunos(curso=curso),
-            'alunos_com_pendencias': AlunoSelectors.get_num_alunos_com_pendencias(curso=curso),
-            'atividades_pendentes': AtividadeSelectors.get_num_atividades_pendentes(curso=curso),
-        }
+        return cache_com_revalidacao(
+            f'coordenador_{curso.id}_dashboard_stats',
+            lambda: {
+                'num_alunos': AlunoSelectors.get_num_alunos(curso=curso),
+                'alunos_com_pendencias': AlunoSelectors.get_num_alunos_com_pendencias(curso=curso),
+                'atividades_pendentes': AtividadeSelectors.get_num_atividades_pendentes(curso=curso),
+            },
+            ttl=StatsService.TTL,
+            obsoleto=StatsService.TTL_OBSOLETO,
+        )
 
-        cache.set(CACHE_KEY, stats, TTL)
-        return stats
+    @staticmethod
+    def get_ultimos_semestres(limite: int = 5, *, curso=None) -> List[dict]:
+        """Últimos semestres com contagem de ingressantes (dashboards de gestor e coordenador)"""
+        return cache_com_revalidacao(
+            f'ultimos_semestres_{curso.id if curso else "todos"}_{limite}',
+            lambda: SemestreSelectors.get_ultimos_semestres_com_alunos(limite, curso=curso),
+            ttl=StatsService.TTL,
+            obsoleto=StatsService.TTL_OBSOLETO,
+        )
     
     @staticmethod
     def invalidar_cache_coordenador(curso_id: int):
         try:
             cache_key = f'coordenador_{curso_id}_dashboard_stats'
-            cache.delete(cache_key)
+            marcar_obsoleto(cache_key, obsoleto=StatsService.TTL_OBSOLETO)
         except Exception:
             pass
 
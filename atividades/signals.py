@@ -0,0 +1,80 @@
+from django.contrib.auth.models import User
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_save
+from django.dispatch import receiver
+from .models import Aluno, Coordenador, Curso, Semestre
+from .selectors import UserSelectors
+
+
+@receiver([post_save, post_delete], sender=Aluno)
+@receiver([post_save, post_delete], sender=Coordenador)
+def invalidar_perfil_ao_alterar_vinculo(sender, instance, **kwargs):
+    """Aluno/Coordenador fazem parte do perfil em cache do usuário"""
+    UserSelectors.invalidar_cache_perfil(instance.user_id)
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_perfil_ao_alterar_grupos(sender, instance, action, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear'):
+        return
+    if isinstance(instance, User):
+        UserSelectors.invalidar_cache_perfil(instance.pk)
+    else:
+        # Alteração feita pelo lado do grupo (group.user_set)
+        UserSelectors.invalidar_cache_perfil(*(pk_set or ()))
+
+
+@receiver(post_save, sender=Curso)
+@receiver(post_save, sender=Semestre)
+def invalidar_perfis_ao_alterar_curso(sender, instance, created, **kwargs):
+    """O perfil em cache guarda o curso (e o semestre de ingresso) de alunos e coordenadores"""
+    if created:
+        return
+    if sender is Curso:
+        alunos = Aluno.objects.filter(curso=instance)
+        coordenadores = Coordenador.objects.filter(curso=instance).values_list('user_id', flat=True)
+    else:
+        alunos = Aluno.objects.filter(semestre_ingresso=instance)
+        coordenadores = ()
+    UserSelectors.invalidar_cache_perfil(*alunos.values_list('user_id', flat=True), *coordenadores)
+
+
+@receiver(post_delete, sender=Aluno)
+def descontar_pendencias_do_curso(sender, instance, **kwargs):
+    """As pendências do aluno excluído deixam de contar nos contadores do curso"""
+    if instance.atividades_pendentes:
+        Curso.objects.filter(id=instance.curso_id).update(
+            atividades_pendentes=F('atividades_pendentes') - instance.atividades_pendentes,
+            alunos_com_pendencias=F('alunos_com_pendencias') - 1,
+        )
+
+
+@receiver(pre_save, sender=Aluno)
+def registrar_curso_anterior(sender, instance, update_fields=None, **kwargs):
+    """Curso e pendências gravados antes do save, lidos (e travados) na transação do Aluno.save()"""
+    instance._curso_anterior = None
+    if instance._state.adding or (update_fields is not None and 'curso' not in update_fields):
+        return
+    instance._curso_anterior = (
+        Aluno.objects.select_for_update().filter(pk=instance.pk).values_list('curso_id', 'atividades_pendentes').first()
+    )
+
+
+@receiver(post_save, sender=Aluno)
+def transferir_pendencias_de_curso(sender, instance, created, **kwargs):
+    """Ao mudar de curso, as pendências do aluno saem dos contadores do curso antigo e entram no novo"""
+    anterior = getattr(instance, '_curso_anterior', None)
+    instance._curso_anterior = None
+    if created or anterior is None:
+        return
+    curso_anterior_id, pendentes = anterior
+    if curso_anterior_id == instance.curso_id or not pendentes:
+        return
+    Curso.objects.filter(id=curso_anterior_id).update(
+        atividades_pendentes=F('atividades_pendentes') - pendentes,
+        alunos_com_pendencias=F('alunos_com_pendencias') - 1,
+    )
+    Curso.objects.filter(id=instance.curso_id).update(
+        atividades_pendentes=F('atividades_pendentes') + pendentes,
+        alunos_com_pendencias=F('alunos_com_pendencias') + 1,
+    )
@@ -0,0 +1,31 @@
+/**
+ * Busca ao vivo nos filtros das listas (formulários .filtros-atividades com HTMX)
+ *
+ * - hx-sync="this:replace" no formulário cancela a requisição anterior ainda em andamento
+ * - Cada requisição leva um número de sequência crescente (cabeçalho X-Busca-Seq); o servidor
+ *   responde 204 às buscas já superadas (ListaAoVivoMixin)
+ * - Respostas que chegarem fora de ordem não substituem o resultado de uma busca mais nova
+ */
+(function () {
+    // Baseada no relógio para continuar crescendo após recarregar a página ou em outra aba
+    let ultimaSequencia = 0;
+
+    function proximaSequencia() {
+        ultimaSequencia = Math.max(Date.now(), ultimaSequencia + 1);
+        return ultimaSequencia;
+    }
+
+    document.addEventListener('htmx:configRequest', function (evento) {
+        if (!evento.detail.elt.matches('form.filtros-atividades')) {
+            return;
+        }
+        evento.detail.headers['X-Busca-Seq'] = String(proximaSequencia());
+    });
+
+    document.addEventListener('htmx:beforeSwap', function (evento) {
+        const sequencia = evento.detail.requestConfig.headers['X-Busca-Seq'];
+        if (sequencia && Number(sequencia) < ultimaSequencia) {
+            evento.detail.shouldSwap = false;
+        }
+    });
+})();
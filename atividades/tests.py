@@ -1,3 +1,246 @@
+import random
+from datetime import date
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import transaction
 from django.test import TestCase
+from atividades.forms import AtividadeForm
+from atividades.models import Aluno, Atividade, Categoria, CategoriaCurso, Curso, CursoPorSemestre, Semestre
+from atividades.services import AtividadeService, PendenciasService, SaldoHorasService
+from atividades.utils import paginar_por_cursor
+import io
 
-# Create your tests here.
+
+class FixtureAtividadesMixin:
+    """
+    Dois cursos com três categorias (limites diferentes) e alunos com atividades
+    pendentes, aprovadas e rejeitadas geradas com semente fixa. Saldos, status e
+    contadores partem do estado que os services manteriam.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        rnd = random.Random(2024)
+        cls.semestre = Semestre.objects.create(nome='2024.1', data_inicio=date(2024, 2, 1), data_fim=date(2024, 7, 31))
+        cls.cursos = [
+            Curso.objects.create(nome='Computação', horas_requeridas=200),
+            Curso.objects.create(nome='Matemática', horas_requeridas=150),
+        ]
+        categorias = [Categoria.objects.create(nome=nome) for nome in ('Ensino', 'Pesquisa', 'Extensão')]
+
+        cls.categorias = {}
+        for curso in cls.cursos:
+            curso_semestre = CursoPorSemestre.objects.create(
+                curso=curso, semestre=cls.semestre, horas_requeridas=curso.horas_requeridas
+            )
+            cls.categorias[curso.id] = [
+                CategoriaCurso.objects.create(categoria=categoria, curso_semestre=curso_semestre, limite_horas=limite)
+                for categoria, limite in zip(categorias, (20, 35, 60))
+            ]
+
+        cls.alunos = []
+        for i in range(6):
+            curso = cls.cursos[i % 2]
+            user = User.objects.create_user(username=f'20240{i}', password='x')
+            aluno = Aluno.objects.create(
+                user=user, nome=f'Aluno {i}', matricula=f'20240{i}', curso=curso, semestre_ingresso=cls.semestre
+            )
+            cls.alunos.append(aluno)
+            for j in range(12):
+                horas = rnd.randint(1, 25)
+                sorteio = rnd.random()
+                horas_aprovadas = None if sorteio < 0.5 else (0 if sorteio < 0.6 else rnd.randint(1, horas))
+                Atividade(
+                    aluno=aluno,
+                    categoria=rnd.choice(cls.categorias[curso.id]),
+                    nome=f'Atividade {j}',
+                    horas=horas,
+                    horas_aprovadas=horas_aprovadas,
+                    data=date(2024, 3, 1 + j),
+                ).save()
+
+        # Status pelos limites (lidos dos saldos), depois os saldos com os status finais
+        SaldoHorasService.reconstruir_saldos()
+        AtividadeService.recalcular_status_atividades_qs(Atividade.objects.select_related('aluno', 'categoria'))
+        SaldoHorasService.reconstruir_saldos()
+        PendenciasService.reconstruir_contadores()
+
+    def setUp(self):
+        cache.clear()
+
+    @staticmethod
+    def estado_atividades() -> dict:
+        return {
+            id_atividade: (status, horas_aprovadas)
+            for id_atividade, status, horas_aprovadas in Atividade.objects.values_list('id', 'status', 'horas_aprovadas')
+        }
+
+
+class AvaliacaoEmLoteTests(FixtureAtividadesMixin, TestCase):
+    """avaliar_atividades_em_lote simula em memória as regras de aprovar_horas: os dois caminhos devem concordar"""
+
+    def avaliar_uma_a_uma(self, atividades, aprovar):
+        erros = set()
+        for atividade in atividades.order_by('created_at', 'id'):
+            atividade = Atividade.objects.select_related('aluno', 'categoria').get(id=atividade.id)
+            try:
+                AtividadeService.aprovar_horas(atividade=atividade, horas_aprovadas=atividade.horas if aprovar else 0)
+            except ValueError:
+                erros.add(atividade.id)
+        return self.estado_atividades(), erros
+
+    def avaliar_em_lote(self, atividades, aprovar):
+        resultado = AtividadeService.avaliar_atividades_em_lote(atividades=atividades, aprovar=aprovar)
+        return self.estado_atividades(), {atividade.id for atividade, _ in resultado['erros']}
+
+    def comparar(self, atividades, aprovar):
+        with transaction.atomic():
+            esperado = self.avaliar_uma_a_uma(atividades, aprovar)
+            transaction.set_rollback(True)
+        cache.clear()
+        obtido = self.avaliar_em_lote(atividades, aprovar)
+
+        self.assertEqual(obtido[0], esperado[0])
+        self.assertEqual(obtido[1], esperado[1])
+
+    def test_aprovar_pendentes(self):
+        self.comparar(Atividade.objects.filter(status='Pendente'), aprovar=True)
+
+    def test_aprovar_todas(self):
+        # Inclui já avaliadas e com limite atingido, que devem dar os mesmos erros
+        self.comparar(Atividade.objects.all(), aprovar=True)
+
+    def test_rejeitar_todas(self):
+        self.comparar(Atividade.objects.all(), aprovar=False)
+
+    def test_aprovar_de_um_aluno(self):
+        self.comparar(Atividade.objects.filter(aluno=self.alunos[0]), aprovar=True)
+
+
+class PaginacaoPorCursorTests(FixtureAtividadesMixin, TestCase):
+    """Percorrer as páginas para frente e depois para trás deve dar a ordenação completa, sem repetir nem pular"""
+
+    def percorrer(self, qs, per_page):
+        paginas = [paginar_por_cursor(qs, per_page=per_page)]
+        while paginas[-1].has_next():
+            paginas.append(paginar_por_cursor(qs, cursor=paginas[-1].next_cursor, per_page=per_page))
+        para_frente = [[atividade.id for atividade in pagina] for pagina in paginas]
+
+        voltando = [paginas[-1]]
+        while voltando[-1].has_previous():
+            voltando.append(paginar_por_cursor(qs, cursor=voltando[-1].previous_cursor, per_page=per_page))
+        para_tras = [[atividade.id for atividade in pagina] for pagina in reversed(voltando)]
+        return para_frente, para_tras
+
+    def verificar_ordenacao(self, ordenacao, chave_esperada):
+        esperado = [
+            atividade.id for atividade in sorted(Atividade.objects.all(), key=chave_esperada)
+        ]
+        for per_page in (1, 5, 7, len(esperado), len(esperado) + 3):
+            with self.subTest(ordenacao=ordenacao, per_page=per_page):
+                para_frente, para_tras = self.percorrer(Atividade.objects.order_by(*ordenacao), per_page)
+                self.assertEqual([id_atividade for pagina in para_frente for id_atividade in pagina], esperado)
+                self.assertEqual(para_tras, para_frente)
+                self.assertFalse(paginar_por_cursor(Atividade.objects.order_by(*ordenacao), per_page=per_page).has_previous())
+
+    def test_chave_com_nulos_crescente(self):
+        # NULL é o menor valor: primeiro em ordem crescente
+        self.verificar_ordenacao(
+            ['horas_aprovadas'],
+            lambda a: (a.horas_aprovadas is not None, a.horas_aprovadas or 0, a.id)
+        )
+
+    def test_chave_com_nulos_decrescente(self):
+        # ... e por último em decrescente; o id desempata sempre em ordem crescente
+        self.verificar_ordenacao(
+            ['-horas_aprovadas'],
+            lambda a: (a.horas_aprovadas is None, -(a.horas_aprovadas or 0), a.id)
+        )
+
+    def test_varias_chaves(self):
+        self.verificar_ordenacao(
+            ['status', '-horas_aprovadas', '-id'],
+            lambda a: (a.status, a.horas_aprovadas is None, -(a.horas_aprovadas or 0), -a.id)
+        )
+
+    def test_cursor_invalido_volta_para_primeira_pagina(self):
+        qs = Atividade.objects.order_by('horas_aprovadas')
+        primeira = paginar_por_cursor(qs, per_page=5)
+        self.assertEqual(list(paginar_por_cursor(qs, cursor='invalido', per_page=5)), list(primeira))
+
+
+class ContadoresConsistentesTests(FixtureAtividadesMixin, TestCase):
+    """Depois de cada operação dos services, saldos e contadores de pendências batem com as atividades"""
+
+    def assertConsistente(self):
+        for comando in ('recalcular_saldos_horas', 'recalcular_pendencias'):
+            call_command(comando, '--verificar', stdout=io.StringIO())
+
+    def test_estado_inicial(self):
+        self.assertConsistente()
+
+    def test_cadastrar_atividade(self):
+        aluno = self.alunos[0]
+        form = AtividadeForm(
+            {'categoria': self.categorias[aluno.curso_id][0].id, 'nome': 'Monitoria', 'horas': 10, 'data': '01/03/2024'},
+            aluno=aluno
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        AtividadeService.cadastrar_atividade(form=form, aluno=aluno)
+        self.assertConsistente()
+
+    def test_editar_atividade_trocando_categoria(self):
+        atividade = Atividade.objects.filter(aluno=self.alunos[1], status='Pendente').first()
+        outra = next(categoria for categoria in self.categorias[atividade.aluno.curso_id] if categoria.id != atividade.categoria_id)
+        form = AtividadeForm(
+            {'categoria': outra.id, 'nome': atividade.nome, 'horas': atividade.horas + 3, 'data': '01/03/2024'},
+            instance=atividade,
+            aluno=atividade.aluno
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        AtividadeService.editar_atividade(form=form)
+        self.assertConsistente()
+
+    def test_aprovar_horas(self):
+        for atividade in Atividade.objects.filter(status='Pendente').select_related('aluno', 'categoria')[:10]:
+            try:
+                AtividadeService.aprovar_horas(atividade=atividade, horas_aprovadas=atividade.horas)
+            except ValueError:
+                continue
+            self.assertConsistente()
+
+    def test_avaliar_em_lote(self):
+        AtividadeService.avaliar_atividades_em_lote(atividades=Atividade.objects.filter(status='Pendente'), aprovar=True)
+        self.assertConsistente()
+        AtividadeService.avaliar_atividades_em_lote(atividades=Atividade.objects.all(), aprovar=False)
+        self.assertConsistente()
+
+    def test_excluir_atividade(self):
+        for atividade in Atividade.objects.filter(aluno=self.alunos[2]).select_related('aluno', 'categoria')[:4]:
+            AtividadeService.exluir_atividade(atividade)
+            self.assertConsistente()
+
+    def test_trocar_aluno_de_curso(self):
+        aluno = Aluno.objects.filter(atividades_pendentes__gt=0).first()
+        aluno.curso = next(curso for curso in self.cursos if curso.id != aluno.curso_id)
+        aluno.save()
+        self.assertConsistente()
+
+    def test_salvar_curso_nao_sobrescreve_contadores(self):
+        curso = Curso.objects.get(id=self.cursos[0].id)
+        aluno = Aluno.objects.filter(curso=curso).first()
+        form = AtividadeForm(
+            {'categoria': self.categorias[curso.id][2].id, 'nome': 'Nova', 'horas': 5, 'data': '01/04/2024'},
+            aluno=aluno
+        )
+        self.assertTrue(form.is_valid(), form.errors)
+        AtividadeService.cadastrar_atividade(form=form, aluno=aluno)
+        # Instância lida antes da atualização dos contadores
+        curso.nome = 'Ciência da Computação'
+        curso.save()
+        self.assertConsistente()
+
+    def test_excluir_aluno(self):
+        Aluno.objects.filter(atividades_pendentes__gt=0).first().delete()
+        self.assertConsistente()
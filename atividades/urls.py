@@ -50,14 +50,19 @@ urlpatterns = [
     path('alunos-coordenador/', views.ListarAlunosCoordenadorView.as_view(), name='listar_alunos_coordenador'),
     path('atividades-coordenador/', views.ListarAtividadesCoordenadorView.as_view(), name='listar_atividades_coordenador'),
     path('aprovar-horas-atividade/<int:atividade_id>/', views.AprovarHorasAtividadeView.as_view(), name='aprovar_horas_atividade'),
+    path('avaliar-atividades-em-lote/', views.AvaliarAtividadesEmLoteView.as_view(), name='avaliar_atividades_em_lote'),
     path('relatorio/gerar/', views.GerarRelatorioAlunoView.as_view(), name='gerar_relatorio_aluno'),
+    path('relatorio/status/', views.StatusRelatorioAlunoView.as_view(), name='status_relatorio_aluno'),
+    path('relatorio/turma/', views.GerarRelatoriosTurmaView.as_view(), name='gerar_relatorios_turma'),
     #LOGS
     path('visualizar-logs/', views.VisualizarLogsView.as_view(), name='visualizar_logs'),
+    path('desempenho-views/', views.DesempenhoViewsView.as_view(), name='desempenho_views'),
     # Notificações
     path('notificacoes/', views.ListarNotificacoesDropdownView.as_view(), name='listar_notificacoes'),
     path('notificacoes/<int:notificacao_id>/marcar-lida/', views.MarcarNotificacaoLidaView.as_view(), name='marcar_notificacao_lida'),
     path('notificacoes/marcar-todas-lidas/', views.MarcarTodasLidasView.as_view(), name='marcar_todas_lidas'),
     path('notificacoes/count-nao-lidas/', views.CountNotificacoesNaoLidas.as_view(), name='contar_notificacoes'),
+    path('notificacoes/stream/', views.StreamNotificacoesView.as_view(), name='stream_notificacoes'),
     #Mensagens HTMX
     path('get-messages/', views.GetMessagesView.as_view(), name='get_messages'),
 ]
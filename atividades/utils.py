@@ -1,12 +1,487 @@
-from django.core.paginator import Paginator, PageNotAnInteger, EmptyPage
+from collections.abc import Sequence
+from django.apps import apps
+from django.conf import settings
+from django.core import signing
+from django.core.cache import cache
+from django.core.paginator import Paginator, EmptyPage
+from django.db import connections, transaction
+from django.db.models import F, OrderBy, Q, QuerySet
+from django.utils.functional import cached_property
+from functools import reduce
+from pathlib import Path
+import datetime
+import decimal
+import hashlib
+import operator
+import random
+import re
+import time
+import uuid
 
+from .selectors import contagem_cache_key, get_geracoes_tabelas, tabela_geracao_key
 
-def paginate_queryset(qs, *, page, per_page=15):
-    paginator = Paginator(qs, per_page)
+
+def paginate_queryset(qs, *, page=None, per_page=15, cursor=None, por_cursor=False):
+    """
+    Página `page` de qs pelo Paginator (COUNT + OFFSET). Com por_cursor=True
+    usa paginação por cursor (keyset): só "anterior/próxima", a partir do
+    token `cursor` de uma página já exibida (ver paginar_por_cursor).
+    """
+    if por_cursor:
+        return paginar_por_cursor(qs, cursor=cursor, per_page=per_page)
+
+    paginator = PaginadorContagemCache(qs, per_page)
+
+    try:
+        numero = int(page)
+    except (TypeError, ValueError):
+        numero = 1
+    if numero <= 1:
+        return paginator.primeira_pagina()
 
     try:
-        return paginator.page(page)
-    except PageNotAnInteger:
-        return paginator.page(1)
+        return paginator.page(numero)
     except EmptyPage:
         return paginator.page(paginator.num_pages)
+
+
+class PaginadorContagemCache(Paginator):
+    """
+    Paginator cuja contagem fica em cache por PAGINACAO_CONTAGEM_TTL segundos,
+    na chave da consulta (SQL + parâmetros, sem ordenação) e das gerações das
+    tabelas que ela lê; qualquer escrita nessas tabelas muda a geração
+    (InvalidadorTabelas), então a contagem nunca sobrevive a uma alteração.
+
+    A contagem para em PAGINACAO_CONTAGEM_LIMITE: acima disso o total fica
+    como "pelo menos N" (contagem_estimada) e só as páginas até N navegam.
+    """
+
+    def __init__(self, object_list, per_page, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.contagem_estimada = False
+
+    @cached_property
+    def _chave_contagem(self):
+        if not isinstance(self.object_list, QuerySet):
+            return None
+        consulta = self.object_list.order_by()
+        sql, params = consulta.query.sql_with_params()
+        conexao = connections[consulta.db]
+        tabelas = sorted(
+            tabela for tabela in tabelas_dos_models()
+            if conexao.ops.quote_name(tabela) in sql
+        )
+        if _escritas_pendentes(conexao) & set(tabelas):
+            # A transação atual alterou essas tabelas: nem lê nem grava a contagem no cache
+            return None
+        assinatura = hashlib.sha1(
+            repr((consulta.db, sql, params, tabelas, get_geracoes_tabelas(tabelas))).encode()
+        ).hexdigest()
+        return contagem_cache_key(assinatura)
+
+    @cached_property
+    def count(self):
+        if self._chave_contagem is None:
+            return super().count
+
+        limite = settings.PAGINACAO_CONTAGEM_LIMITE
+        total = cache.get(self._chave_contagem)
+        if total is None:
+            # COUNT sobre a consulta limitada: o custo não cresce além do limite
+            total = self.object_list.order_by()[:limite + 1].count()
+            cache.set(self._chave_contagem, total, settings.PAGINACAO_CONTAGEM_TTL)
+
+        self.contagem_estimada = total > limite
+        return min(total, limite)
+
+    def primeira_pagina(self):
+        """
+        Página 1. Sem contagem em cache, busca per_page + 1 itens: se couberem
+        em uma página o total sai da própria consulta da página (uma consulta
+        em vez de duas); senão a contagem só é feita quando for exibida.
+        """
+        if 'count' in self.__dict__ or self._chave_contagem is None or cache.get(self._chave_contagem) is not None:
+            return self.page(1)
+
+        itens = list(self.object_list[:self.per_page + 1])
+        if len(itens) <= self.per_page:
+            self.count = len(itens)
+            cache.set(self._chave_contagem, self.count, settings.PAGINACAO_CONTAGEM_TTL)
+        return self._get_page(itens[:self.per_page], 1, self)
+
+
+_tabelas_cache = None
+
+
+def tabelas_dos_models():
+    global _tabelas_cache
+    if _tabelas_cache is None:
+        _tabelas_cache = frozenset(model._meta.db_table for model in apps.get_models(include_auto_created=True))
+    return _tabelas_cache
+
+
+def invalidar_tabelas(tabelas):
+    """
+    Muda a geração das tabelas: contagens e listas em cache que as leem deixam de valer.
+    Só as tabelas cuja geração já foi lida (get_geracoes_tabelas) têm chave no cache;
+    as demais (sessões, notificações...) não têm nada em cache a invalidar e custam
+    apenas esta leitura, sem uma gravação no cache por escrita no banco.
+    """
+    for chave in cache.get_many([tabela_geracao_key(tabela) for tabela in tabelas]):
+        try:
+            cache.incr(chave)
+        except ValueError:
+            # Removida entre a leitura e o incr: o próximo leitor recomeça pelo relógio
+            pass
+
+
+_ESCRITA_SQL = re.compile(r'^\s*(?:INSERT\s+(?:OR\s+\w+\s+)?INTO|UPDATE|DELETE\s+FROM)\s+[`"\[]?(\w+)', re.IGNORECASE)
+
+
+class _InvalidacaoPendente:
+    """Callback de on_commit que invalida, uma vez só, as tabelas escritas na transação"""
+
+    def __init__(self):
+        self.tabelas = set()
+
+    def __call__(self):
+        invalidar_tabelas(self.tabelas)
+
+
+def _escritas_pendentes(conexao):
+    """Tabelas alteradas pela transação em andamento (ainda não invalidadas)"""
+    for _, callback, _ in conexao.run_on_commit:
+        if isinstance(callback, _InvalidacaoPendente):
+            return callback.tabelas
+    return set()
+
+
+class InvalidadorTabelas:
+    """
+    execute_wrapper instalado em toda conexão (AtividadesConfig.ready) que
+    muda a geração (invalidar_tabelas) das tabelas alteradas por INSERT,
+    UPDATE ou DELETE, inclusive update()/bulk_create(), que não disparam
+    signals. Dentro de uma transação a invalidação espera o COMMIT.
+    """
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+
+    def __call__(self, execute, sql, params, many, context):
+        resultado = execute(sql, params, many, context)
+        if sql[:1] in 'SsWw(':
+            return resultado
+
+        encontrado = _ESCRITA_SQL.match(sql)
+        if encontrado is None or encontrado.group(1) not in tabelas_dos_models():
+            return resultado
+
+        tabela = encontrado.group(1)
+        if not self.conexao.in_atomic_block:
+            invalidar_tabelas((tabela,))
+            return resultado
+
+        pendentes = _escritas_pendentes(self.conexao)
+        if not pendentes:
+            callback = _InvalidacaoPendente()
+            transaction.on_commit(callback, using=self.conexao.alias)
+            pendentes = callback.tabelas
+        pendentes.add(tabela)
+        return resultado
+
+
+class RegistroTabelasLidas:
+    """
+    execute_wrapper que anota as tabelas (dos models) citadas nas consultas executadas
+    e a geração de cada uma, lida antes da primeira consulta que a usa: uma escrita
+    depois disso já invalida o que foi montado. Só essas tabelas ganham chave de geração.
+    """
+
+    def __init__(self, conexao):
+        self.conexao = conexao
+        self.geracoes = {}
+
+    @property
+    def tabelas(self):
+        return set(self.geracoes)
+
+    def __call__(self, execute, sql, params, many, context):
+        novas = [
+            tabela for tabela in tabelas_dos_models()
+            if tabela not in self.geracoes and self.conexao.ops.quote_name(tabela) in sql
+        ]
+        if novas:
+            self.geracoes.update(zip(novas, get_geracoes_tabelas(novas)))
+        return execute(sql, params, many, context)
+
+
+def instalar_invalidador_tabelas(sender, connection, **kwargs):
+    """Receiver de connection_created"""
+    if not any(isinstance(wrapper, InvalidadorTabelas) for wrapper in connection.execute_wrappers):
+        connection.execute_wrappers.append(InvalidadorTabelas(connection))
+
+
+CURSOR_SALT = 'atividades.paginacao.cursor'
+
+
+class PaginaCursor(Sequence):
+    """
+    Página da paginação por cursor. Tem a mesma interface de leitura de uma
+    Page do Paginator (iteração, has_next, has_previous, has_other_pages),
+    mas sem número de página nem total: navega com next_cursor/previous_cursor.
+    """
+    por_cursor = True
+
+    def __init__(self, object_list, *, next_cursor=None, previous_cursor=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+
+    def __getitem__(self, indice):
+        return self.object_list[indice]
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __repr__(self):
+        return f'<PaginaCursor com {len(self)} itens>'
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+
+def paginar_por_cursor(qs, *, cursor=None, per_page=15):
+    """
+    Paginação keyset: em vez de OFFSET, filtra pelos valores das chaves de
+    ordenação do último (ou primeiro) item da página vista, com o id como
+    desempate, então qualquer página custa o mesmo que a primeira e não há
+    COUNT(*). O cursor é um token assinado com esses valores; token
+    inválido ou de outra ordenação volta para a primeira página.
+
+    NULL é tratado como o menor valor em todos os bancos (como no SQLite):
+    primeiro em ordem crescente, por último em decrescente.
+    """
+    chaves = _chaves_ordenacao(qs)
+    qs = qs.annotate(**{f'cursor_{i}': expressao for i, (expressao, _) in enumerate(chaves)})
+
+    direcao, valores = 'proxima', None
+    if cursor:
+        try:
+            dados = signing.loads(cursor, salt=CURSOR_SALT)
+            if dados['d'] in ('proxima', 'anterior') and len(dados['v']) == len(chaves):
+                direcao, valores = dados['d'], dados['v']
+        except (signing.BadSignature, KeyError, TypeError):
+            pass
+
+    # Para a página anterior percorre a ordenação ao contrário e inverte o resultado
+    invertida = direcao == 'anterior'
+    ordenacao = [
+        OrderBy(F(f'cursor_{i}'), descending=descendente != invertida,
+                nulls_first=True if descendente == invertida else None,
+                nulls_last=True if descendente != invertida else None)
+        for i, (_, descendente) in enumerate(chaves)
+    ]
+    qs = qs.order_by(*ordenacao)
+    if valores is not None:
+        qs = qs.filter(_depois_de(chaves, valores, invertida=invertida))
+
+    itens = list(qs[:per_page + 1])
+    tem_mais = len(itens) > per_page
+    itens = itens[:per_page]
+    if invertida:
+        itens.reverse()
+
+    if not itens:
+        return PaginaCursor(itens)
+
+    proxima = _gerar_cursor('proxima', itens[-1], len(chaves))
+    anterior = _gerar_cursor('anterior', itens[0], len(chaves))
+    if invertida:
+        return PaginaCursor(itens, next_cursor=proxima, previous_cursor=anterior if tem_mais else None)
+    return PaginaCursor(
+        itens,
+        next_cursor=proxima if tem_mais else None,
+        previous_cursor=anterior if valores is not None else None,
+    )
+
+
+def _chaves_ordenacao(qs):
+    """[(expressão, descendente)] da ordenação de qs, terminando sempre no pk"""
+    ordenacao = qs.query.order_by or (qs.query.get_meta().ordering if qs.query.default_ordering else ())
+
+    chaves = []
+    for item in ordenacao:
+        if isinstance(item, str):
+            if item == '?':
+                raise ValueError('Ordenação aleatória não pode ser paginada por cursor.')
+            chaves.append((F(item.lstrip('-')), item.startswith('-')))
+        elif isinstance(item, OrderBy):
+            chaves.append((item.expression, item.descending))
+        else:
+            chaves.append((item, False))
+
+    if not any(isinstance(expressao, F) and expressao.name in ('pk', 'id') for expressao, _ in chaves):
+        chaves.append((F('pk'), False))
+    return chaves
+
+
+def _depois_de(chaves, valores, *, invertida):
+    """
+    Filtro das linhas que vêm depois de `valores` na ordenação (na ordem
+    inversa se invertida): (k0 > v0) OR (k0 = v0 AND k1 > v1) OR ...
+    """
+    alternativas = []
+    anteriores_iguais = Q()
+    for i, ((_, descendente), valor) in enumerate(zip(chaves, valores)):
+        campo = f'cursor_{i}'
+        if descendente != invertida:
+            # Decrescente: depois vêm os menores e, por serem os menores, os NULL
+            depois = None if valor is None else Q(**{f'{campo}__lt': valor}) | Q(**{f'{campo}__isnull': True})
+        else:
+            depois = Q(**{f'{campo}__isnull': False}) if valor is None else Q(**{f'{campo}__gt': valor})
+        if depois is not None:
+            alternativas.append(anteriores_iguais & depois)
+        anteriores_iguais &= Q(**{f'{campo}__isnull': True}) if valor is None else Q(**{campo: valor})
+    return reduce(operator.or_, alternativas)
+
+
+def _gerar_cursor(direcao, item, quantidade_chaves):
+    valores = [_valor_cursor(getattr(item, f'cursor_{i}')) for i in range(quantidade_chaves)]
+    return signing.dumps({'d': direcao, 'v': valores}, salt=CURSOR_SALT, compress=True)
+
+
+def _valor_cursor(valor):
+    # Tipos sem JSON viram texto; o campo converte de volta ao comparar
+    if isinstance(valor, (datetime.date, datetime.time)):
+        return valor.isoformat()
+    if isinstance(valor, (decimal.Decimal, uuid.UUID)):
+        return str(valor)
+    return valor
+
+
+
+def cache_com_revalidacao(chave, calcular, *, ttl, obsoleto=None, variacao=0.1, trava_ttl=60):
+    """
+    Valor em cache protegido contra recálculos simultâneos (stampede).
+
+    - O valor é fresco por `ttl` segundos, reduzidos aleatoriamente em até
+      `variacao` (fração) para que chaves gravadas juntas não expirem juntas.
+    - Depois disso, por mais `obsoleto` segundos (padrão: ttl), o valor antigo
+      continua sendo servido na hora enquanto só quem obtiver a trava
+      `<chave>:trava` recalcula. marcar_obsoleto() antecipa esse estado.
+    - Sem valor nenhum (primeiro acesso ou expirado), só quem obtiver a trava
+      grava o resultado; os demais calculam sem esperar e sem gravar.
+    """
+    entrada = cache.get(chave)
+    if _entrada_revalidavel(entrada):
+        valor, fresco_ate = entrada
+        if time.time() < fresco_ate:
+            return valor
+        if not cache.add(f'{chave}:trava', 1, trava_ttl):
+            # Outro chamador já está recalculando
+            return valor
+        return _recalcular_e_gravar(chave, calcular, ttl=ttl, obsoleto=obsoleto, variacao=variacao)
+
+    # Inclui entradas em outro formato (gravadas antes deste helper): tratadas como ausentes
+    if cache.add(f'{chave}:trava', 1, trava_ttl):
+        return _recalcular_e_gravar(chave, calcular, ttl=ttl, obsoleto=obsoleto, variacao=variacao)
+    return calcular()
+
+
+def marcar_obsoleto(chave, *, obsoleto):
+    """
+    Invalida uma chave de cache_com_revalidacao sem apagá-la: o próximo acesso
+    recalcula, e os acessos simultâneos recebem o valor anterior em vez de
+    também calcularem (ou esperarem).
+    """
+    entrada = cache.get(chave)
+    if _entrada_revalidavel(entrada):
+        cache.set(chave, (entrada[0], 0), obsoleto)
+
+
+def _entrada_revalidavel(entrada) -> bool:
+    return isinstance(entrada, tuple) and len(entrada) == 2 and isinstance(entrada[1], (int, float))
+
+
+def _recalcular_e_gravar(chave, calcular, *, ttl, obsoleto, variacao):
+    try:
+        valor = calcular()
+        fresco = ttl * (1 - random.random() * variacao)
+        obsoleto = ttl if obsoleto is None else obsoleto
+        cache.set(chave, (valor, time.time() + fresco), fresco + obsoleto)
+        return valor
+    finally:
+        cache.delete(f'{chave}:trava')
+
+
+def _linhas_do_fim(arquivo, fim, tamanho_bloco):
+    """Gera (início, linha) de arquivo[0:fim], da última linha para a primeira, lendo em blocos"""
+    pos = fim
+    resto = b''
+    while pos > 0:
+        tamanho = min(tamanho_bloco, pos)
+        pos -= tamanho
+        arquivo.seek(pos)
+        resto = arquivo.read(tamanho) + resto
+
+        # Ignora o '\n' final da última linha ao procurar o início dela
+        idx = resto.rfind(b'\n', 0, len(resto) - 1)
+        while idx != -1:
+            yield pos + idx + 1, resto[idx + 1:]
+            resto = resto[:idx + 1]
+            idx = resto.rfind(b'\n', 0, len(resto) - 1)
+
+    if resto:
+        yield 0, resto
+
+
+def ler_log_do_fim(caminho, *, quantidade, cursor=None, backups=0, tamanho_bloco=8192):
+    """
+    Lê as últimas `quantidade` linhas de um log (mais recentes primeiro) sem
+    carregar o arquivo, continuando pelos backups do RotatingFileHandler
+    (.1, .2, ...). O cursor ("<inode>:<offset>") retornado aponta para onde a
+    próxima página começa e continua válido mesmo se o arquivo rotacionar.
+    Retorna (linhas, próximo cursor ou None).
+    """
+    caminho = Path(caminho)
+    segmentos = []
+    for candidato in [caminho] + [caminho.with_name(f'{caminho.name}.{i}') for i in range(1, backups + 1)]:
+        try:
+            info = candidato.stat()
+        except FileNotFoundError:
+            continue
+        segmentos.append((candidato, info.st_ino, info.st_size))
+
+    inicio_segmento, fim = 0, None
+    if cursor:
+        try:
+            inode, offset = (int(parte) for parte in cursor.split(':'))
+        except ValueError:
+            inode, offset = None, None
+        for indice, (_, ino, tamanho) in enumerate(segmentos):
+            if ino == inode:
+                inicio_segmento, fim = indice, min(offset, tamanho)
+                break
+
+    linhas = []
+    for indice in range(inicio_segmento, len(segmentos)):
+        segmento, inode, tamanho = segmentos[indice]
+        fim_segmento = fim if indice == inicio_segmento and fim is not None else tamanho
+
+        with open(segmento, 'rb') as arquivo:
+            for inicio, linha in _linhas_do_fim(arquivo, fim_segmento, tamanho_bloco):
+                linhas.append(linha.decode('utf-8', errors='replace').rstrip('\r\n'))
+                if len(linhas) == quantidade:
+                    if inicio > 0:
+                        return linhas, f'{inode}:{inicio}'
+                    if any(t > 0 for _, _, t in segmentos[indice + 1:]):
+                        return linhas, f'{inode}:0'
+                    return linhas, None
+
+    return linhas, None
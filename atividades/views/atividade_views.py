@@ -9,7 +9,7 @@ from ..forms import AtividadeForm
 from ..selectors import AlunoSelectors, AtividadeSelectors, UserSelectors
 from ..services import AtividadeService
 from ..filters import AtividadesCoordenadorFilter, AtividadesFilter
-from ..mixins import AlunoRequiredMixin, CoordenadorRequiredMixin
+from ..mixins import AlunoRequiredMixin, CoordenadorRequiredMixin, ListaAoVivoMixin
 
 
 class CadastrarAtividadeView(AlunoRequiredMixin, View):
@@ -72,7 +72,7 @@ class EditarAtividadeView(AlunoRequiredMixin, View):
         form = AtividadeForm(request.POST, request.FILES, instance=self.atividade, aluno=self.aluno)
         
         if form.is_valid():
-            form.save()
+            AtividadeService.editar_atividade(form=form)
             messages.success(request, f'Atividade {self.atividade.nome} atualizada com sucesso!')
             
             if request.headers.get('HX-Request'):
@@ -120,10 +120,11 @@ class ExcluirAtividadeView(AlunoRequiredMixin, View):
         
         return redirect(request.META.get('HTTP_REFERER', 'listar_atividades'))
 
-class ListarAtividadesView(AlunoRequiredMixin, TemplateView):
+class ListarAtividadesView(AlunoRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_atividades.html'
     htmx_template_name = 'listas/contents/atividades_aluno.html'
     htmx_partial_template_name = 'listas/partials/atividades_list.html'
+    paginacao_por_cursor = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -132,7 +133,13 @@ class ListarAtividadesView(AlunoRequiredMixin, TemplateView):
         filtro = AtividadesFilter(self.request.GET or None, queryset=atividades, request=self.request)
         atividades_filtradas = filtro.qs
 
-        atividades_paginadas = paginate_queryset(qs=atividades_filtradas, page=self.request.GET.get('page'), per_page=10)
+        atividades_paginadas = paginate_queryset(
+            qs=atividades_filtradas,
+            page=self.request.GET.get('page'),
+            per_page=10,
+            cursor=self.request.GET.get('cursor'),
+            por_cursor=self.paginacao_por_cursor,
+        )
         context['atividades'] = atividades_paginadas
         context['filter'] = filtro
 
@@ -153,9 +160,10 @@ class ListarAtividadesView(AlunoRequiredMixin, TemplateView):
             return [self.template_name]
 
 
-class ListarAtividadesCoordenadorView(CoordenadorRequiredMixin, TemplateView):
+class ListarAtividadesCoordenadorView(CoordenadorRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_atividades_coordenador.html'
     htmx_template_name = 'listas/partials/atividades_coord_list.html'
+    paginacao_por_cursor = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -173,7 +181,13 @@ class ListarAtividadesCoordenadorView(CoordenadorRequiredMixin, TemplateView):
         filtro = AtividadesCoordenadorFilter(self.request.GET, queryset=atividades, aluno_id=aluno_id)
         atividades_filtradas = filtro.qs
 
-        atividades_paginadas = paginate_queryset(qs=atividades_filtradas, page=self.request.GET.get('page'), per_page=10)
+        atividades_paginadas = paginate_queryset(
+            qs=atividades_filtradas,
+            page=self.request.GET.get('page'),
+            per_page=10,
+            cursor=self.request.GET.get('cursor'),
+            por_cursor=self.paginacao_por_cursor,
+        )
 
         context['aluno'] = aluno if aluno_id else None
         context['atividades'] = atividades_paginadas
@@ -210,3 +224,27 @@ class AprovarHorasAtividadeView(CoordenadorRequiredMixin, View):
 
         messages.success(request, f'Atividade {self.atividade.nome} aprovada com {horas_aprovadas} horas!')
         return redirect(request.META.get('HTTP_REFERER', 'listar_atividades_coordenador'))
+
+
+class AvaliarAtividadesEmLoteView(CoordenadorRequiredMixin, View):
+    def post(self, request):
+        coordenador = UserSelectors.get_coordenador_by_user(request.user)
+        url = request.META.get('HTTP_REFERER', 'listar_atividades_coordenador')
+        acao = request.POST.get('acao')
+        ids = [i for i in request.POST.getlist('atividades') if i.isdigit()]
+
+        if acao not in ('aprovar', 'rejeitar') or not ids:
+            messages.warning(request, 'Selecione ao menos uma atividade e a ação desejada.')
+            return redirect(url)
+
+        atividades = AtividadeSelectors.get_atividades_do_curso_por_ids(ids=ids, curso=coordenador.curso)
+        resultado = AtividadeService.avaliar_atividades_em_lote(atividades=atividades, aprovar=acao == 'aprovar')
+
+        avaliadas = len(resultado['avaliadas'])
+        if avaliadas:
+            verbo = 'aprovada(s)' if acao == 'aprovar' else 'rejeitada(s)'
+            messages.success(request, f'{avaliadas} atividade(s) {verbo} com sucesso!')
+        for atividade, erro in resultado['erros']:
+            messages.warning(request, f'{atividade.nome} ({atividade.aluno.nome}): {erro}')
+
+        return redirect(url)
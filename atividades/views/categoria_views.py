@@ -11,7 +11,7 @@ from atividades.selectors import CategoriaSelectors, SemestreSelectors
 
 from ..models import Categoria
 from ..forms import CategoriaForm
-from ..mixins import GestorRequiredMixin
+from ..mixins import GestorRequiredMixin, ListaAoVivoMixin
 
 business_logger = logging.getLogger('atividades.business')
 
@@ -74,7 +74,7 @@ class ExcluirCategoriaView(GestorRequiredMixin, View):
         return redirect('listar_categorias')
 
 
-class ListarCategoriasView(GestorRequiredMixin, TemplateView):
+class ListarCategoriasView(GestorRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_categorias.html'
     htmx_template_name = 'listas/htmx/categorias_list.html'
 
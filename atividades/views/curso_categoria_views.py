@@ -6,9 +6,9 @@ from django.contrib import messages
 from ..models import Curso, CategoriaCurso, Semestre
 from ..forms import CategoriaCursoForm, CategoriaCursoDiretaForm
 from ..selectors import CategoriaCursoSelectors, UserSelectors
-from ..services import CategoriaCursoService
+from ..services import CategoriaCursoService, SaldoHorasService
 from ..filters import CategoriaCursoFilter
-from ..mixins import GestorOuCoordenadorRequiredMixin
+from ..mixins import GestorOuCoordenadorRequiredMixin, ListaAoVivoMixin
 from ..utils import paginate_queryset
 
 business_logger = logging.getLogger('atividades.business')
@@ -62,6 +62,7 @@ class EditarCategoriaCursoView(GestorOuCoordenadorRequiredMixin, View):
         form = CategoriaCursoForm(request.POST, instance=self.categoria)
         if form.is_valid():
             form.save()
+            SaldoHorasService.recalcular_horas_validas_categoria(categoria=self.categoria)
             business_logger.warning(
                 f"CURSO-CATEGORIA EDITADA: {self.categoria.categoria.nome} -> {self.categoria.curso_semestre.curso.nome} | "
                 f"User: {request.user.username}"
@@ -111,7 +112,7 @@ class ExcluirCategoriaCursoView(GestorOuCoordenadorRequiredMixin, View):
         return redirect('listar_categorias_curso')
 
 
-class ListarCategoriasCursoView(GestorOuCoordenadorRequiredMixin, TemplateView):
+class ListarCategoriasCursoView(GestorOuCoordenadorRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_categorias_curso.html'
     htmx_template_name = 'listas/partials/categorias_curso_list.html'
 
@@ -12,7 +12,7 @@ from atividades.selectors import CursoSelectors, SemestreSelectors
 
 from ..models import Curso, CursoPorSemestre, Semestre
 from ..forms import CursoForm
-from ..mixins import GestorRequiredMixin
+from ..mixins import GestorRequiredMixin, ListaAoVivoMixin
 
 business_logger = logging.getLogger('atividades.business')
 
@@ -128,7 +128,7 @@ class ExcluirCursoView(GestorRequiredMixin, View):
         return redirect('listar_cursos')
 
 
-class ListarCursosView(GestorRequiredMixin, TemplateView):
+class ListarCursosView(GestorRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_cursos.html'
     htmx_template_name = 'listas/partials/cursos_list.html'
 
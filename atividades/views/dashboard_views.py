@@ -1,8 +1,8 @@
 from django.views.generic import TemplateView
 
-from atividades.services import AlunoService, StatsService
+from atividades.services import StatsService
 
-from ..selectors import AlunoSelectors, AtividadeSelectors, CategoriaCursoSelectors, SemestreSelectors, UserSelectors
+from ..selectors import AlunoSelectors, SemestreSelectors, UserSelectors
 from ..mixins import LoginRequiredMixin
 
 
@@ -37,39 +37,11 @@ class DashboardView(LoginRequiredMixin, TemplateView):
     
     def get_aluno_context(self):
         aluno = AlunoSelectors.get_aluno_by_user(self.request.user)
+        resumo = AlunoSelectors.get_resumo_aluno(aluno, limite_recentes=5)
+        # Reaproveitado pelo context processor da sidebar nesta mesma requisição
+        self.request.resumo_aluno = resumo
 
-        total_horas = AlunoService.calcular_horas_complementares_validas(aluno=aluno, apenas_aprovadas=True)
-        horas_requeridas = AlunoSelectors.get_horas_necessarias_para_conclusao(aluno=aluno)
-
-        progresso = 0
-        if horas_requeridas > 0:
-            progresso = min(100, round((total_horas / horas_requeridas) * 100))
-
-        atividades_recentes = AtividadeSelectors.get_atividades_recentes_aluno(aluno, limite=5)
-
-        ultrapassou_limite = False
-        if aluno.curso:
-            categorias = CategoriaCursoSelectors.get_categorias_curso(curso=aluno.curso, semestre=aluno.semestre_ingresso)
-            ultrapassou_limite = any(
-                c.ultrapassou_limite_pelo_aluno(aluno)
-                for c in categorias
-            )
-
-        horas_pendentes = AtividadeSelectors.get_total_horas_aluno(
-            aluno=aluno,
-            apenas_pendentes=True
-        )
-
-        return {
-            'aluno': aluno,
-            'total_horas': total_horas,
-            'progresso_percentual': progresso,
-            'atividades_recentes': atividades_recentes,
-            'ultrapassou_limite': ultrapassou_limite,
-            'horas_requeridas': horas_requeridas,
-            'horas_pendentes': horas_pendentes,
-            'horas_totais': horas_pendentes + total_horas,
-        }
+        return {'aluno': aluno, **resumo}
 
     def get_institucional_context(self):
         user = self.request.user
@@ -80,7 +52,7 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         curso = None
 
         if grupo == 'Coordenador':
-            coordenador = getattr(user, 'coordenador', None)
+            coordenador = UserSelectors.get_coordenador_by_user(user)
             if coordenador:
                 curso = coordenador.curso
                 stats = StatsService.get_stats_coordenador(curso=curso)
@@ -94,8 +66,8 @@ class DashboardView(LoginRequiredMixin, TemplateView):
         }
 
         if grupo == 'Gestor':
-            context['ultimos_semestres'] = SemestreSelectors.get_ultimos_semestres_com_alunos(5)
+            context['ultimos_semestres'] = StatsService.get_ultimos_semestres(5)
         elif grupo == 'Coordenador' and curso:
-            context['ultimos_semestres'] = SemestreSelectors.get_ultimos_semestres_com_alunos(5, curso=curso)
+            context['ultimos_semestres'] = StatsService.get_ultimos_semestres(5, curso=curso)
 
         return context
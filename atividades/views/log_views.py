@@ -1,43 +1,63 @@
+import time
 from pathlib import Path
+from urllib.parse import urlencode
+from django.contrib import messages
+from django.shortcuts import redirect
 from django.views.generic import TemplateView
 from django.conf import settings
 
+from ..desempenho import limpar_amostras, resumo_por_view
+from ..logs_indice import IndiceLogs
 from ..mixins import GestorRequiredMixin
+from ..utils import ler_log_do_fim
 
 
 class VisualizarLogsView(GestorRequiredMixin, TemplateView):
     template_name = "atividades/visualizar_logs.html"
+    opcoes_linhas = (50, 100, 200, 500)
+    campos_busca = ("q", "usuario", "rota", "de", "ate")
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         
         # Define qual arquivo de log visualizar
         log_type = self.request.GET.get("tipo", "errors")
-        num_lines = int(self.request.GET.get("linhas", 100))
+        num_lines = self.request.GET.get("linhas", "100")
+        num_lines = int(num_lines) if num_lines.isdigit() and int(num_lines) in self.opcoes_linhas else 100
+        cursor = self.request.GET.get("antes") or None
         
-        # Mapeia tipos para arquivos
-        log_files = {
-            "errors": "errors.log",
-            "business": "business.log",
-            "security": "security.log",
+        # Mapeia tipos para os handlers do LOGGING (arquivo e quantidade de backups)
+        log_handlers = {
+            "errors": "file_errors",
+            "business": "file_business",
+            "security": "file_security",
+            "desempenho": "file_desempenho",
         }
         
-        log_filename = log_files.get(log_type, "errors.log")
-        log_path = Path(settings.BASE_DIR) / "logs" / log_filename
+        if log_type not in log_handlers:
+            log_type = "errors"
+        handler = settings.LOGGING["handlers"][log_handlers[log_type]]
+        log_path = Path(handler["filename"])
         
         log_content = []
+        proximo_cursor = None
         file_exists = False
+        busca = {campo: self.request.GET.get(campo, "").strip() for campo in self.campos_busca}
+        em_busca = any(busca.values())
         
-        if log_path.exists():
+        if log_path.exists() and em_busca:
+            file_exists = True
+            context.update(self.buscar_no_indice(log_type, log_path, handler, busca, num_lines))
+        elif log_path.exists():
             file_exists = True
             try:
-                # Lê as últimas N linhas do arquivo
-                with open(log_path, "r", encoding="utf-8") as f:
-                    lines = f.readlines()
-                    # Pega as últimas N linhas
-                    log_content = lines[-num_lines:] if len(lines) > num_lines else lines
-                    # Inverte para mostrar as mais recentes primeiro
-                    log_content.reverse()
+                # Lê só o final do arquivo (e dos backups rotacionados), mais recentes primeiro
+                log_content, proximo_cursor = ler_log_do_fim(
+                    log_path,
+                    quantidade=num_lines,
+                    cursor=cursor,
+                    backups=handler.get("backupCount", 0),
+                )
             except Exception as e:
                 log_content = [f"Erro ao ler arquivo de log: {str(e)}"]
         
@@ -46,17 +66,72 @@ class VisualizarLogsView(GestorRequiredMixin, TemplateView):
         if file_exists:
             file_size = log_path.stat().st_size / 1024  # KB
         
+        context.setdefault("log_content", log_content)
         context.update({
             "log_type": log_type,
-            "log_content": log_content,
             "file_exists": file_exists,
             "file_size": round(file_size, 2),
             "num_lines": num_lines,
+            "cursor": cursor,
+            "proximo_cursor": proximo_cursor,
+            "busca": busca,
+            "em_busca": em_busca,
             "log_types": [
                 {"value": "errors", "label": "Erros do Sistema"},
                 {"value": "business", "label": "Operações Críticas"},
                 {"value": "security", "label": "Segurança"},
+                {"value": "desempenho", "label": "Requisições Lentas"},
             ],
         })
         
         return context
+
+    def buscar_no_indice(self, log_type, log_path, handler, busca, num_lines):
+        """Atualiza o índice do arquivo e aplica texto, usuário, rota e período"""
+        indice = IndiceLogs()
+        antes_id = self.request.GET.get("antes_id", "")
+
+        tempo_inicio = time.perf_counter()
+        try:
+            indice.indexar(tipo=log_type, arquivo=log_path, backups=handler.get("backupCount", 0))
+            entradas, proximo_id = indice.buscar(
+                tipo=log_type,
+                texto=busca["q"],
+                usuario=busca["usuario"],
+                rota=busca["rota"],
+                inicio=busca["de"] and f'{busca["de"]} 00:00:00',
+                fim=busca["ate"] and f'{busca["ate"]} 23:59:59',
+                limite=num_lines,
+                antes_id=int(antes_id) if antes_id.isdigit() else None,
+            )
+            log_content = [f"[{e['nivel']}] {e['momento']} | {e['mensagem']}" for e in entradas]
+        except Exception as e:
+            log_content, proximo_id = [f"Erro ao consultar o índice de logs: {str(e)}"], None
+
+        return {
+            "log_content": log_content,
+            "proximo_id": proximo_id,
+            "tempo_busca_ms": round((time.perf_counter() - tempo_inicio) * 1000, 1),
+            "busca_query": urlencode({"tipo": log_type, "linhas": num_lines, **busca}),
+        }
+
+
+class DesempenhoViewsView(GestorRequiredMixin, TemplateView):
+    """Percentis de tempo e consultas SQL por view, coletados pelo DesempenhoMiddleware"""
+    template_name = "atividades/desempenho_views.html"
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        context.update({
+            "views": resumo_por_view(),
+            "limite_lento_ms": settings.DESEMPENHO_LIMITE_LENTO_MS,
+            "janela": settings.DESEMPENHO_JANELA,
+            "amostra_ttl_min": settings.DESEMPENHO_AMOSTRA_TTL // 60,
+        })
+        return context
+
+    def post(self, request):
+        """Zera as amostras (deste worker) para medir a partir de agora"""
+        limpar_amostras()
+        messages.success(request, 'Amostras de desempenho zeradas.')
+        return redirect('desempenho_views')
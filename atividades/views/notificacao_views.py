@@ -1,10 +1,22 @@
+import asyncio
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.handlers.asgi import ASGIRequest
 from django.shortcuts import get_object_or_404
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.views.generic import TemplateView, View
-from django.http import HttpResponse
+from django.http import HttpResponse, StreamingHttpResponse
+from atividades import eventos
 from atividades.mixins import AlunoRequiredMixin
 from atividades.models import Notificacao
-from atividades.selectors import NotificationSelectors
+from atividades.selectors import NotificationSelectors, UserSelectors
+from atividades.services import NotificacaoService
+
+
+def badge_notificacoes(total_nao_lidas: int) -> str:
+    if total_nao_lidas > 0:
+        return f'<span class="notif-badge">{total_nao_lidas}</span>'
+    return ''
 
 
 class ListarNotificacoesDropdownView(LoginRequiredMixin, TemplateView):
@@ -17,7 +29,8 @@ class ListarNotificacoesDropdownView(LoginRequiredMixin, TemplateView):
         context = super().get_context_data(**kwargs)
         todas_notificacoes = NotificationSelectors.get_notificacoes_nao_lidas(self.request.user)
 
-        notificacoes_count = todas_notificacoes.count()
+        # O total vem do contador; a lista é uma leitura pelo índice (user, lida, criada_em)
+        notificacoes_count = NotificationSelectors.count_notificacoes_nao_lidas(self.request.user)
         limitado = False
         if self.request.GET.get('todas') != 'true':
             todas_notificacoes = todas_notificacoes[:15]
@@ -36,8 +49,7 @@ class MarcarNotificacaoLidaView(LoginRequiredMixin, View):
             id=notificacao_id,
             user=request.user
         )
-        notificacao.lida = True
-        notificacao.save()
+        NotificacaoService.marcar_lida(notificacao=notificacao)
         return HttpResponse("", headers={"HX-Trigger": "notificacaoLida"})
 
 
@@ -47,8 +59,7 @@ class MarcarTodasLidasView(LoginRequiredMixin, View):
     Marca todas as notificações como lidas
     """
     def post(self, request):
-        notificacoes = NotificationSelectors.get_notificacoes_nao_lidas(request.user)
-        notificacoes.update(lida=True)
+        NotificacaoService.marcar_todas_lidas(user_id=request.user.pk)
         
         # Retorna badge vazio
         return HttpResponse("", headers={"HX-Trigger": "notificacaoLida"})
@@ -56,7 +67,55 @@ class MarcarTodasLidasView(LoginRequiredMixin, View):
 class CountNotificacoesNaoLidas(AlunoRequiredMixin, View):
         def get(self, request):
             total_nao_lidas = NotificationSelectors.count_notificacoes_nao_lidas(request.user)
-            
-            if total_nao_lidas > 0:
-                return HttpResponse(f'<span class="notif-badge">{total_nao_lidas}</span>')
-            return HttpResponse('')
+            return HttpResponse(badge_notificacoes(total_nao_lidas))
+
+
+class StreamNotificacoesView(View):
+    """
+    Server-Sent Events com o badge de notificações do aluno (evento "notificacoes").
+    Só funciona servido pelo ASGI (plataforma/asgi.py): a conexão fica aberta no
+    event loop e é avisada pelo pub/sub de atividades.eventos. Em WSGI responde
+    204, o que faz o EventSource desistir; o header usa então o polling.
+    """
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return HttpResponse(status=204)
+
+        user = await request.auser()
+        if not user.is_authenticated or not await sync_to_async(UserSelectors.is_user_aluno)(user):
+            return HttpResponse(status=204)
+
+        response = StreamingHttpResponse(self._eventos(user), content_type='text/event-stream')
+        response['Cache-Control'] = 'no-cache'
+        response['X-Accel-Buffering'] = 'no'
+        return response
+
+    async def _eventos(self, user):
+        fila = eventos.inscrever(user.pk)
+        contar = sync_to_async(NotificationSelectors.count_notificacoes_nao_lidas)
+        loop = asyncio.get_running_loop()
+        # A conexão é encerrada de tempos em tempos; o EventSource reconecta sozinho
+        limite = loop.time() + settings.NOTIFICACOES_SSE_DURACAO
+        try:
+            versao = await eventos.versao(user.pk)
+            # Reconexão rápida quando a conexão é encerrada por tempo
+            yield 'retry: 3000\n'
+            yield f'event: notificacoes\ndata: {badge_notificacoes(await contar(user))}\n\n'
+
+            while loop.time() < limite:
+                try:
+                    await asyncio.wait_for(fila.get(), timeout=settings.NOTIFICACOES_SSE_KEEPALIVE)
+                except asyncio.TimeoutError:
+                    # Publicações de outros processos só aparecem na versão do cache
+                    nova_versao = await eventos.versao(user.pk)
+                    if nova_versao == versao:
+                        yield ': keep-alive\n\n'
+                        continue
+                    versao = nova_versao
+                else:
+                    versao = await eventos.versao(user.pk)
+
+                yield f'event: notificacoes\ndata: {badge_notificacoes(await contar(user))}\n\n'
+        finally:
+            eventos.cancelar(user.pk, fila)
@@ -1,26 +1,107 @@
-from django.http import HttpResponse
+import logging
+from django.contrib import messages
+from django.http import FileResponse, StreamingHttpResponse
+from django.shortcuts import redirect, render
+from django.utils.text import slugify
 from django.views import View
 from datetime import datetime
-from ..selectors import AlunoSelectors
-from ..services import RelatorioAlunoService
-from ..pdfBuilder.relatorio_aluno import RelatorioAlunoPdfBuilder
-from ..mixins import AlunoRequiredMixin
+from ..models import Curso, Semestre
+from ..selectors import AlunoSelectors, UserSelectors
+from ..services import RelatorioLoteService, RelatorioPdfService
+from ..mixins import AlunoRequiredMixin, GestorOuCoordenadorRequiredMixin
+
+business_logger = logging.getLogger('atividades.business')
 
 class GerarRelatorioAlunoView(AlunoRequiredMixin, View):
 
     def get(self, request):
         aluno = AlunoSelectors.get_aluno_by_user(request.user)
 
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = (
-            f'attachment; filename="relatorio_{aluno.matricula}_{datetime.now():%Y%m%d}.pdf"'
-        )
+        status, caminho = RelatorioPdfService.solicitar_relatorio(aluno=aluno)
+
+        if status == RelatorioPdfService.PRONTO:
+            return FileResponse(
+                open(caminho, 'rb'),
+                as_attachment=True,
+                filename=f'relatorio_{aluno.matricula}_{datetime.now():%Y%m%d}.pdf',
+                content_type='application/pdf'
+            )
+
+        return render(request, 'relatorios/relatorio_aguardando.html', {'status': status})
+
+
+class StatusRelatorioAlunoView(AlunoRequiredMixin, View):
+    """Consultado via HTMX enquanto o PDF é gerado em segundo plano"""
+
+    def get(self, request):
+        aluno = AlunoSelectors.get_aluno_by_user(request.user)
+
+        status, _ = RelatorioPdfService.solicitar_relatorio(aluno=aluno)
+
+        return render(request, 'relatorios/partials/relatorio_status.html', {'status': status})
+
+
+class _ZipEmStreaming:
+    """Iterável da resposta que libera a vaga da geração em lote quando a resposta é fechada"""
 
-        dados = RelatorioAlunoService.gerar_dados_relatorio(aluno=aluno)
+    def __init__(self, partes, liberar):
+        self._partes = partes
+        self._liberar = liberar
 
-        RelatorioAlunoPdfBuilder(
-            response=response,
-            dados=dados
-        ).build()
+    def __iter__(self):
+        return self._partes
 
+    def close(self):
+        try:
+            self._partes.close()
+        finally:
+            if self._liberar:
+                self._liberar()
+                self._liberar = None
+
+
+class GerarRelatoriosTurmaView(GestorOuCoordenadorRequiredMixin, View):
+    """ZIP com os relatórios de todos os alunos do curso (ou de um semestre de ingresso)"""
+
+    def get(self, request):
+        user = request.user
+
+        if UserSelectors.is_user_coordenador(user):
+            curso = UserSelectors.get_coordenador_by_user(user).curso
+        else:
+            curso_id = request.GET.get('curso', '')
+            curso = Curso.objects.filter(id=curso_id).first() if curso_id.isdigit() else None
+        if not curso:
+            messages.error(request, 'Curso não encontrado.')
+            return redirect('dashboard')
+
+        semestre = None
+        semestre_id = request.GET.get('semestre_ingresso', '')
+        if semestre_id.isdigit():
+            semestre = Semestre.objects.filter(id=semestre_id).first()
+
+        alunos = AlunoSelectors.get_alunos_da_turma(curso=curso, semestre_ingresso=semestre)
+        lote = RelatorioLoteService.gerar_dados_relatorios(alunos=alunos, curso=curso, semestre_ingresso=semestre)
+        if not lote:
+            messages.warning(request, 'Nenhum aluno encontrado para gerar relatórios.')
+            return redirect(request.META.get('HTTP_REFERER') or 'dashboard')
+
+        if not RelatorioLoteService.reservar_geracao():
+            messages.warning(request, 'Já existe uma geração de relatórios em lote em andamento. Tente novamente em instantes.')
+            return redirect(request.META.get('HTTP_REFERER') or 'dashboard')
+
+        business_logger.warning(
+            f"RELATÓRIOS EM LOTE: {curso.nome}{f' / {semestre.nome}' if semestre else ''} "
+            f"({len(lote)} alunos) | User: {user.username}"
+        )
+
+        response = StreamingHttpResponse(
+            _ZipEmStreaming(
+                RelatorioLoteService.gerar_zip(lote=lote),
+                RelatorioLoteService.liberar_geracao
+            ),
+            content_type='application/zip'
+        )
+        nome = slugify(f'{curso.nome} {semestre.nome if semestre else ""}')
+        response['Content-Disposition'] = f'attachment; filename="relatorios_{nome}_{datetime.now():%Y%m%d}.zip"'
         return response
@@ -8,7 +8,7 @@ from ..forms import UserRegistrationForm, AlterarEmailForm, AdminUserForm
 from ..selectors import AlunoSelectors, UserSelectors
 from ..services import UserService
 from ..filters import AlunosFilter, UsuarioFilter
-from ..mixins import LoginRequiredMixin, GestorRequiredMixin, CoordenadorRequiredMixin
+from ..mixins import LoginRequiredMixin, GestorRequiredMixin, CoordenadorRequiredMixin, ListaAoVivoMixin
 
 business_logger = logging.getLogger('atividades.business')
     
@@ -60,7 +60,7 @@ class CriarUsuarioAdminView(GestorRequiredMixin, View):
         return render(request, self.template_name, {'form': form})
 
 
-class ListarUsuariosAdminView(GestorRequiredMixin, TemplateView):
+class ListarUsuariosAdminView(GestorRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_usuarios_admin.html'
     htmx_template_name = 'listas/htmx/users_admin_list.html'
 
@@ -84,9 +84,10 @@ class ListarUsuariosAdminView(GestorRequiredMixin, TemplateView):
         return [self.template_name]
 
 
-class ListarAlunosCoordenadorView(CoordenadorRequiredMixin, TemplateView):
+class ListarAlunosCoordenadorView(CoordenadorRequiredMixin, ListaAoVivoMixin, TemplateView):
     template_name = 'listas/listar_alunos_coordenador.html'
     htmx_template_name = 'listas/partials/alunos_coord_list.html'
+    paginacao_por_cursor = True
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
@@ -100,7 +101,13 @@ class ListarAlunosCoordenadorView(CoordenadorRequiredMixin, TemplateView):
         alunos_filtrados = filtro.qs
 
         # Paginação
-        alunos_paginados = paginate_queryset(qs=alunos_filtrados, page=self.request.GET.get('page'), per_page=20)
+        alunos_paginados = paginate_queryset(
+            qs=alunos_filtrados,
+            page=self.request.GET.get('page'),
+            per_page=20,
+            cursor=self.request.GET.get('cursor'),
+            por_cursor=self.paginacao_por_cursor,
+        )
 
         context['curso'] = curso
         context['alunos'] = alunos_paginados
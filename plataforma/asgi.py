@@ -13,4 +13,7 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'plataforma.settings')
 
+# Servido pelo ASGI, o badge de notificações usa Server-Sent Events em vez de polling
+os.environ.setdefault('NOTIFICACOES_SSE', 'True')
+
 application = get_asgi_application()
@@ -16,7 +16,9 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 from pathlib import Path
-from decouple import config, Csv
+import os
+from decouple import config, Choices, Csv
+import tempfile
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -70,15 +72,17 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'atividades.middleware.DesempenhoMiddleware',  # Primeiro: mede a requisição inteira
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'atividades.middleware.PerfilUsuarioMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
     'atividades.middleware.ErrorLoggingMiddleware',
-    'whitenoise.middleware.WhiteNoiseMiddleware',  # Captura erros e exceções
+    'atividades.middleware.ArquivosEstaticosMiddleware',  # WhiteNoise, também no modo assíncrono
 ]
 
 ROOT_URLCONF = 'plataforma.urls'
@@ -94,6 +98,7 @@ TEMPLATES = [
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'atividades.context_processors.categorias_do_usuario',
+                'atividades.context_processors.notificacoes',
             ],
         },
     },
@@ -114,17 +119,38 @@ DATABASES = {
 
 # Cache configuration
 # https://docs.djangoproject.com/en/5.2/topics/cache/
+# CACHE_BACKEND:
+#   locmem       - memória do processo (um worker só)
+#   sqlite       - arquivo SQLite compartilhado pelos workers da máquina
+#   duas_camadas - SQLite compartilhado + L1 em memória por worker, invalidado entre processos
+CACHE_BACKENDS = {
+    'locmem': 'django.core.cache.backends.locmem.LocMemCache',
+    'sqlite': 'atividades.cache_backends.SQLiteCache',
+    'duas_camadas': 'atividades.cache_backends.CacheDuasCamadas',
+}
+CACHE_BACKEND = config('CACHE_BACKEND', default='locmem', cast=Choices(list(CACHE_BACKENDS)))
+
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-        'LOCATION': 'horas-academicas-cache',
+        'BACKEND': CACHE_BACKENDS[CACHE_BACKEND],
+        'LOCATION': (
+            'horas-academicas-cache' if CACHE_BACKEND == 'locmem'
+            else config('CACHE_LOCATION', default=os.path.join(tempfile.gettempdir(), 'horas-academicas-cache.sqlite3'))
+        ),
         'TIMEOUT': 300,  # 5 minutos (padrão)
         'OPTIONS': {
-            'MAX_ENTRIES': 1000,
+            'MAX_ENTRIES': 1000 if CACHE_BACKEND == 'locmem' else 20000,
         }
     }
 }
 
+# Relatórios em PDF: gerados em segundo plano e guardados em disco por fingerprint
+RELATORIOS_PDF_DIR = BASE_DIR / 'media' / 'relatorios'
+RELATORIOS_PDF_WORKERS = config('RELATORIOS_PDF_WORKERS', default=2, cast=int)
+# Geração em lote (turma inteira): processos usados por geração e gerações simultâneas por servidor
+RELATORIOS_LOTE_WORKERS = config('RELATORIOS_LOTE_WORKERS', default=os.cpu_count() or 1, cast=int)
+RELATORIOS_LOTE_SIMULTANEOS = config('RELATORIOS_LOTE_SIMULTANEOS', default=1, cast=int)
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -170,6 +196,40 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # =============================================================================
 # LOGGING - Configuração Simples
 # =============================================================================
+# Desempenho por view: requisições acima do limite vão para logs/desempenho.log
+# e as últimas DESEMPENHO_JANELA requisições de cada view alimentam os percentis
+DESEMPENHO_LIMITE_LENTO_MS = config('DESEMPENHO_LIMITE_LENTO_MS', default=1000, cast=int)
+DESEMPENHO_JANELA = config('DESEMPENHO_JANELA', default=500, cast=int)
+# Amostras mais antigas que isso (segundos) saem da janela, mesmo sem requisições novas na view
+DESEMPENHO_AMOSTRA_TTL = config('DESEMPENHO_AMOSTRA_TTL', default=3600, cast=int)
+
+# Paginação: contagens em cache por consulta (invalidadas a cada escrita nas
+# tabelas lidas) e limitadas; acima do limite a lista mostra "mais de N"
+PAGINACAO_CONTAGEM_TTL = config('PAGINACAO_CONTAGEM_TTL', default=60, cast=int)
+PAGINACAO_CONTAGEM_LIMITE = config('PAGINACAO_CONTAGEM_LIMITE', default=5000, cast=int)
+
+# Listas filtradas ao vivo (HTMX): HTML das respostas em cache, invalidado por escrita nas tabelas lidas
+LISTAS_CACHE_TTL = config('LISTAS_CACHE_TTL', default=30, cast=int)
+
+# Badge de notificações: por Server-Sent Events quando servido pelo ASGI
+# (plataforma/asgi.py liga NOTIFICACOES_SSE); no WSGI, polling a cada NOTIFICACOES_POLL_SEGUNDOS
+NOTIFICACOES_SSE = config('NOTIFICACOES_SSE', default=False, cast=bool)
+NOTIFICACOES_SSE_KEEPALIVE = config('NOTIFICACOES_SSE_KEEPALIVE', default=15, cast=int)
+NOTIFICACOES_SSE_DURACAO = config('NOTIFICACOES_SSE_DURACAO', default=300, cast=int)
+NOTIFICACOES_POLL_SEGUNDOS = config('NOTIFICACOES_POLL_SEGUNDOS', default=60, cast=int)
+
+# Retenção (compactar_notificacoes, agendado no cron): lidas há mais de NOTIFICACOES_RETENCAO_DIAS
+# são apagadas, ou arquivadas em NOTIFICACOES_ARQUIVO_DIR, em lotes curtos com uma pausa entre eles
+NOTIFICACOES_RETENCAO_DIAS = config('NOTIFICACOES_RETENCAO_DIAS', default=180, cast=int)
+NOTIFICACOES_RETENCAO_LOTE = config('NOTIFICACOES_RETENCAO_LOTE', default=500, cast=int)
+NOTIFICACOES_RETENCAO_PAUSA_MS = config('NOTIFICACOES_RETENCAO_PAUSA_MS', default=50, cast=int)
+NOTIFICACOES_ARQUIVO_DIR = BASE_DIR / 'media' / 'notificacoes_arquivadas'
+# Corte por idade da execução em andamento, reaproveitado se ela for interrompida
+NOTIFICACOES_RETENCAO_CHECKPOINT = NOTIFICACOES_ARQUIVO_DIR / 'compactar_notificacoes.checkpoint.json'
+
+# Índice de busca dos logs (SQLite com FTS5), atualizado de forma incremental
+LOGS_INDICE_PATH = BASE_DIR / 'logs' / 'indice_logs.sqlite3'
+
 LOGGING = {
     'version': 1,
     'disable_existing_loggers': False,
@@ -212,6 +272,16 @@ LOGGING = {
             'backupCount': 5,
             'formatter': 'simple',
         },
+
+        # Requisições lentas (acima de DESEMPENHO_LIMITE_LENTO_MS)
+        'file_desempenho': {
+            'level': 'WARNING',
+            'class': 'logging.handlers.RotatingFileHandler',
+            'filename': BASE_DIR / 'logs' / 'desempenho.log',
+            'maxBytes': 5 * 1024 * 1024,  # 5MB
+            'backupCount': 3,
+            'formatter': 'simple',
+        },
     },
     
     'loggers': {
@@ -235,5 +305,12 @@ LOGGING = {
             'level': 'WARNING',
             'propagate': False,
         },
+
+        # Requisições lentas
+        'atividades.desempenho': {
+            'handlers': ['file_desempenho'],
+            'level': 'WARNING',
+            'propagate': False,
+        },
     },
 }